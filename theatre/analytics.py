@@ -0,0 +1,125 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from theatre.models import HourlySales, Ticket
+
+SALES_FIELDS = ("tickets_sold", "tickets_released", "bookings")
+
+
+def occupancy_percent(tickets_sold, capacity):
+    return round(100 * tickets_sold / capacity, 1) if capacity else 0.0
+
+
+def sales_hour(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def _add_sales(hour, groups):
+    """
+    Add ``{(theatre_hall_id, play_id): {field: count}}`` to the sales
+    of ``hour``. Missing rows are inserted first, ignoring ones created
+    concurrently, so every row is then updated with an increment.
+    """
+    HourlySales.objects.bulk_create(
+        [
+            HourlySales(
+                hour=hour, theatre_hall_id=theatre_hall_id, play_id=play_id
+            )
+            for theatre_hall_id, play_id in groups
+        ],
+        ignore_conflicts=True,
+    )
+    for (theatre_hall_id, play_id), counts in groups.items():
+        HourlySales.objects.filter(
+            hour=hour, theatre_hall_id=theatre_hall_id, play_id=play_id
+        ).update(**{name: F(name) + count for name, count in counts.items()})
+
+
+def record_booking(tickets, now=None):
+    """
+    Count booked tickets in the sales of their hall, play and the
+    current hour. A booking counts once per hall and play it covers.
+    """
+    hour = sales_hour(now)
+    groups = Counter(
+        (ticket.performance.theatre_hall_id, ticket.performance.play_id)
+        for ticket in tickets
+    )
+    _add_sales(
+        hour,
+        {
+            group: {"tickets_sold": count, "bookings": 1}
+            for group, count in groups.items()
+        },
+    )
+
+
+def record_release(hall_play_ids, now=None):
+    """Count released tickets, given as ``(theatre_hall_id, play_id)``."""
+    _add_sales(
+        sales_hour(now),
+        {
+            group: {"tickets_released": count}
+            for group, count in Counter(hall_play_ids).items()
+        },
+    )
+
+
+def daily_sales(queryset, group_by):
+    """Sum hourly sales per day and ``theatre_hall`` or ``play``."""
+    return (
+        queryset
+        .annotate(date=TruncDate("hour"))
+        .order_by()
+        .values("date", f"{group_by}_id")
+        .annotate(**{name: Sum(name) for name in SALES_FIELDS})
+        .order_by("date", f"{group_by}_id")
+    )
+
+
+def rebuild_hourly_sales(batch_size=1000):
+    """
+    Recompute all hourly sales from tickets, dated by the creation of
+    their reservations. Released tickets are gone, so they are lost.
+    """
+    counts = {}
+    rows = (
+        Ticket
+        .objects
+        .values_list(
+            "reservation_id",
+            "reservation__created_at",
+            "performance__theatre_hall_id",
+            "performance__play_id",
+        )
+        .order_by()
+        .iterator(chunk_size=batch_size)
+    )
+    bookings = set()
+    for reservation_id, created_at, theatre_hall_id, play_id in rows:
+        key = (sales_hour(created_at), theatre_hall_id, play_id)
+        sales = counts.setdefault(key, {"tickets_sold": 0, "bookings": 0})
+        sales["tickets_sold"] += 1
+        if (reservation_id, key) not in bookings:
+            bookings.add((reservation_id, key))
+            sales["bookings"] += 1
+
+    with transaction.atomic():
+        HourlySales.objects.all().delete()
+        HourlySales.objects.bulk_create(
+            (
+                HourlySales(
+                    hour=hour,
+                    theatre_hall_id=theatre_hall_id,
+                    play_id=play_id,
+                    **sales,
+                )
+                for (hour, theatre_hall_id, play_id), sales in counts.items()
+            ),
+            batch_size=batch_size,
+        )
+    return len(counts)
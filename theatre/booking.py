@@ -0,0 +1,249 @@
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from theatre.analytics import record_booking, record_release
+from theatre.events import publish_seat_changes
+from theatre.models import Performance, Reservation, SeatHold, Ticket
+from theatre.seat_map import SeatMap, occupy_seats, release_seats
+
+SEAT_TAKEN_MESSAGE = (
+    "The fields performance, row, seat must make a unique set."
+)
+SEAT_HELD_MESSAGE = "This seat is held by another customer."
+NO_BLOCK_MESSAGE = "No block of {size} seats next to each other is free."
+
+
+class SeatConflictError(Exception):
+    """Raised when requested seats were taken while booking."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def prefetch_performances(performance_ids):
+    """Load requested performances with their halls in one query."""
+    ids = set()
+    for performance_id in performance_ids:
+        if isinstance(performance_id, bool):
+            continue
+        try:
+            ids.add(int(performance_id))
+        except (TypeError, ValueError):
+            continue
+    if not ids:
+        return {}
+    return Performance.objects.select_related("theatre_hall").in_bulk(ids)
+
+
+def lock_performances(performance_ids):
+    """
+    Take row locks on performances in id order, so concurrent bookings
+    of the same performance are serialized instead of racing to insert.
+    """
+    return list(
+        Performance
+        .objects
+        .select_for_update()
+        .filter(id__in=performance_ids)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def _group_seats(tickets_data):
+    requested = defaultdict(list)
+    for index, ticket_data in enumerate(tickets_data):
+        requested[ticket_data["performance"].id].append(
+            (index, ticket_data["row"], ticket_data["seat"])
+        )
+    return requested
+
+
+def _seats_filter(seats):
+    return {
+        "row__in": {row for _, row, _ in seats},
+        "seat__in": {seat for _, _, seat in seats},
+    }
+
+
+def exact_seats_q(seats):
+    """Match exactly the given ``(performance_id, row, seat)`` triples."""
+    return reduce(
+        or_,
+        (
+            Q(performance_id=performance_id, row=row, seat=seat)
+            for performance_id, row, seat in seats
+        ),
+    )
+
+
+def find_seat_conflicts(tickets_data, user=None):
+    """
+    Return ``{index: message}`` for requested tickets whose seat is
+    already sold, requested more than once or held by someone other
+    than ``user``. Runs one query per performance for sold seats and,
+    when ``user`` is given, one for active holds.
+    """
+    now = timezone.now()
+    conflicts = {}
+    for performance_id, seats in _group_seats(tickets_data).items():
+        taken = set(
+            Ticket
+            .objects
+            .filter(performance_id=performance_id, **_seats_filter(seats))
+            .values_list("row", "seat")
+        )
+        held = set()
+        if user is not None:
+            held = set(
+                SeatHold
+                .objects
+                .filter(
+                    performance_id=performance_id,
+                    expires_at__gt=now,
+                    **_seats_filter(seats),
+                )
+                .exclude(user=user)
+                .values_list("row", "seat")
+            )
+        for index, row, seat in seats:
+            if (row, seat) in taken:
+                conflicts[index] = SEAT_TAKEN_MESSAGE
+            elif (row, seat) in held:
+                conflicts[index] = SEAT_HELD_MESSAGE
+            taken.add((row, seat))
+    return conflicts
+
+
+def seat_errors(tickets_data, conflicts):
+    return [
+        {"non_field_errors": [conflicts[index]]} if index in conflicts else {}
+        for index in range(len(tickets_data))
+    ]
+
+
+def adjust_tickets_sold(performance_ids, sign=1):
+    """Add ``sign`` to ``tickets_sold`` once per id occurrence."""
+    for performance_id, count in Counter(performance_ids).items():
+        Performance.objects.filter(pk=performance_id).update(
+            tickets_sold=F("tickets_sold") + sign * count
+        )
+
+
+def create_tickets(reservation, tickets_data):
+    """
+    Insert validated tickets in bulk, consume the reservation owner's
+    holds on them and mark their seats as taken.
+
+    Seats are re-checked while the performances are locked, so a seat
+    sold between validation and insert raises ``SeatConflictError``.
+    """
+    with transaction.atomic():
+        lock_performances(
+            {ticket_data["performance"].id for ticket_data in tickets_data}
+        )
+        conflicts = find_seat_conflicts(tickets_data, reservation.user)
+        if conflicts:
+            raise SeatConflictError(seat_errors(tickets_data, conflicts))
+
+        try:
+            with transaction.atomic():
+                tickets = Ticket.objects.bulk_create(
+                    Ticket(reservation=reservation, **ticket_data)
+                    for ticket_data in tickets_data
+                )
+        except IntegrityError:
+            raise SeatConflictError(
+                seat_errors(
+                    tickets_data,
+                    dict.fromkeys(
+                        range(len(tickets_data)), SEAT_TAKEN_MESSAGE
+                    ),
+                )
+            )
+
+        seats = [
+            (ticket.performance_id, ticket.row, ticket.seat)
+            for ticket in tickets
+        ]
+        SeatHold.objects.filter(
+            exact_seats_q(seats), user=reservation.user
+        ).delete()
+        occupy_seats(seats)
+        adjust_tickets_sold(ticket.performance_id for ticket in tickets)
+        record_booking(tickets)
+        publish_seat_changes("taken", seats)
+    return tickets
+
+
+def cancel_reservation(reservation):
+    """Delete a reservation and free the seats of its tickets."""
+    tickets = list(
+        reservation.tickets.values_list(
+            "performance_id",
+            "row",
+            "seat",
+            "performance__theatre_hall_id",
+            "performance__play_id",
+        )
+    )
+    seats = [ticket[:3] for ticket in tickets]
+    with transaction.atomic():
+        reservation.delete()
+        release_seats(seats)
+        adjust_tickets_sold(
+            (performance_id for performance_id, _, _ in seats), sign=-1
+        )
+        record_release(ticket[3:] for ticket in tickets)
+        publish_seat_changes("released", seats)
+
+
+def reserve_best_available(user, performance, size, preferred_row=None):
+    """
+    Reserve the best block of ``size`` contiguous free seats of a
+    performance for ``user`` and return the reservation.
+
+    The block is picked from the seat map while the performance is
+    locked, treating seats held by other customers as taken, so it
+    cannot be sold to anyone else in between. Raises
+    ``SeatConflictError`` if no such block is free.
+    """
+    with transaction.atomic():
+        lock_performances([performance.id])
+        performance = (
+            Performance
+            .objects
+            .select_related("theatre_hall")
+            .get(pk=performance.pk)
+        )
+        seat_map = SeatMap.for_performance(performance)
+        for row, seat in (
+            SeatHold
+            .objects
+            .filter(performance=performance, expires_at__gt=timezone.now())
+            .exclude(user=user)
+            .values_list("row", "seat")
+        ):
+            seat_map.take(row, seat)
+
+        seats = seat_map.best_block(size, preferred_row)
+        if seats is None:
+            raise SeatConflictError([NO_BLOCK_MESSAGE.format(size=size)])
+
+        reservation = Reservation.objects.create(
+            user=user, created_at=timezone.now()
+        )
+        create_tickets(
+            reservation,
+            [
+                {"performance": performance, "row": row, "seat": seat}
+                for row, seat in seats
+            ],
+        )
+    return reservation
@@ -0,0 +1,90 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "catalog:version:{namespace}"
+
+# Versions are bumped by whichever worker process saves a model, so they
+# and the responses cached under them live in the cache shared by all
+# workers.
+shared_cache = ConnectionProxy(caches, "shared")
+
+
+def get_version(namespace):
+    """Return the current version (a unix timestamp) of a namespace."""
+    key = VERSION_KEY.format(namespace=namespace)
+    version = shared_cache.get(key)
+    if version is None:
+        version = int(time.time())
+        if not shared_cache.add(key, version, timeout=None):
+            version = shared_cache.get(key, version)
+    return version
+
+
+def bump_version(*namespaces):
+    """Invalidate every cached response of the given namespaces."""
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace=namespace)
+        version = max(int(time.time()), shared_cache.get(key, 0) + 1)
+        shared_cache.set(key, version, timeout=None)
+
+
+def response_cache_key(namespace, version, request):
+    query = "&".join(
+        f"{name}={value}"
+        for name, values in sorted(request.query_params.lists())
+        for value in values
+    )
+    hall_id = getattr(request.user, "theatre_hall_id", None)
+    digest = hashlib.md5(
+        f"{request.path}?{query}|{hall_id}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return f"catalog:response:{namespace}:{version}:{digest}"
+
+
+def _is_not_modified(request, etag, version):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return etag in {tag.strip() for tag in if_none_match.split(",")}
+
+    modified_since = parse_http_date_safe(
+        request.headers.get("If-Modified-Since", "")
+    )
+    return modified_since is not None and version <= modified_since
+
+
+class CachedListMixin:
+    """
+    Cache ``list`` responses until a model of ``cache_namespace``
+    changes, and answer conditional requests with 304.
+    """
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        version = get_version(self.cache_namespace)
+        key = response_cache_key(self.cache_namespace, version, request)
+        etag = f'"{key.rsplit(":", 1)[-1]}-{version}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(version),
+            "Cache-Control": "private, no-cache",
+        }
+
+        if _is_not_modified(request, etag, version):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        data = shared_cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            shared_cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+        return Response(data, headers=headers)
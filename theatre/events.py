@@ -0,0 +1,156 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+try:
+    import redis
+except ImportError:  # Only needed for SEAT_EVENTS_REDIS_URL.
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class SeatEventBroker:
+    """
+    In-process publish/subscribe of seat availability changes.
+
+    Subscribers are asyncio queues bound to their event loop, so
+    publishers may run in any thread (sync views, workers). It only sees
+    bookings made by its own process, ``RedisSeatEventBroker`` shares
+    them between processes.
+    """
+
+    queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, performance_id):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[performance_id].add(subscriber)
+        return queue
+
+    def unsubscribe(self, performance_id, queue):
+        with self._lock:
+            subscribers = self._subscribers[performance_id]
+            subscribers.difference_update(
+                {item for item in subscribers if item[1] is queue}
+            )
+            if not subscribers:
+                del self._subscribers[performance_id]
+
+    def subscriber_count(self, performance_id):
+        with self._lock:
+            return len(self._subscribers.get(performance_id, ()))
+
+    @staticmethod
+    def _deliver(queue, event):
+        if queue.full():
+            # A listener that fell this far behind has to reload the
+            # seat map anyway, so replace its backlog with one marker.
+            while not queue.empty():
+                queue.get_nowait()
+            event = ("resync", {})
+        queue.put_nowait(event)
+
+    def publish(self, performance_id, event_type, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(performance_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(
+                self._deliver, queue, (event_type, data)
+            )
+
+
+class RedisSeatEventBroker(SeatEventBroker):
+    """
+    Seat events shared by all worker processes through Redis pub/sub.
+
+    ``publish()`` sends events to Redis only. Each process listens to the
+    channels of every performance in a thread started by its first
+    subscriber and hands the events to its own subscribers.
+    """
+
+    channel_prefix = "seat-events:"
+    retry_seconds = 1
+
+    def __init__(self, url):
+        super().__init__()
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+
+    def subscribe(self, performance_id):
+        with self._lock:
+            if self._listener is None:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(
+                    **{f"{self.channel_prefix}*": self._receive}
+                )
+                self._listener = pubsub.run_in_thread(
+                    sleep_time=1,
+                    daemon=True,
+                    exception_handler=self._listener_failed,
+                )
+        return super().subscribe(performance_id)
+
+    def _receive(self, message):
+        channel = message["channel"].decode()
+        event_type, data = json.loads(message["data"])
+        super().publish(
+            int(channel.removeprefix(self.channel_prefix)), event_type, data
+        )
+
+    def _listener_failed(self, error, pubsub, thread):
+        # The next read reconnects and subscribes again.
+        logger.warning("Seat events listener failed: %s", error)
+        time.sleep(self.retry_seconds)
+
+    def publish(self, performance_id, event_type, data):
+        self._client.publish(
+            f"{self.channel_prefix}{performance_id}",
+            json.dumps([event_type, data]),
+        )
+
+
+def create_broker():
+    url = settings.SEAT_EVENTS_REDIS_URL
+    if not url:
+        return SeatEventBroker()
+    if redis is None:
+        raise ImproperlyConfigured(
+            "SEAT_EVENTS_REDIS_URL requires the redis package."
+        )
+    return RedisSeatEventBroker(url)
+
+
+broker = create_broker()
+
+
+def publish_seat_changes(event_type, seats):
+    """
+    Publish ``(performance_id, row, seat)`` triples as one delta per
+    performance once the current transaction commits.
+    """
+    grouped = defaultdict(list)
+    for performance_id, row, seat in seats:
+        grouped[performance_id].append([row, seat])
+
+    def publish():
+        for performance_id, performance_seats in grouped.items():
+            broker.publish(
+                performance_id,
+                event_type,
+                {"performance": performance_id, "seats": performance_seats},
+            )
+
+    transaction.on_commit(publish)
@@ -0,0 +1,143 @@
+"""
+Streaming exports of sales and attendees.
+
+Rows are read with ``.iterator()`` and written ``CHUNK_SIZE`` at a time
+as JSON Lines or CSV, so memory use does not depend on the size of the
+export. Values JSON cannot represent are formatted by
+``DjangoJSONEncoder`` in both formats, e.g. ISO 8601 datetimes.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from theatre.analytics import occupancy_percent
+from theatre.transfer import batched
+
+CHUNK_SIZE = 2000
+# Spreadsheets evaluate CSV cells starting with these as formulas.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+EXPORT_FORMATS = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+PERFORMANCE_SALES_COLUMNS = (
+    "performance",
+    "play",
+    "play_title",
+    "theatre_hall",
+    "theatre_hall_name",
+    "show_time",
+    "duration",
+    "tickets_sold",
+    "capacity",
+    "occupancy",
+)
+ATTENDEE_COLUMNS = (
+    "ticket",
+    "reservation",
+    "reserved_at",
+    "email",
+    "first_name",
+    "last_name",
+    "performance",
+    "play_title",
+    "show_time",
+    "row",
+    "seat",
+)
+
+
+def performance_sales_rows(queryset):
+    """Sales of every performance, as tuples of the export columns."""
+    rows = (
+        queryset
+        .annotate(
+            capacity=(
+                F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+            )
+        )
+        .order_by("show_time", "id")
+        .values_list(
+            "id",
+            "play_id",
+            "play__title",
+            "theatre_hall_id",
+            "theatre_hall__name",
+            "show_time",
+            "duration",
+            "tickets_sold",
+            "capacity",
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for row in rows:
+        yield (*row, occupancy_percent(row[-2], row[-1]))
+
+
+def attendee_rows(queryset):
+    """Booked tickets with the customer who booked them."""
+    return (
+        queryset
+        .order_by("performance__show_time", "performance_id", "row", "seat")
+        .values_list(
+            "id",
+            "reservation_id",
+            "reservation__created_at",
+            "reservation__user__email",
+            "reservation__user__first_name",
+            "reservation__user__last_name",
+            "performance_id",
+            "performance__play__title",
+            "performance__show_time",
+            "row",
+            "seat",
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def jsonl_chunks(columns, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for batch in batched(rows, CHUNK_SIZE):
+        yield "".join(
+            encoder.encode(dict(zip(columns, row))) + "\n" for row in batch
+        )
+
+
+class _Buffer:
+    """Stand-in file for ``csv.writer`` returning what is written."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(columns, rows):
+    writer = csv.writer(_Buffer())
+    encoder = DjangoJSONEncoder()
+
+    def cell(value):
+        if value is None or isinstance(value, (int, float)):
+            return value
+        if not isinstance(value, str):
+            value = encoder.default(value)
+        if value.startswith(FORMULA_PREFIXES):
+            return f"'{value}"
+        return value
+
+    yield writer.writerow(columns)
+    for batch in batched(rows, CHUNK_SIZE):
+        yield "".join(
+            writer.writerow([cell(value) for value in row]) for row in batch
+        )
+
+
+def export_chunks(export_format, columns, rows):
+    """Encoded chunks of ``rows`` in ``export_format``."""
+    chunks = (jsonl_chunks if export_format == "jsonl" else csv_chunks)(
+        columns, rows
+    )
+    for chunk in chunks:
+        yield chunk.encode()
@@ -0,0 +1,296 @@
+"""
+Fast list serialization.
+
+``FastPerformanceList`` and ``FastPlayList`` build the output of
+``PerformanceListSerializer`` and ``PlayListSerializer`` from
+``values()`` rows instead of instantiating fields for every model
+instance. Values are still formatted by the ``to_representation()`` of
+the serializer's own fields, compiled once per request, so responses
+(including ``?fields=`` and ``?expand=``) are byte-for-byte the same.
+``FastJSONRenderer`` renders them with orjson when it is installed.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from rest_framework.relations import (
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    RelatedField,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from theatre.models import Actor, Genre, Performance
+
+try:
+    import orjson
+except ImportError:  # Optional, the standard library gives the same bytes.
+    orjson = None
+
+# JSONRenderer escapes these for JavaScript, orjson does not.
+LINE_SEPARATORS = (
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+
+def _identity(value):
+    return value
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Compact JSON like ``JSONRenderer``, encoded by orjson. Types orjson
+    does not handle the same way fall back to the DRF encoder, so only
+    use it for responses without floats, whose formatting may differ.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        content = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        for character, escaped in LINE_SEPARATORS:
+            content = content.replace(character, escaped)
+        return content
+
+
+class FastListSerializer:
+    """
+    Build list items from ``values()`` rows for the fields of a
+    serializer. ``columns`` maps every supported field to the columns
+    it is read from; a field read from several columns needs a
+    ``combine_<field>(values)`` method returning the value to format.
+    """
+
+    columns = {}
+    # Fields the serializer skips because the rows never have them.
+    skipped_fields = ()
+
+    def __init__(self, serializer):
+        self.names = [
+            name for name in serializer.fields
+            if name not in self.skipped_fields
+        ]
+        self.fields = {name: serializer.fields[name] for name in self.names}
+
+    @classmethod
+    def supports(cls, serializer):
+        return all(
+            name in cls.columns or name in cls.skipped_fields
+            for name in serializer.fields
+        )
+
+    def value_columns(self):
+        return [
+            column
+            for name in self.names
+            if name in self.columns
+            for column in self.columns[name]
+        ]
+
+    def _converter(self, name):
+        field = self.fields[name]
+        if isinstance(field, RelatedField):
+            # Rows hold the primary key already.
+            return _identity
+        combine = getattr(self, f"combine_{name}", None)
+        if combine is None:
+            return field.to_representation
+        return lambda values: field.to_representation(combine(values))
+
+    def compile(self):
+        """Return a function building the item of one row."""
+        extractors = [
+            (name, itemgetter(*self.columns[name]), self._converter(name))
+            for name in self.names
+            if name in self.columns
+        ]
+
+        def build(row):
+            item = {}
+            for name, get, convert in extractors:
+                value = get(row)
+                item[name] = None if value is None else convert(value)
+            return item
+
+        return build
+
+    def serialize(self, rows):
+        build = self.compile()
+        return [build(row) for row in rows]
+
+
+class FastPerformanceList(FastListSerializer):
+    columns = {
+        "id": ("id",),
+        "theatre_hall_name": ("theatre_hall__name",),
+        "theatre_hall_capacity": (
+            "theatre_hall__rows", "theatre_hall__seats_in_row"
+        ),
+        "show_time": ("show_time",),
+        "duration": ("duration",),
+        "tickets_available": ("tickets_available",),
+        "play": ("play_id",),
+    }
+
+    def combine_theatre_hall_capacity(self, values):
+        rows, seats_in_row = values
+        return rows * seats_in_row
+
+
+class NestedPerformanceList(FastPerformanceList):
+    # Prefetched performances have no tickets_available annotation.
+    skipped_fields = ("tickets_available",)
+
+
+class FastPlayList(FastListSerializer):
+    columns = {
+        "id": ("id",),
+        "title": ("title",),
+        "description": ("description",),
+        "image_renditions": ("image_renditions",),
+    }
+    relations = ("actors", "genres", "performances")
+
+    def __init__(self, serializer):
+        super().__init__(serializer)
+        self.relation_fields = {
+            name: field
+            for name, field in self.fields.items()
+            if name in self.relations
+        }
+
+    @classmethod
+    def supports(cls, serializer):
+        fields = serializer.fields
+        performances = fields.get("performances")
+        return all(
+            name in cls.columns or name in cls.relations for name in fields
+        ) and (
+            performances is None
+            or isinstance(performances, ManyRelatedField)
+            or NestedPerformanceList.supports(performances.child)
+        )
+
+    def value_columns(self):
+        return ["id", *super().value_columns()]
+
+    @staticmethod
+    def _group(rows):
+        grouped = defaultdict(list)
+        for play_id, value in rows:
+            grouped[play_id].append(value)
+        return grouped
+
+    # The queries below filter and order like the prefetches of
+    # PlayViewSet, so related items come in the same order.
+
+    def _genres(self, play_ids, expanded):
+        return self._group(
+            Genre
+            .objects
+            .filter(plays__in=play_ids)
+            .values_list("plays", "name" if expanded else "id")
+        )
+
+    def _actors(self, play_ids, expanded):
+        if not expanded:
+            return self._group(
+                Actor.objects.filter(plays__in=play_ids).values_list(
+                    "plays", "id"
+                )
+            )
+        # Actor.full_name
+        return self._group(
+            (play_id, f"{first_name} {last_name}")
+            for play_id, first_name, last_name in Actor.objects.filter(
+                plays__in=play_ids
+            ).values_list("plays", "first_name", "last_name")
+        )
+
+    def _performances(self, play_ids, expanded):
+        performances = Performance.objects.filter(play__in=play_ids)
+        if not expanded:
+            return self._group(performances.values_list("play", "id"))
+
+        nested = NestedPerformanceList(
+            self.relation_fields["performances"].child
+        )
+        build = nested.compile()
+        return self._group(
+            (row["play_id"], build(row))
+            for row in performances.values(
+                "play_id", *nested.value_columns()
+            )
+        )
+
+    def serialize(self, rows):
+        items = super().serialize(rows)
+        play_ids = [row["id"] for row in rows]
+        if not play_ids:
+            return items
+
+        for name, field in self.relation_fields.items():
+            expanded = not (
+                isinstance(field, ManyRelatedField)
+                and isinstance(field.child_relation, PrimaryKeyRelatedField)
+            )
+            related = getattr(self, f"_{name}")(play_ids, expanded)
+            for item, play_id in zip(items, play_ids):
+                item[name] = related.get(play_id, [])
+
+        # Keep the field order of the serializer.
+        return [{name: item[name] for name in self.names} for item in items]
+
+
+class FastListMixin:
+    """
+    Serve JSON ``list`` responses through ``fast_list_class`` when it
+    supports every field of the list serializer. Other formats, like
+    the browsable API, use the serializer.
+    """
+
+    fast_list_class = None
+
+    def list(self, request, *args, **kwargs):
+        if (
+            not settings.FAST_LIST_SERIALIZATION
+            or request.accepted_renderer.format != "json"
+        ):
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.get_serializer(many=True).child
+        if not self.fast_list_class.supports(serializer):
+            return super().list(request, *args, **kwargs)
+        fast_list = self.fast_list_class(serializer)
+
+        # The related rows are read by the fast list itself.
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(
+            None
+        )
+        columns = fast_list.value_columns()
+        if self.paginator is not None:
+            # Cursors are read from the ordering columns of the rows.
+            columns += [
+                name.lstrip("-")
+                for name in self.paginator.get_ordering(
+                    request, queryset, self
+                )
+            ]
+        rows = queryset.values(*dict.fromkeys(columns))
+
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(fast_list.serialize(rows))
+        return self.get_paginated_response(fast_list.serialize(page))
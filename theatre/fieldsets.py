@@ -0,0 +1,69 @@
+"""
+Sparse fieldsets for safe requests.
+
+``?fields=id,title`` keeps only the listed fields of the returned
+objects. ``?expand=genres`` embeds only the listed relations of a
+serializer's ``collapsed_fields``; the others are rendered as primary
+keys. Without ``expand`` every relation is embedded, as before. Views
+use ``is_requested()`` and ``is_expanded()`` to skip the joins and
+prefetches of fields that are not rendered.
+"""
+from functools import partial
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+primary_keys = partial(
+    serializers.PrimaryKeyRelatedField, read_only=True, many=True
+)
+primary_key = partial(serializers.PrimaryKeyRelatedField, read_only=True)
+
+
+def _names(request, param):
+    """Comma-separated names of a query parameter, ``None`` if absent."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def is_requested(request, name):
+    names = _names(request, FIELDS_PARAM)
+    return names is None or name in names
+
+
+def is_expanded(request, name):
+    names = _names(request, EXPAND_PARAM)
+    return is_requested(request, name) and (names is None or name in names)
+
+
+class SparseFieldsetMixin:
+    """
+    Apply ``?fields=`` and ``?expand=`` to a serializer used for the
+    response itself, not to serializers nested in it.
+
+    ``collapsed_fields`` maps embedded relations to factories of the
+    field rendering them when they are not expanded.
+    """
+
+    collapsed_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.root not in (self, self.parent):
+            return fields
+
+        request = self.context.get("request")
+        for name in list(fields):
+            if not is_requested(request, name):
+                del fields[name]
+            elif name in self.collapsed_fields and not is_expanded(
+                request, name
+            ):
+                fields[name] = self.collapsed_fields[name]()
+        return fields
@@ -1,3 +1,6 @@
+import datetime
+
+from django.utils import timezone
 from django_filters import (
     rest_framework as
     filters,
@@ -5,32 +8,112 @@ from django_filters import (
     NumberFilter
 )
 
+from theatre.search import search_plays
+
 
 class NumberInFilter(BaseInFilter, NumberFilter):
     pass
 
 
 class PlayFilterSet(filters.FilterSet):
+    q = filters.CharFilter(method="filter_search")  # noqa: VNE001
     title = filters.CharFilter(field_name="title", lookup_expr="icontains")
     genres = NumberInFilter(field_name="genres__id", lookup_expr="in")
     actors = NumberInFilter(field_name="actors__id", lookup_expr="in")
 
+    def filter_search(self, queryset, name, value):
+        return search_plays(queryset, value)
+
+
+def upcoming_performances(queryset, now=None):
+    """
+    Performances that have not started yet. ``is_archived`` matches the
+    condition of the partial index on upcoming performances.
+    """
+    return queryset.filter(
+        show_time__gte=now or timezone.now(), is_archived=False
+    )
+
+
+class HallScopedFilterSet(filters.FilterSet):
+    """Limit hall overseers to rows of their own theatre hall."""
 
-class PerformanceFilterSet(filters.FilterSet):
-    date = filters.DateFilter(field_name="show_time__date")
-    play = filters.NumberFilter(field_name="play__id")
-    hall = filters.NumberFilter(field_name="theatre_hall__id")
+    hall_field = "theatre_hall_id"
 
     @property
     def qs(self):
         parent = super().qs
         user = getattr(self.request, "user", None)
 
-        if user and user.theatre_hall:
-            parent = parent.filter(theatre_hall=user.theatre_hall)
+        hall_id = getattr(user, "theatre_hall_id", None)
+        if hall_id:
+            parent = parent.filter(**{self.hall_field: hall_id})
         return parent
 
 
+def add_range_filters(filterset_class, field_name):
+    """
+    Add ``from`` (inclusive) and ``to`` (exclusive) datetime filters on
+    ``field_name``. "from" is a keyword, so they cannot be declared in
+    the class body.
+    """
+    filterset_class.base_filters.update(
+        {
+            "from": filters.IsoDateTimeFilter(
+                field_name=field_name, lookup_expr="gte"
+            ),
+            "to": filters.IsoDateTimeFilter(
+                field_name=field_name, lookup_expr="lt"
+            ),
+        }
+    )
+
+
+class PerformanceFilterSet(HallScopedFilterSet):
+    # Show time filters are ranges on the column, so they can use the
+    # (show_time), (play, show_time) and (theatre_hall, show_time) indexes.
+    date = filters.DateFilter(method="filter_date")
+    upcoming = filters.BooleanFilter(method="filter_upcoming")
+    play = filters.NumberFilter(field_name="play_id")
+    hall = filters.NumberFilter(field_name="theatre_hall_id")
+
+    def filter_date(self, queryset, name, value):
+        start = datetime.datetime.combine(
+            value, datetime.time.min, tzinfo=timezone.get_current_timezone()
+        )
+        return queryset.filter(
+            show_time__gte=start,
+            show_time__lt=start + datetime.timedelta(days=1),
+        )
+
+    def filter_upcoming(self, queryset, name, value):
+        if value:
+            return upcoming_performances(queryset)
+        return queryset
+
+
+add_range_filters(PerformanceFilterSet, "show_time")
+
+
+class SalesFilterSet(HallScopedFilterSet):
+    play = filters.NumberFilter(field_name="play_id")
+    hall = filters.NumberFilter(field_name="theatre_hall_id")
+
+
+add_range_filters(SalesFilterSet, "hour")
+
+
+class AttendeeFilterSet(HallScopedFilterSet):
+    hall_field = "performance__theatre_hall_id"
+
+    performance = filters.NumberFilter(field_name="performance_id")
+    play = filters.NumberFilter(field_name="performance__play_id")
+    hall = filters.NumberFilter(field_name="performance__theatre_hall_id")
+
+
+add_range_filters(AttendeeFilterSet, "performance__show_time")
+
+
 class GenreFilterSet(filters.FilterSet):
     name = filters.CharFilter(field_name="name", lookup_expr="icontains")
 
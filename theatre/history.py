@@ -0,0 +1,64 @@
+from theatre.models import Reservation, Ticket
+
+HISTORY_TICKET_FIELDS = (
+    "reservation_id",
+    "performance_id",
+    "performance__show_time",
+    "performance__play__title",
+    "performance__theatre_hall__name",
+    "row",
+    "seat",
+)
+
+
+def reservation_rows(user_id):
+    """Reservations of a user as plain rows, ready for pagination."""
+    return Reservation.objects.filter(user_id=user_id).values(
+        "id", "created_at"
+    )
+
+
+def attach_tickets(reservations):
+    """
+    Add a ``performances`` list to every reservation row, with the play
+    title, show time, hall and seats of each booked performance.
+
+    Tickets of all given reservations are read in one joined query as
+    tuples, so no model instances are built.
+    """
+    by_id = {}
+    for reservation in reservations:
+        by_id[reservation["id"]] = {}
+
+    for (
+        reservation_id,
+        performance_id,
+        show_time,
+        play_title,
+        theatre_hall,
+        row,
+        seat,
+    ) in (
+        Ticket
+        .objects
+        .filter(reservation_id__in=by_id)
+        .order_by(
+            "reservation_id", "performance__show_time", "row", "seat"
+        )
+        .values_list(*HISTORY_TICKET_FIELDS)
+    ):
+        performances = by_id[reservation_id]
+        performance = performances.get(performance_id)
+        if performance is None:
+            performance = performances[performance_id] = {
+                "performance": performance_id,
+                "play_title": play_title,
+                "show_time": show_time,
+                "theatre_hall": theatre_hall,
+                "seats": [],
+            }
+        performance["seats"].append({"row": row, "seat": seat})
+
+    for reservation in reservations:
+        reservation["performances"] = list(by_id[reservation["id"]].values())
+    return reservations
@@ -0,0 +1,66 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from theatre.booking import (
+    SeatConflictError,
+    exact_seats_q,
+    find_seat_conflicts,
+    lock_performances,
+    seat_errors,
+)
+from theatre.models import SeatHold
+
+
+def hold_ttl():
+    return datetime.timedelta(seconds=settings.SEAT_HOLD_TTL_SECONDS)
+
+
+def hold_seats(user, performance, seats):
+    """
+    Hold ``(row, seat)`` pairs of a performance for ``user``.
+
+    Holds the user already has on these seats are extended. Raises
+    ``SeatConflictError`` if any seat is sold or held by someone else.
+    """
+    now = timezone.now()
+    tickets_data = [
+        {"performance": performance, "row": row, "seat": seat}
+        for row, seat in seats
+    ]
+    with transaction.atomic():
+        lock_performances([performance.id])
+        SeatHold.objects.filter(
+            performance=performance, expires_at__lte=now
+        ).delete()
+
+        conflicts = find_seat_conflicts(tickets_data, user)
+        if conflicts:
+            raise SeatConflictError(seat_errors(tickets_data, conflicts))
+
+        SeatHold.objects.filter(
+            exact_seats_q(
+                (performance.id, row, seat) for row, seat in seats
+            ),
+            user=user,
+        ).delete()
+        return SeatHold.objects.bulk_create(
+            SeatHold(
+                performance=performance,
+                user=user,
+                row=row,
+                seat=seat,
+                expires_at=now + hold_ttl(),
+            )
+            for row, seat in seats
+        )
+
+
+def sweep_expired_holds(now=None):
+    """Delete expired holds and return how many were removed."""
+    deleted, _ = SeatHold.objects.filter(
+        expires_at__lte=now or timezone.now()
+    ).delete()
+    return deleted
@@ -0,0 +1,167 @@
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = "uploads/renditions"
+# Largest first, every rendition is resized from the previous one.
+RENDITION_SIZES = {
+    "full": (1600, 1600),
+    "card": (480, 480),
+    "thumbnail": (160, 160),
+}
+RENDITION_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_RENDITION_WORKERS,
+            thread_name_prefix="image-renditions",
+        )
+    return _executor
+
+
+def rendition_name(digest, rendition, extension):
+    """
+    Storage name of a rendition, derived from the source content so an
+    unchanged image always maps to the same (cacheable) files.
+    """
+    return (
+        f"{RENDITIONS_DIR}/{digest[:2]}/{digest}-{rendition}.{extension}"
+    )
+
+
+def _encode(image, image_format, options):
+    if image_format == "JPEG" and image.mode != "RGB":
+        background = Image.new("RGB", image.size, "white")
+        if image.mode in ("RGBA", "LA"):
+            background.paste(image, mask=image.getchannel("A"))
+        else:
+            background.paste(image.convert("RGB"))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def create_renditions(image_file):
+    """
+    Write resized WebP and JPEG renditions of ``image_file`` and return
+    ``{rendition: {format: storage name}}``. Files already stored for
+    the same content are reused.
+    """
+    image_file.open("rb")
+    try:
+        content = image_file.read()
+    finally:
+        image_file.close()
+    digest = hashlib.sha256(content).hexdigest()[:32]
+
+    names = {
+        rendition: {
+            extension: rendition_name(digest, rendition, extension)
+            for extension in RENDITION_FORMATS
+        }
+        for rendition in RENDITION_SIZES
+    }
+    if all(
+        default_storage.exists(name)
+        for formats in names.values()
+        for name in formats.values()
+    ):
+        return names
+
+    with Image.open(io.BytesIO(content)) as source:
+        # Let the JPEG decoder downscale while decoding when possible.
+        source.draft("RGB", RENDITION_SIZES["full"])
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert(
+                "RGBA" if "transparency" in image.info else "RGB"
+            )
+
+        for rendition, size in RENDITION_SIZES.items():
+            image = image.copy()
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+            for extension, (image_format, options) in (
+                RENDITION_FORMATS.items()
+            ):
+                name = names[rendition][extension]
+                if not default_storage.exists(name):
+                    default_storage.save(
+                        name,
+                        ContentFile(_encode(image, image_format, options)),
+                    )
+    return names
+
+
+def process_image(instance):
+    """Create renditions for ``instance.image`` and store their names."""
+    if instance.image:
+        renditions = create_renditions(instance.image)
+    else:
+        renditions = {}
+    if renditions != instance.image_renditions:
+        instance.image_renditions = renditions
+        instance.save(update_fields=["image_renditions"])
+
+
+def _process_in_background(model_label, pk):
+    close_old_connections()
+    try:
+        instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+        if instance is not None:
+            process_image(instance)
+    except Exception:
+        logger.exception(
+            "Failed to create image renditions for %s %s", model_label, pk
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(instance):
+    """
+    Create renditions of a newly uploaded image once the upload is
+    committed, in a thread pool unless ``IMAGE_RENDITIONS_ASYNC`` is off.
+    ``process_images`` picks up images missed by a restart.
+    """
+    model_label = instance._meta.label
+    pk = instance.pk
+
+    def run():
+        if settings.IMAGE_RENDITIONS_ASYNC:
+            _get_executor().submit(_process_in_background, model_label, pk)
+        else:
+            process_image(instance)
+
+    transaction.on_commit(run)
+
+
+def rendition_urls(renditions, request=None):
+    """Map stored rendition names to (absolute) URLs."""
+    urls = {}
+    for rendition, formats in renditions.items():
+        urls[rendition] = {}
+        for extension, name in formats.items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[rendition][extension] = url
+    return urls
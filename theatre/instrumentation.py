@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from rest_framework.renderers import BaseRenderer
+
+DURATION_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICS = {
+    "theatre_request_duration_seconds": (
+        "Time spent handling the request",
+        DURATION_BUCKETS,
+    ),
+    "theatre_db_queries": (
+        "SQL queries executed per request",
+        QUERY_BUCKETS,
+    ),
+    "theatre_db_duration_seconds": (
+        "Time spent in SQL queries per request",
+        DURATION_BUCKETS,
+    ),
+    "theatre_view_cpu_seconds": (
+        "Time spent from calling the view to the rendered response "
+        "outside of SQL queries: authentication, throttling, "
+        "permissions, filtering, serialization and rendering",
+        DURATION_BUCKETS,
+    ),
+    "theatre_response_size_bytes": (
+        "Size of the response body",
+        SIZE_BUCKETS,
+    ),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return (
+        value
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    In-process histograms of request metrics labelled by view.
+
+    Every worker process keeps its own registry, so a scraper sees the
+    metrics of the process that answered it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = {}
+
+    def observe(self, view, status_code, values):
+        with self._lock:
+            for name, value in values.items():
+                histogram = self._histograms.get((name, view))
+                if histogram is None:
+                    histogram = self._histograms[(name, view)] = Histogram(
+                        METRICS[name][1]
+                    )
+                histogram.observe(value)
+            key = (view, status_code)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (description, buckets) in METRICS.items():
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, view), histogram in sorted(
+                    self._histograms.items()
+                ):
+                    if metric != name:
+                        continue
+                    label = f'view="{_escape(view)}"'
+                    cumulative = 0
+                    for bound, count in zip(
+                        (*buckets, "+Inf"), histogram.counts
+                    ):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} '
+                            f"{cumulative}"
+                        )
+                    lines.append(
+                        f"{name}_sum{{{label}}} "
+                        f"{_format_number(histogram.sum)}"
+                    )
+                    lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+            lines.append(
+                "# HELP theatre_responses_total Responses by view and status"
+            )
+            lines.append("# TYPE theatre_responses_total counter")
+            for (view, status_code), count in sorted(
+                self._responses.items()
+            ):
+                lines.append(
+                    f'theatre_responses_total{{view="{_escape(view)}",'
+                    f'status="{status_code}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "txt"  # noqa: VNE003
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode(self.charset) if isinstance(data, str) else data
+
+
+def view_name(request):
+    """
+    Name the view that handled ``request`` like ``ViewSet.action``, e.g.
+    ``PerformanceViewSet.list``.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    view = getattr(match.func, "cls", None) or getattr(
+        match.func, "view_class", None
+    )
+    if view is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, "actions", None)
+    method = request.method.lower()
+    action = actions.get(method, method) if actions else method
+    return f"{view.__name__}.{action}"
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their total time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count, database time, view time and response size of
+    every request into ``registry``, labelled by view.
+
+    View time is the time between the view being called and the
+    response being rendered, minus the SQL time in that window. It
+    covers everything DRF does for the request, cache and throttle I/O
+    included, not serialization alone; it costs two clock reads rather
+    than hooks into every serializer.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = request._query_timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(timer)
+                )
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        # Requests that never reach a view (404, redirects) count as
+        # having no view time.
+        view_started, view_db_duration = getattr(
+            request, "_view_started", (finished, timer.duration)
+        )
+        values = {
+            "theatre_request_duration_seconds": finished - started,
+            "theatre_db_queries": timer.count,
+            "theatre_db_duration_seconds": timer.duration,
+            "theatre_view_cpu_seconds": max(
+                0.0,
+                finished - view_started
+                - (timer.duration - view_db_duration),
+            ),
+        }
+        if not response.streaming:
+            values["theatre_response_size_bytes"] = len(response.content)
+
+        registry.observe(view_name(request), response.status_code, values)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_started = (
+            time.perf_counter(),
+            request._query_timer.duration,
+        )
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from theatre.scheduling import archive_past_performances
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive performances that have started, keeping the index of "
+        "upcoming performances small"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep archiving every N seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            archived, restored = archive_past_performances()
+            self.stdout.write(
+                f"Archived {archived} performances, "
+                f"restored {restored} rescheduled ones"
+            )
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,280 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.cache import shared_cache
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+from user.authentication import CachedJWTAuthentication
+
+AUTHENTICATION_CLASSES = {
+    "jwt": JWTAuthentication,
+    "cached-jwt": CachedJWTAuthentication,
+}
+DATASET_MODELS = (
+    Actor, Genre, Play, TheatreHall, Performance, Reservation, Ticket
+)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        index - lower
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every theatre and user endpoint through the test "
+        "client and report p50/p95 latency, SQL query count and peak "
+        "memory. Use generate_theatre_data first for realistic volumes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Timed requests per endpoint",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=2,
+            help="Untimed requests per endpoint before measuring",
+        )
+        parser.add_argument(
+            "--email",
+            help="User to authenticate as, defaults to the user with "
+                 "the most reservations",
+        )
+        parser.add_argument(
+            "--auth",
+            choices=("force", *AUTHENTICATION_CLASSES),
+            default="force",
+            help="force skips authentication, jwt and cached-jwt send a "
+                 "Bearer token so auth queries are measured too",
+        )
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            help="Benchmark only these endpoint names",
+        )
+        parser.add_argument(
+            "--cold-cache",
+            action="store_true",
+            help="Clear the shared cache before every request",
+        )
+        parser.add_argument("--output", help="Write results to this file")
+        parser.add_argument(
+            "--compare",
+            help="Results file of a previous run to compare with",
+        )
+
+    def _get_user(self, email):
+        users = get_user_model().objects.filter(
+            is_active=True, is_email_verified=True
+        )
+        if email:
+            user = users.filter(email=email).first()
+        else:
+            user = (
+                users
+                .annotate(reservation_count=Count("reservations"))
+                .order_by("-reservation_count", "id")
+                .first()
+            )
+        if user is None:
+            raise CommandError(
+                "No active user with a verified email to authenticate as"
+            )
+        return user
+
+    @staticmethod
+    def _endpoints():
+        play = Play.objects.order_by("id").first()
+        performance = Performance.objects.order_by("id").first()
+        word = play.title.split()[0] if play else "play"
+
+        endpoints = {
+            "actors": reverse("theatre:actor-list"),
+            "genres": reverse("theatre:genre-list"),
+            "plays": reverse("theatre:play-list"),
+            "plays_search": f"{reverse('theatre:play-list')}?q={word}",
+            "theatre_halls": reverse("theatre:theatrehall-list"),
+            "performances": reverse("theatre:performance-list"),
+            "reservations": reverse("theatre:reservation-list"),
+            "seat_holds": reverse("theatre:seat-hold-list"),
+            "user_me": reverse("user:manage"),
+        }
+        if play:
+            endpoints["play_detail"] = reverse(
+                "theatre:play-detail", kwargs={"pk": play.id}
+            )
+        if performance:
+            endpoints["performance_detail"] = reverse(
+                "theatre:performance-detail", kwargs={"pk": performance.id}
+            )
+            endpoints["performance_seat_map"] = reverse(
+                "theatre:performance-seat-map", kwargs={"pk": performance.id}
+            )
+        return endpoints
+
+    def _measure(self, client, url, options):
+        for _ in range(options["warmup"]):
+            if options["cold_cache"]:
+                shared_cache.clear()
+            client.get(url)
+
+        durations = []
+        for _ in range(options["repeat"]):
+            if options["cold_cache"]:
+                shared_cache.clear()
+            started = time.perf_counter()
+            response = client.get(url)
+            durations.append(time.perf_counter() - started)
+
+        # Queries and memory come from one extra request, because
+        # tracing allocations would distort the timed ones.
+        if options["cold_cache"]:
+            shared_cache.clear()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "url": url,
+            "status": response.status_code,
+            "p50_ms": round(percentile(durations, 50) * 1000, 3),
+            "p95_ms": round(percentile(durations, 95) * 1000, 3),
+            "mean_ms": round(statistics.mean(durations) * 1000, 3),
+            "queries": len(ctx.captured_queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+            "response_bytes": len(response.content),
+        }
+
+    def _compare(self, results, path):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)["endpoints"]
+
+        self.stdout.write(f"\nCompared with {path}:")
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            change = (
+                (result["p95_ms"] - previous["p95_ms"])
+                / previous["p95_ms"] * 100
+                if previous["p95_ms"]
+                else 0
+            )
+            self.stdout.write(
+                f"{name:<22} "
+                f"p95 {previous['p95_ms']:.2f} -> {result['p95_ms']:.2f}ms "
+                f"({change:+.1f}%) "
+                f"queries {previous['queries']} -> {result['queries']}"
+            )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        user = self._get_user(options["email"])
+        client = APIClient(SERVER_NAME="localhost")
+        stack = ExitStack()
+        if options["auth"] == "force":
+            client.force_authenticate(user)
+        else:
+            client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+            )
+            stack.enter_context(
+                patch.object(
+                    APIView,
+                    "authentication_classes",
+                    [AUTHENTICATION_CLASSES[options["auth"]]],
+                )
+            )
+
+        endpoints = self._endpoints()
+        if options["only"]:
+            unknown = set(options["only"]) - set(endpoints)
+            if unknown:
+                raise CommandError(
+                    f"Unknown endpoints: {', '.join(sorted(unknown))}"
+                )
+            endpoints = {
+                name: url
+                for name, url in endpoints.items()
+                if name in options["only"]
+            }
+
+        results = {}
+        # Rate limits would turn most of the run into 429 responses.
+        stack.enter_context(
+            patch.object(APIView, "check_throttles", lambda *args: None)
+        )
+        with stack:
+            for name, url in endpoints.items():
+                result = results[name] = self._measure(client, url, options)
+                self.stdout.write(
+                    f"{name:<22} "
+                    f"status={result['status']} "
+                    f"p50={result['p50_ms']:.2f}ms "
+                    f"p95={result['p95_ms']:.2f}ms "
+                    f"queries={result['queries']:<3} "
+                    f"peak={result['peak_memory_kb']:.0f}KB"
+                )
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "user": user.email,
+            "auth": options["auth"],
+            "repeat": options["repeat"],
+            "cold_cache": options["cold_cache"],
+            "dataset": {
+                model._meta.model_name: model.objects.count()
+                for model in DATASET_MODELS
+            },
+            "endpoints": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"Results saved to {options['output']}")
+            )
+        if options["compare"]:
+            self._compare(results, options["compare"])
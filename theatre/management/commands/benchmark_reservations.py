@@ -0,0 +1,91 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from theatre.models import Performance, Play, TheatreHall
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure query count and latency of POST /reservations/ "
+        "for different numbers of seats. All data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seats",
+            nargs="+",
+            type=int,
+            default=[1, 10, 100],
+            help="Seats per reservation to benchmark",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Reservations to create for each seat count",
+        )
+
+    def handle(self, *args, **options):
+        seats_in_row = 20
+        rows = max(1, -(-max(options["seats"]) // seats_in_row))
+
+        with transaction.atomic():
+            hall = TheatreHall.objects.create(
+                name="Benchmark hall", rows=rows, seats_in_row=seats_in_row
+            )
+            play = Play.objects.create(
+                title="Benchmark play", description="Benchmark"
+            )
+            user = get_user_model().objects.create_user(
+                "benchmark-reservations@example.com",
+                is_staff=True,
+                is_email_verified=True,
+            )
+            client = APIClient(SERVER_NAME="localhost")
+            client.force_authenticate(user)
+            url = reverse("theatre:reservation-list")
+
+            for seats in options["seats"]:
+                durations, query_counts = [], []
+                for _ in range(options["repeat"]):
+                    performance = Performance.objects.create(
+                        play=play, theatre_hall=hall, show_time=timezone.now()
+                    )
+                    payload = {
+                        "created_at": timezone.now(),
+                        "user": user.id,
+                        "tickets": [
+                            {
+                                "row": index // seats_in_row + 1,
+                                "seat": index % seats_in_row + 1,
+                                "performance": performance.id,
+                            }
+                            for index in range(seats)
+                        ],
+                    }
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        response = client.post(url, payload, format="json")
+                        durations.append(time.perf_counter() - started)
+                    if response.status_code != 201:
+                        self.stderr.write(str(response.data))
+                        transaction.set_rollback(True)
+                        return
+                    query_counts.append(len(ctx.captured_queries))
+
+                self.stdout.write(
+                    f"seats={seats:<4} "
+                    f"queries={max(query_counts):<3} "
+                    f"mean={statistics.mean(durations) * 1000:.2f}ms "
+                    f"max={max(durations) * 1000:.2f}ms"
+                )
+
+            transaction.set_rollback(True)
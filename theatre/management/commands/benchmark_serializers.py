@@ -0,0 +1,112 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from theatre.fastpath import (
+    FastJSONRenderer,
+    FastPerformanceList,
+    FastPlayList,
+)
+from theatre.models import Performance, Play
+from theatre.serializers import PerformanceListSerializer, PlayListSerializer
+from theatre.views import TICKETS_AVAILABLE
+
+
+def _performances():
+    return (
+        Performance
+        .objects
+        .select_related("theatre_hall")
+        .annotate(tickets_available=TICKETS_AVAILABLE)
+    )
+
+
+def _plays():
+    return Play.objects.prefetch_related(
+        "genres", "actors", "performances__theatre_hall"
+    )
+
+
+LISTS = {
+    "performances": (
+        _performances, PerformanceListSerializer, FastPerformanceList
+    ),
+    "plays": (_plays, PlayListSerializer, FastPlayList),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows per second of the list serializers plus "
+        "JSONRenderer with the fast list path plus FastJSONRenderer, "
+        "from queryset to response bytes. Use generate_theatre_data "
+        "first for realistic volumes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1000,
+            help="Rows serialized per run",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per list, the best one is reported",
+        )
+        parser.add_argument(
+            "--only",
+            choices=LISTS,
+            nargs="+",
+            help="Benchmark only these lists",
+        )
+
+    @staticmethod
+    def _best_of(repeat, run):
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = run()
+            durations.append(time.perf_counter() - started)
+        return min(durations), content
+
+    def handle(self, *args, **options):
+        if options["rows"] < 1 or options["repeat"] < 1:
+            raise CommandError("--rows and --repeat must be at least 1")
+
+        context = {"request": Request(APIRequestFactory().get("/"))}
+        for name in options["only"] or LISTS:
+            get_queryset, serializer_class, fast_list_class = LISTS[name]
+
+            def serializer_run():
+                queryset = get_queryset()[:options["rows"]]
+                data = serializer_class(
+                    queryset, many=True, context=context
+                ).data
+                return JSONRenderer().render(data)
+
+            def fast_run():
+                fast_list = fast_list_class(
+                    serializer_class(context=context)
+                )
+                rows = get_queryset().values(*fast_list.value_columns())
+                data = fast_list.serialize(rows[:options["rows"]])
+                return FastJSONRenderer().render(data)
+
+            before, expected = self._best_of(
+                options["repeat"], serializer_run
+            )
+            after, content = self._best_of(options["repeat"], fast_run)
+            rows = len(get_queryset()[:options["rows"]])
+            self.stdout.write(
+                f"{name:<13} rows={rows:<6} "
+                f"serializer={rows / before:,.0f} rows/s "
+                f"fast={rows / after:,.0f} rows/s "
+                f"speedup={before / after:.1f}x "
+                f"identical={content == expected}"
+            )
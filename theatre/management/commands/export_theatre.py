@@ -0,0 +1,90 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from theatre.transfer import (
+    MODELS,
+    TransferStats,
+    export_records,
+    write_csv,
+    write_jsonl,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream theatre data (users, catalog, performances, reservations "
+        "and tickets) to JSON Lines or CSV in chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output",
+            help="JSON Lines file (- for stdout) or, for CSV, a directory",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("jsonl", "csv"),
+            default="jsonl",
+        )
+        parser.add_argument(
+            "--models",
+            nargs="+",
+            choices=list(MODELS),
+            default=list(MODELS),
+            help="Models to export, all by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--passwords",
+            action="store_true",
+            help="Include password hashes, so imported users can log in",
+        )
+
+    def _export(self, model, stream, options, stats):
+        records = export_records(
+            model, options["batch_size"], options["passwords"]
+        )
+        if options["format"] == "csv":
+            records = write_csv(records, stream, model, options["passwords"])
+        else:
+            records = write_jsonl(records, stream)
+        count = sum(1 for _ in records)
+        stats.add(model._meta.label_lower, count)
+
+    def handle(self, *args, **options):
+        models = [
+            model for label, model in MODELS.items()
+            if label in options["models"]
+        ]
+        stats = TransferStats()
+        output = options["output"]
+
+        if options["format"] == "csv":
+            if output == "-":
+                raise CommandError("CSV exports need an output directory")
+            os.makedirs(output, exist_ok=True)
+            for model in models:
+                path = os.path.join(
+                    output, f"{model._meta.label_lower}.csv"
+                )
+                with open(path, "w", newline="") as stream:
+                    self._export(model, stream, options, stats)
+        elif output == "-":
+            for model in models:
+                self._export(model, sys.stdout, options, stats)
+        else:
+            with open(output, "w") as stream:
+                for model in models:
+                    self._export(model, stream, options, stats)
+
+        # Keep stdout clean when it carries the export itself.
+        report = self.stderr if output == "-" else self.stdout
+        for label, count in stats.rows.items():
+            report.write(f"{label}: {count} rows")
+        report.write(
+            f"Exported {stats.total_rows} rows "
+            f"({stats.rows_per_second:.0f} rows/s), "
+            f"peak memory {stats.peak_memory_kb()} KB"
+        )
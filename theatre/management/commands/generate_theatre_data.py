@@ -0,0 +1,332 @@
+import datetime
+import random
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+from theatre.scheduling import archive_past_performances
+from theatre.seat_map import SeatMap
+from theatre.signals import invalidate_catalog_caches
+
+WORDS = (
+    "love", "war", "king", "queen", "storm", "night", "dream", "winter",
+    "summer", "ghost", "prince", "garden", "city", "sea", "fire", "song",
+    "shadow", "river", "glass", "crown", "house", "letter", "island",
+    "promise", "revenge", "comedy", "tragedy", "family", "secret", "road",
+)
+GENRES = (
+    "Drama", "Comedy", "Tragedy", "Musical", "Opera", "Ballet",
+    "Farce", "Satire", "Melodrama", "Pantomime",
+)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic theatre data with bulk inserts for "
+        "benchmarks: halls, actors, genres, plays with their actors "
+        "and genres, performances, users, reservations and tickets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--halls", type=int, default=20)
+        parser.add_argument("--rows", type=int, default=20)
+        parser.add_argument("--seats-in-row", type=int, default=30)
+        parser.add_argument("--actors", type=int, default=2000)
+        parser.add_argument("--genres", type=int, default=len(GENRES))
+        parser.add_argument("--plays", type=int, default=1000)
+        parser.add_argument(
+            "--actors-per-play",
+            type=int,
+            default=8,
+            help="Maximum actors per play",
+        )
+        parser.add_argument(
+            "--genres-per-play",
+            type=int,
+            default=3,
+            help="Maximum genres per play",
+        )
+        parser.add_argument("--performances", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--tickets",
+            type=int,
+            default=1000000,
+            help="Total tickets, spread over performances until "
+                 "they are sold out",
+        )
+        parser.add_argument(
+            "--tickets-per-reservation", type=int, default=4
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed, the same seed produces the same data",
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        halls = self._create_halls(options)
+        genres = self._create_genres(options)
+        actors = self._create_actors(options)
+        plays = self._create_plays(options, actors, genres)
+        performances = self._create_performances(options, plays, halls)
+        users = self._create_users(options)
+        tickets = self._create_tickets(options, performances, users)
+        # Keep past shows out of the upcoming-performances index.
+        archived, _ = archive_past_performances()
+        # bulk_create sends no signals, so drop cached catalog pages here.
+        invalidate_catalog_caches()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(halls)} halls, {len(genres)} genres, "
+                f"{len(actors)} actors, {len(plays)} plays, "
+                f"{len(performances)} performances ({archived} archived), "
+                f"{len(users)} users and {tickets} tickets"
+            )
+        )
+
+    def _bulk_create(self, model, objects):
+        return model.objects.bulk_create(
+            objects, batch_size=self.batch_size
+        )
+
+    def _title(self, words=3):
+        return " ".join(
+            self.random.sample(WORDS, words)
+        ).capitalize()
+
+    def _create_halls(self, options):
+        return self._bulk_create(
+            TheatreHall,
+            [
+                TheatreHall(
+                    name=f"Hall {number}",
+                    rows=options["rows"],
+                    seats_in_row=options["seats_in_row"],
+                )
+                for number in range(1, options["halls"] + 1)
+            ],
+        )
+
+    def _create_genres(self, options):
+        return self._bulk_create(
+            Genre,
+            [
+                Genre(
+                    name=GENRES[number]
+                    if number < len(GENRES)
+                    else f"{GENRES[number % len(GENRES)]} {number}"
+                )
+                for number in range(options["genres"])
+            ],
+        )
+
+    def _create_actors(self, options):
+        return self._bulk_create(
+            Actor,
+            [
+                Actor(
+                    first_name=self.random.choice(WORDS).capitalize(),
+                    last_name=f"Actor{number}",
+                )
+                for number in range(1, options["actors"] + 1)
+            ],
+        )
+
+    def _create_plays(self, options, actors, genres):
+        plays = self._bulk_create(
+            Play,
+            [
+                Play(
+                    title=self._title(),
+                    description=(
+                        f"A play about {self._title(6).lower()}."
+                    ),
+                )
+                for _ in range(options["plays"])
+            ],
+        )
+
+        play_genres = Play.genres.through
+        play_actors = Play.actors.through
+        for batch in batched(plays, self.batch_size):
+            genre_links, actor_links = [], []
+            for play in batch:
+                for genre in self.random.sample(
+                    genres,
+                    self.random.randint(
+                        min(1, len(genres)),
+                        min(options["genres_per_play"], len(genres)),
+                    ),
+                ):
+                    genre_links.append(
+                        play_genres(play_id=play.id, genre_id=genre.id)
+                    )
+                for actor in self.random.sample(
+                    actors,
+                    self.random.randint(
+                        min(1, len(actors)),
+                        min(options["actors_per_play"], len(actors)),
+                    ),
+                ):
+                    actor_links.append(
+                        play_actors(play_id=play.id, actor_id=actor.id)
+                    )
+            self._bulk_create(play_genres, genre_links)
+            self._bulk_create(play_actors, actor_links)
+        return plays
+
+    def _create_performances(self, options, plays, halls):
+        """
+        Spread performances over the halls, from three months ago to a
+        year ahead. Shows of a hall follow each other with random gaps
+        and never overlap, like the API requires.
+        """
+        count = options["performances"] if halls and plays else 0
+        if not count:
+            return []
+        duration = Performance._meta.get_field("duration").get_default()
+        window = datetime.timedelta(days=365) * 5 / 4
+        # Mean time from one show to the next in a hall.
+        spacing = max(window / -(-count // len(halls)), duration)
+        next_free = dict.fromkeys(
+            halls, timezone.now() - datetime.timedelta(days=365) / 4
+        )
+
+        performances = []
+        for index in range(count):
+            hall = halls[index % len(halls)]
+            gap = (spacing - duration) * self.random.uniform(0, 2)
+            show_time = next_free[hall] + gap
+            next_free[hall] = show_time + duration
+            performances.append(
+                Performance(
+                    play=self.random.choice(plays),
+                    theatre_hall=hall,
+                    show_time=show_time,
+                    duration=duration,
+                )
+            )
+        return self._bulk_create(Performance, performances)
+
+    def _create_users(self, options):
+        # Hashing is the slow part of creating users, so every generated
+        # user shares one password: "password".
+        password = make_password("password")
+        return self._bulk_create(
+            get_user_model(),
+            [
+                get_user_model()(
+                    email=f"user{number}@generated.example.com",
+                    password=password,
+                    is_email_verified=True,
+                )
+                for number in range(1, options["users"] + 1)
+            ],
+        )
+
+    def _planned_seats(self, options, performances):
+        """Yield ``(performance, row, seat)`` filling halls row by row."""
+        remaining = options["tickets"]
+        if not performances or remaining <= 0:
+            return
+        per_performance = -(-remaining // len(performances))
+        for performance in performances:
+            hall = performance.theatre_hall
+            count = min(per_performance, hall.capacity, remaining)
+            for index in range(count):
+                yield (
+                    performance,
+                    index // hall.seats_in_row + 1,
+                    index % hall.seats_in_row + 1,
+                )
+            remaining -= count
+            if not remaining:
+                return
+
+    def _create_tickets(self, options, performances, users):
+        if not users:
+            return 0
+
+        per_reservation = options["tickets_per_reservation"]
+        seat_maps = {}
+        created = 0
+        now = timezone.now()
+
+        for batch in batched(
+            self._planned_seats(options, performances), self.batch_size
+        ):
+            with transaction.atomic():
+                chunks = list(batched(batch, per_reservation))
+                reservations = self._bulk_create(
+                    Reservation,
+                    [
+                        Reservation(
+                            created_at=now - datetime.timedelta(
+                                minutes=self.random.randint(0, 525600)
+                            ),
+                            user=self.random.choice(users),
+                        )
+                        for _ in chunks
+                    ],
+                )
+                tickets = []
+                for reservation, chunk in zip(reservations, chunks):
+                    for performance, row, seat in chunk:
+                        tickets.append(
+                            Ticket(
+                                row=row,
+                                seat=seat,
+                                performance_id=performance.id,
+                                reservation_id=reservation.id,
+                            )
+                        )
+                        seat_map = seat_maps.get(performance.id)
+                        if seat_map is None:
+                            seat_map = seat_maps[performance.id] = (
+                                SeatMap.for_performance(performance)
+                            )
+                        seat_map.take(row, seat)
+                self._bulk_create(Ticket, tickets)
+                created += len(tickets)
+
+        for performance in performances:
+            seat_map = seat_maps.get(performance.id)
+            if seat_map is not None:
+                performance.seat_map = seat_map.to_bytes()
+                performance.tickets_sold = seat_map.taken_count
+        Performance.objects.bulk_update(
+            [
+                performance
+                for performance in performances
+                if performance.id in seat_maps
+            ],
+            ["seat_map", "tickets_sold"],
+            batch_size=self.batch_size,
+        )
+        return created
@@ -0,0 +1,133 @@
+import os
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from theatre.signals import invalidate_catalog_caches
+from theatre.transfer import (
+    MODELS,
+    Checkpoint,
+    TransferStats,
+    import_batch,
+    read_csv,
+    read_jsonl,
+    reset_sequences,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream theatre data from JSON Lines or a CSV directory written "
+        "by export_theatre into the database with bulk inserts. "
+        "Interrupted imports continue from the last committed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "input",
+            help="JSON Lines file (- for stdin) or a CSV directory",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("jsonl", "csv"),
+            default="jsonl",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--checkpoint",
+            help="Progress file, <input>.checkpoint by default",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint and start from the beginning",
+        )
+
+    def _import_stream(self, name, numbered_records, options, checkpoint,
+                       stats):
+        batch, batch_model, batch_end = [], None, 0
+
+        for number, record in numbered_records:
+            model = MODELS.get(record["model"])
+            if model is None:
+                raise CommandError(
+                    f"{name}:{number}: unknown model {record['model']}"
+                )
+            if batch and (
+                model is not batch_model
+                or len(batch) >= options["batch_size"]
+            ):
+                import_batch(batch_model, batch, stats)
+                checkpoint.save(name, batch_end)
+                batch = []
+            batch_model = model
+            batch.append(record)
+            batch_end = number
+
+        if batch:
+            import_batch(batch_model, batch, stats)
+            checkpoint.save(name, batch_end)
+
+    def handle(self, *args, **options):
+        source = options["input"]
+        checkpoint_path = options["checkpoint"] or (
+            None if source == "-" else f"{source.rstrip(os.sep)}.checkpoint"
+        )
+        checkpoint = Checkpoint(checkpoint_path)
+        if options["restart"]:
+            checkpoint.clear()
+        stats = TransferStats()
+
+        if options["format"] == "csv":
+            for label, model in MODELS.items():
+                path = os.path.join(source, f"{label}.csv")
+                if not os.path.exists(path):
+                    continue
+                with open(path, newline="") as stream:
+                    self._import_stream(
+                        label,
+                        read_csv(stream, model, checkpoint.get(label)),
+                        options,
+                        checkpoint,
+                        stats,
+                    )
+        elif source == "-":
+            self._import_stream(
+                "-", read_jsonl(sys.stdin), options, checkpoint, stats
+            )
+        else:
+            with open(source) as stream:
+                self._import_stream(
+                    source,
+                    read_jsonl(stream, checkpoint.get(source)),
+                    options,
+                    checkpoint,
+                    stats,
+                )
+
+        reset_sequences(list(MODELS.values()))
+        invalidate_catalog_caches()
+        # Bulk inserts skip the booking path, so derive seat maps and
+        # sold counters from the imported tickets.
+        if stats.rows.get("theatre.ticket"):
+            call_command(
+                "reconcile_performance_counters",
+                seat_maps=True,
+                batch_size=options["batch_size"],
+                stdout=self.stdout,
+            )
+        checkpoint.clear()
+
+        for label in dict.fromkeys([*stats.rows, *stats.skipped]):
+            self.stdout.write(
+                f"{label}: {stats.rows.get(label, 0)} rows, "
+                f"{stats.skipped.get(label, 0)} skipped"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {stats.total_rows} rows "
+                f"({stats.rows_per_second:.0f} rows/s), "
+                f"peak memory {stats.peak_memory_kb()} KB"
+            )
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from theatre.images import process_image
+from theatre.models import Actor, Play
+
+
+class Command(BaseCommand):
+    help = (
+        "Create missing image renditions of plays and actors, e.g. "
+        "after a restart dropped queued uploads"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Process every image, not only those without renditions",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Play, Actor):
+            instances = model.objects.exclude(image="").exclude(
+                image__isnull=True
+            )
+            if not options["all"]:
+                instances = instances.filter(image_renditions={})
+
+            processed = 0
+            for instance in instances.iterator(chunk_size=100):
+                try:
+                    process_image(instance)
+                except OSError as error:
+                    self.stderr.write(
+                        f"{model.__name__} {instance.pk}: {error}"
+                    )
+                    continue
+                processed += 1
+            self.stdout.write(
+                f"Processed {processed} {model._meta.verbose_name_plural}"
+            )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from theatre.analytics import rebuild_hourly_sales
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute hourly sales analytics from tickets, e.g. after "
+        "importing data. Cancelled bookings are not recoverable"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = rebuild_hourly_sales(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rows} hourly sales rows")
+        )
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from theatre.models import Performance, Ticket
+from theatre.seat_map import rebuild_seat_map
+from theatre.transfer import batched
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Performance.tickets_sold (and optionally seat maps) "
+        "from tickets and fix performances that drifted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seat-maps",
+            action="store_true",
+            help="Also rebuild seat maps of drifted performances",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    @staticmethod
+    def _reconcile(performance_ids, seat_maps):
+        """
+        Fix the given performances while their rows are locked, so no
+        booking commits between counting their tickets and writing the
+        counts.
+        """
+        with transaction.atomic():
+            performances = list(
+                Performance
+                .objects
+                .select_for_update()
+                .select_related("theatre_hall")
+                .filter(id__in=performance_ids)
+                .order_by("id")
+            )
+            sold = dict(
+                Ticket
+                .objects
+                .filter(performance_id__in=performance_ids)
+                .order_by()
+                .values_list("performance_id")
+                .annotate(count=Count("id"))
+            )
+            drifted = []
+            for performance in performances:
+                actual = sold.get(performance.id, 0)
+                if performance.tickets_sold != actual:
+                    performance.tickets_sold = actual
+                    drifted.append(performance)
+
+            fields = ["tickets_sold"]
+            if seat_maps:
+                fields.append("seat_map")
+                for performance in drifted:
+                    rebuild_seat_map(performance)
+            Performance.objects.bulk_update(drifted, fields)
+        return len(drifted)
+
+    def handle(self, *args, **options):
+        performance_ids = (
+            Performance
+            .objects
+            .order_by("id")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=options["batch_size"])
+        )
+        reconciled = sum(
+            self._reconcile(batch, options["seat_maps"])
+            for batch in batched(performance_ids, options["batch_size"])
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {reconciled} performances")
+        )
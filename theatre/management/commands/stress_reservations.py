@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from theatre.booking import SeatConflictError, create_tickets
+from theatre.holds import hold_seats
+from theatre.models import Performance, Play, Reservation, TheatreHall
+
+
+class Command(BaseCommand):
+    help = (
+        "Book seats of one performance from many threads at once and "
+        "report successful bookings per second and conflict rate. "
+        "Created data is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--attempts",
+            type=int,
+            default=25,
+            help="Booking attempts per thread",
+        )
+        parser.add_argument(
+            "--party-size",
+            type=int,
+            default=2,
+            help="Seats requested by every attempt",
+        )
+        parser.add_argument("--rows", type=int, default=5)
+        parser.add_argument("--seats-in-row", type=int, default=10)
+
+    def _book(self, user, performance, options, results):
+        hall = performance.theatre_hall
+        try:
+            for _ in range(options["attempts"]):
+                row = random.randint(1, hall.rows)
+                first = random.randint(
+                    1, hall.seats_in_row - options["party_size"] + 1
+                )
+                seats = [
+                    (row, seat)
+                    for seat in range(first, first + options["party_size"])
+                ]
+                try:
+                    hold_seats(user, performance, seats)
+                    with transaction.atomic():
+                        reservation = Reservation.objects.create(
+                            created_at=timezone.now(), user=user
+                        )
+                        create_tickets(
+                            reservation,
+                            [
+                                {
+                                    "performance": performance,
+                                    "row": row,
+                                    "seat": seat,
+                                }
+                                for row, seat in seats
+                            ],
+                        )
+                    results["booked"] += 1
+                except SeatConflictError:
+                    results["conflicts"] += 1
+                except DatabaseError:
+                    results["errors"] += 1
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        hall = TheatreHall.objects.create(
+            name="Stress hall",
+            rows=options["rows"],
+            seats_in_row=options["seats_in_row"],
+        )
+        play = Play.objects.create(title="Stress play", description="Stress")
+        performance = Performance.objects.create(
+            play=play, theatre_hall=hall, show_time=timezone.now()
+        )
+        users = [
+            get_user_model().objects.create_user(
+                f"stress-{index}@example.com", is_email_verified=True
+            )
+            for index in range(options["threads"])
+        ]
+        results = [Counter() for _ in users]
+        threads = [
+            threading.Thread(
+                target=self._book,
+                args=(user, performance, options, user_results),
+            )
+            for user, user_results in zip(users, results)
+        ]
+
+        try:
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            total = sum(results, Counter())
+            attempts = options["threads"] * options["attempts"]
+            sold = performance.tickets.count()
+            self.stdout.write(
+                f"attempts={attempts} "
+                f"booked={total['booked']} "
+                f"conflicts={total['conflicts']} "
+                f"errors={total['errors']}\n"
+                f"bookings/s={total['booked'] / elapsed:.1f} "
+                f"conflict rate={total['conflicts'] / attempts:.1%} "
+                f"seats sold={sold}/{hall.capacity}"
+            )
+            if sold != total["booked"] * options["party_size"]:
+                self.stderr.write("Sold seats do not match bookings!")
+        finally:
+            hall.delete()
+            play.delete()
+            for user in users:
+                user.delete()
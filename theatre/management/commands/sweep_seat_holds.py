@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from theatre.holds import sweep_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Delete expired seat holds"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep sweeping every N seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = sweep_expired_holds()
+            self.stdout.write(f"Deleted {deleted} expired seat holds")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -1,10 +1,13 @@
+import datetime
 import os
 import uuid
 
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.conf import settings
 from django.template.defaultfilters import slugify
+from django.utils import timezone
 
 
 def movie_image_file_path(instance, filename):
@@ -14,10 +17,20 @@ def movie_image_file_path(instance, filename):
     return os.path.join("uploads/movies/", filename)
 
 
+def actor_image_file_path(instance, filename):
+    _, extension = os.path.splitext(filename)
+    filename = f"{slugify(instance.full_name)}-{uuid.uuid4()}{extension}"
+
+    return os.path.join("uploads/actors/", filename)
+
+
 class Actor(models.Model):
     first_name = models.CharField(max_length=255)
     last_name = models.CharField(max_length=255)
-    image = models.ImageField(null=True, upload_to=movie_image_file_path)
+    image = models.ImageField(null=True, upload_to=actor_image_file_path)
+    image_renditions = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
 
     @property
     def full_name(self):
@@ -40,6 +53,9 @@ class Play(models.Model):
     genres = models.ManyToManyField(Genre, related_name="plays")
     actors = models.ManyToManyField(Actor, related_name="plays")
     image = models.ImageField(null=True, upload_to=movie_image_file_path)
+    image_renditions = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
 
     class Meta:
         ordering = ["title"]
@@ -62,6 +78,10 @@ class TheatreHall(models.Model):
 
 
 class Performance(models.Model):
+    # Time slot conflict checks only look this far back for
+    # performances still running at a show time.
+    MAX_DURATION = datetime.timedelta(hours=12)
+
     play = models.ForeignKey(
         Play,
         on_delete=models.CASCADE,
@@ -73,14 +93,93 @@ class Performance(models.Model):
         related_name="performances"
     )
     show_time = models.DateTimeField()
+    duration = models.DurationField(
+        default=datetime.timedelta(hours=2),
+        validators=[
+            MinValueValidator(datetime.timedelta(minutes=1)),
+            MaxValueValidator(MAX_DURATION),
+        ],
+    )
+    seat_map = models.BinaryField(default=bytes, editable=False)
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    # Set for past shows by "manage.py archive_performances", keeps them
+    # out of the partial index of upcoming performances.
+    is_archived = models.BooleanField(default=False, editable=False)
 
     class Meta:
         ordering = ["show_time", "id"]
+        indexes = [
+            models.Index(
+                fields=["theatre_hall", "show_time"],
+                name="theatre_performance_slot_idx",
+            ),
+            models.Index(
+                fields=["play", "show_time"],
+                name="theatre_performance_play_idx",
+            ),
+            models.Index(
+                fields=["show_time", "id"],
+                name="theatre_performance_time_idx",
+            ),
+            models.Index(
+                fields=["show_time", "id"],
+                condition=models.Q(is_archived=False),
+                name="theatre_performance_future_idx",
+            ),
+        ]
+
+    @property
+    def end_time(self):
+        return self.show_time + self.duration
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # A show moved to the future is upcoming again right away, not
+        # only after the next archive_performances run.
+        if self.is_archived and self.show_time >= timezone.now():
+            self.is_archived = False
+            if update_fields is not None:
+                update_fields = {*update_fields, "is_archived"}
+        return super().save(*args, update_fields=update_fields, **kwargs)
 
     def __str__(self):
         return f"{self.play.title} {str(self.show_time)}"
 
 
+class HourlySales(models.Model):
+    """
+    Tickets sold and released and bookings made per hall and play in an
+    hour, updated with every booking and cancellation.
+    """
+
+    hour = models.DateTimeField()
+    theatre_hall = models.ForeignKey(
+        TheatreHall,
+        on_delete=models.CASCADE,
+        related_name="hourly_sales"
+    )
+    play = models.ForeignKey(
+        Play,
+        on_delete=models.CASCADE,
+        related_name="hourly_sales"
+    )
+    tickets_sold = models.PositiveIntegerField(default=0)
+    tickets_released = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("theatre_hall", "hour", "play")
+        ordering = ["hour", "theatre_hall", "play"]
+        indexes = [
+            models.Index(
+                fields=["play", "hour"], name="theatre_sales_play_idx"
+            ),
+            models.Index(fields=["hour"], name="theatre_sales_hour_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.theatre_hall} {self.play} {self.hour}"
+
+
 class Reservation(models.Model):
     created_at = models.DateTimeField()
     user = models.ForeignKey(
@@ -89,6 +188,15 @@ class Reservation(models.Model):
         related_name="reservations"
     )
 
+    class Meta:
+        indexes = [
+            # Per-user history, newest first (cursor pagination order).
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="theatre_reservation_user_idx",
+            ),
+        ]
+
     def __str__(self):
         return (f"Reservation created by "
                 f"{self.user.first_name} at "
@@ -158,3 +266,29 @@ class Ticket(models.Model):
         return (
             f"{str(self.performance)} (row: {self.row}, seat: {self.seat})"
         )
+
+
+class SeatHold(models.Model):
+    row = models.PositiveIntegerField()
+    seat = models.PositiveIntegerField()
+    performance = models.ForeignKey(
+        Performance,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="seat_holds"
+    )
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("performance", "row", "seat")
+        ordering = ["row", "seat"]
+
+    def __str__(self):
+        return (
+            f"Hold on {str(self.performance)} "
+            f"(row: {self.row}, seat: {self.seat})"
+        )
@@ -0,0 +1,24 @@
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class PerformanceCursorPagination(BaseCursorPagination):
+    ordering = ("show_time", "id")
+
+
+class PlayCursorPagination(BaseCursorPagination):
+    ordering = ("title", "id")
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get("q"):
+            return ("-search_rank", "id")
+        return super().get_ordering(request, queryset, view)
+
+
+class ReservationCursorPagination(BaseCursorPagination):
+    ordering = ("-created_at", "-id")
@@ -33,3 +33,36 @@ class IsAuthorizedOrIfAuthenticatedReadOnly(IsAdminOrIfAuthenticatedReadOnly):
             )
             )
         )
+
+
+class IsVerifiedUser(BasePermission):
+    """
+    Any authenticated user with a verified email, for views scoped to
+    the user's own objects.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated and user.is_email_verified
+        )
+
+
+class IsAdminOrHallOverseer(BasePermission):
+    """
+    Staff, or overseers of a theatre hall. Views scope overseers to
+    their hall, so an overseer without one is denied rather than shown
+    every hall.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user
+            and user.is_authenticated
+            and user.is_email_verified
+            and (
+                user.is_staff
+                or (user.is_hall_overseer and user.theatre_hall_id)
+            )
+        )
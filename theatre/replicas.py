@@ -0,0 +1,137 @@
+"""
+Read replica routing.
+
+Safe requests to views using ``ReadReplicaMixin`` read from one of the
+``DATABASE_REPLICAS`` aliases, everything else uses ``default``. After
+a client writes, ``PrimaryPinningMiddleware`` pins its reads to the
+primary for ``REPLICA_PIN_SECONDS`` so it sees its own writes despite
+replication lag, wherever its next request is served: pins are kept in
+the ``shared`` cache, which must be shared by all worker processes.
+Replicas that fail to connect are skipped for
+``REPLICA_RETRY_SECONDS``.
+"""
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from theatre.cache import shared_cache
+
+PIN_KEY = "db:pinned:{identity}"
+
+# None outside of use_replicas(), "" until a replica has been chosen.
+_read_alias = ContextVar("read_alias", default=None)
+_unavailable_until = {}
+
+
+def is_available(alias):
+    if alias not in settings.DATABASES:
+        return False
+    if time.monotonic() < _unavailable_until.get(alias, 0):
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unavailable_until[alias] = (
+            time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        )
+        return False
+    return True
+
+
+def choose_read_alias():
+    """
+    A random available replica, or the primary. Only the chosen replica
+    is connected to, the others are tried when it fails.
+    """
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_available(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_replicas():
+    """Send reads in the block to a replica, the same for all of them."""
+    token = _read_alias.set("")
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None:
+            return DEFAULT_DB_ALIAS
+        if not alias:
+            alias = choose_read_alias()
+            _read_alias.set(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def _pin_key(request):
+    identity = (
+        request.META.get("HTTP_AUTHORIZATION")
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get("REMOTE_ADDR", "")
+    )
+    return PIN_KEY.format(
+        identity=hashlib.sha256(identity.encode()).hexdigest()
+    )
+
+
+def pin_to_primary(request):
+    shared_cache.set(_pin_key(request), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(request):
+    return shared_cache.get(_pin_key(request)) is not None
+
+
+class ReadReplicaMixin:
+    """Serve safe requests of a view from a read replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS
+            or not settings.DATABASE_REPLICAS
+            or is_pinned(request)
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replicas():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class PrimaryPinningMiddleware:
+    """Pin reads of a client to the primary after a successful write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in SAFE_METHODS
+            and settings.DATABASE_REPLICAS
+            and response.status_code < 400
+        ):
+            pin_to_primary(request)
+        return response
@@ -0,0 +1,225 @@
+import datetime
+from bisect import bisect_left, insort
+
+from django.db import transaction
+from django.utils import timezone
+
+from theatre.models import Performance, TheatreHall
+from theatre.signals import CACHE_NAMESPACES, invalidate_on_commit
+
+WEEKDAYS = range(7)
+# Upper bounds on a schedule rule, checked before it is expanded.
+MAX_SCHEDULE_TIMES = 48
+MAX_SCHEDULE_DAYS = 731
+# Conflict errors list at most this many clashing show times.
+MAX_REPORTED_CONFLICTS = 20
+
+
+class TimeSlotConflictError(Exception):
+    """Raised when performances would overlap in a theatre hall."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class HallTimeline:
+    """
+    Time slots of one hall sorted by start. A lookup bisects to the
+    slots starting before the end of the new one and walks back at most
+    ``Performance.MAX_DURATION``, so it costs O(log n) plus the few
+    slots in that window however long the schedule history is.
+    """
+
+    def __init__(self):
+        self.slots = []
+
+    def add(self, start, end, performance_id=None):
+        insort(self.slots, (start, end, performance_id or 0))
+
+    def find_overlap(self, start, end):
+        """Return the first ``(start, end, id)`` slot overlapping."""
+        index = bisect_left(self.slots, (end,))
+        earliest = start - Performance.MAX_DURATION
+        while index > 0:
+            index -= 1
+            slot = self.slots[index]
+            if slot[0] <= earliest:
+                break
+            if slot[1] > start:
+                return slot
+        return None
+
+
+def lock_halls(theatre_hall_ids):
+    """
+    Take row locks on halls in id order, so concurrent scheduling in a
+    hall is serialized between the conflict check and the insert.
+    """
+    return list(
+        TheatreHall
+        .objects
+        .select_for_update()
+        .filter(id__in=theatre_hall_ids)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def _overlapping(theatre_hall_ids, start, end):
+    return (
+        Performance
+        .objects
+        .filter(
+            theatre_hall_id__in=theatre_hall_ids,
+            show_time__gt=start - Performance.MAX_DURATION,
+            show_time__lt=end,
+        )
+        .values_list(
+            "id", "theatre_hall_id", "show_time", "duration", "play_id"
+        )
+    )
+
+
+def _conflict_message(theatre_hall_id, show_time, performance_id):
+    taken_by = (
+        f"performance {performance_id}"
+        if performance_id
+        else "another show of this schedule"
+    )
+    return (
+        f"Theatre hall {theatre_hall_id} is taken at "
+        f"{show_time.isoformat()} by {taken_by}."
+    )
+
+
+def check_time_slot(theatre_hall, show_time, duration, exclude_pk=None):
+    """
+    Raise ``TimeSlotConflictError`` if a performance in the hall
+    overlaps ``show_time`` to ``show_time + duration``. Call it in a
+    transaction after ``lock_halls()``.
+    """
+    end = show_time + duration
+    conflicts = [
+        _conflict_message(theatre_hall.id, show_time, performance_id)
+        for performance_id, _, start, length, _ in _overlapping(
+            [theatre_hall.id], show_time, end
+        )
+        if start + length > show_time and performance_id != exclude_pk
+    ]
+    if conflicts:
+        raise TimeSlotConflictError(conflicts)
+
+
+def count_schedule(start_date, end_date, times, weekdays=WEEKDAYS):
+    """Number of show times ``expand_schedule()`` would return."""
+    weekdays = set(weekdays)
+    full_weeks, days = divmod((end_date - start_date).days + 1, 7)
+    first = start_date.weekday()
+    dates = full_weeks * len(weekdays) + sum(
+        (first + offset) % 7 in weekdays for offset in range(days)
+    )
+    return dates * len(set(times))
+
+
+def expand_schedule(start_date, end_date, times, weekdays=WEEKDAYS):
+    """
+    Show times of a weekly recurrence: every time of day on every
+    ``weekdays`` day (0 is Monday) from ``start_date`` to ``end_date``
+    inclusive, in the current time zone and sorted.
+    """
+    tz = timezone.get_current_timezone()
+    weekdays = set(weekdays)
+    times = sorted(set(times))
+    show_times = []
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + datetime.timedelta(days=offset)
+        if day.weekday() in weekdays:
+            show_times.extend(
+                datetime.datetime.combine(day, time, tzinfo=tz)
+                for time in times
+            )
+    return show_times
+
+
+def schedule_performances(
+        play,
+        theatre_halls,
+        show_times,
+        duration=None,
+        batch_size=500,
+):
+    """
+    Create performances of ``play`` in every hall at every show time in
+    one transaction and return them. Show times the play is already
+    scheduled at in a hall are skipped, so a schedule can be posted
+    again; any other overlap raises ``TimeSlotConflictError``.
+    """
+    if not show_times:
+        return []
+    duration = duration or Performance._meta.get_field("duration").default
+    hall_ids = [theatre_hall.id for theatre_hall in theatre_halls]
+
+    with transaction.atomic():
+        lock_halls(hall_ids)
+        timelines = {hall_id: HallTimeline() for hall_id in hall_ids}
+        scheduled = set()
+        requested = set(show_times)
+        for performance_id, hall_id, start, length, play_id in _overlapping(
+            hall_ids, min(show_times), max(show_times) + duration
+        ):
+            timelines[hall_id].add(start, start + length, performance_id)
+            if play_id == play.id and start in requested:
+                scheduled.add((hall_id, start))
+
+        performances = []
+        conflicts = []
+        for theatre_hall in theatre_halls:
+            timeline = timelines[theatre_hall.id]
+            for show_time in show_times:
+                if (theatre_hall.id, show_time) in scheduled:
+                    continue
+                end = show_time + duration
+                overlap = timeline.find_overlap(show_time, end)
+                if overlap:
+                    conflicts.append(
+                        _conflict_message(
+                            theatre_hall.id, show_time, overlap[2]
+                        )
+                    )
+                    continue
+                timeline.add(show_time, end)
+                performances.append(
+                    Performance(
+                        play=play,
+                        theatre_hall=theatre_hall,
+                        show_time=show_time,
+                        duration=duration,
+                    )
+                )
+        if conflicts:
+            raise TimeSlotConflictError(conflicts[:MAX_REPORTED_CONFLICTS])
+
+        performances = Performance.objects.bulk_create(
+            performances, batch_size=batch_size
+        )
+
+    # bulk_create() sends no post_save signals.
+    if performances:
+        invalidate_on_commit(*CACHE_NAMESPACES[Performance])
+    return performances
+
+
+def archive_past_performances(now=None):
+    """
+    Flag performances that have started as archived, and unflag ones
+    moved back into the future. Returns both counts.
+    """
+    now = now or timezone.now()
+    archived = Performance.objects.filter(
+        is_archived=False, show_time__lt=now
+    ).update(is_archived=True)
+    restored = Performance.objects.filter(
+        is_archived=True, show_time__gte=now
+    ).update(is_archived=False)
+    return archived, restored
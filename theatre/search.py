@@ -0,0 +1,155 @@
+import re
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from theatre.models import Play
+
+SEARCH_CONFIG = "english"
+PLAY_FTS_TABLE = f"{Play._meta.db_table}_fts"
+
+
+def play_search_vector():
+    return SearchVector("title", "description", config=SEARCH_CONFIG)
+
+
+def _postgres_search_index():
+    return GinIndex(play_search_vector(), name="theatre_play_search_idx")
+
+
+def _create_postgres_index(connection):
+    index = _postgres_search_index()
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(
+            cursor, Play._meta.db_table
+        )
+    if index.name not in existing:
+        with connection.schema_editor() as schema_editor:
+            schema_editor.add_index(Play, index)
+
+
+def _sqlite_index_statements():
+    table = Play._meta.db_table
+    insert = (
+        f"INSERT INTO {PLAY_FTS_TABLE}(rowid, title, description) "
+        f"VALUES (new.id, new.title, new.description);"
+    )
+    delete = (
+        f"INSERT INTO {PLAY_FTS_TABLE}"
+        f"({PLAY_FTS_TABLE}, rowid, title, description) "
+        f"VALUES ('delete', old.id, old.title, old.description);"
+    )
+    return {
+        PLAY_FTS_TABLE: (
+            f"CREATE VIRTUAL TABLE {PLAY_FTS_TABLE} USING fts5("
+            f"title, description, content='{table}', content_rowid='id', "
+            f"tokenize='porter unicode61')"
+        ),
+        f"{PLAY_FTS_TABLE}_ai": (
+            f"CREATE TRIGGER {PLAY_FTS_TABLE}_ai AFTER INSERT ON {table} "
+            f"BEGIN {insert} END"
+        ),
+        f"{PLAY_FTS_TABLE}_ad": (
+            f"CREATE TRIGGER {PLAY_FTS_TABLE}_ad AFTER DELETE ON {table} "
+            f"BEGIN {delete} END"
+        ),
+        f"{PLAY_FTS_TABLE}_au": (
+            f"CREATE TRIGGER {PLAY_FTS_TABLE}_au AFTER UPDATE ON {table} "
+            f"BEGIN {delete} {insert} END"
+        ),
+    }
+
+
+def _create_sqlite_index(connection):
+    statements = _sqlite_index_statements()
+    with connection.cursor() as cursor:
+        placeholders = ", ".join(["%s"] * len(statements))
+        cursor.execute(
+            f"SELECT name FROM sqlite_master WHERE name IN ({placeholders})",
+            list(statements),
+        )
+        existing = {name for name, in cursor.fetchall()}
+        missing = [
+            statement
+            for name, statement in statements.items()
+            if name not in existing
+        ]
+        for statement in missing:
+            cursor.execute(statement)
+        # Triggers are dropped whenever SQLite remakes the play table,
+        # so refill the index from the table after recreating them.
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {PLAY_FTS_TABLE}({PLAY_FTS_TABLE}) "
+                f"VALUES ('rebuild')"
+            )
+
+
+def ensure_search_index(using="default", **kwargs):
+    """
+    Create the full-text index for plays: a GIN expression index on
+    PostgreSQL or an FTS5 table kept in sync by triggers on SQLite.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        _create_postgres_index(connection)
+    elif connection.vendor == "sqlite":
+        _create_sqlite_index(connection)
+
+
+def _fts_query(query):
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_plays(queryset, query):
+    """
+    Filter plays matching ``query`` in title or description and
+    annotate them with ``search_rank`` (higher is better).
+    """
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "postgresql":
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        return (
+            queryset
+            .annotate(search=play_search_vector())
+            .filter(search=search_query)
+            .annotate(
+                search_rank=SearchRank(play_search_vector(), search_query)
+            )
+        )
+
+    if vendor == "sqlite":
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {PLAY_FTS_TABLE} "
+                f"WHERE {PLAY_FTS_TABLE} MATCH %s",
+                [fts_query],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({PLAY_FTS_TABLE}, 10.0, 1.0) "
+                f"FROM {PLAY_FTS_TABLE} "
+                f"WHERE {PLAY_FTS_TABLE} MATCH %s "
+                f"AND rowid = {Play._meta.db_table}.id",
+                [fts_query],
+                output_field=FloatField(),
+            )
+        )
+
+    return queryset.filter(
+        Q(title__icontains=query) | Q(description__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,152 @@
+import base64
+from collections import defaultdict
+
+from django.db import transaction
+
+from theatre.models import Performance
+
+
+class SeatMap:
+    """
+    Packed bitset of taken seats for a theatre hall.
+
+    Seats are laid out row by row: seat ``(row, seat)`` maps to bit
+    ``(row - 1) * seats_in_row + (seat - 1)``, most significant bit of
+    each byte first. A set bit means the seat is taken.
+    """
+
+    def __init__(self, rows, seats_in_row, data=b""):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        size = (rows * seats_in_row + 7) // 8
+        self._bits = bytearray(bytes(data)[:size].ljust(size, b"\x00"))
+
+    @classmethod
+    def for_performance(cls, performance):
+        hall = performance.theatre_hall
+        return cls(hall.rows, hall.seats_in_row, performance.seat_map)
+
+    @property
+    def capacity(self):
+        return self.rows * self.seats_in_row
+
+    def _position(self, row, seat):
+        index = (row - 1) * self.seats_in_row + (seat - 1)
+        return index >> 3, 0x80 >> (index & 7)
+
+    def is_taken(self, row, seat):
+        byte, mask = self._position(row, seat)
+        return bool(self._bits[byte] & mask)
+
+    def take(self, row, seat):
+        byte, mask = self._position(row, seat)
+        self._bits[byte] |= mask
+
+    def release(self, row, seat):
+        byte, mask = self._position(row, seat)
+        self._bits[byte] &= ~mask
+
+    def best_block(self, size, preferred_row=None):
+        """
+        Return the best ``size`` contiguous free seats of one row as
+        ``(row, seat)`` pairs, or ``None`` if no row has such a block.
+
+        Blocks are scored by their distance from ``preferred_row`` (the
+        middle row by default) plus the distance of their center from
+        the center of the row, both relative to the hall size. Rows too
+        far away to beat the best block found so far are skipped.
+        """
+        if preferred_row is None:
+            preferred_row = (self.rows + 1) / 2
+        center = (self.seats_in_row + 1) / 2
+        best = None
+
+        for row in range(1, self.rows + 1):
+            row_score = abs(row - preferred_row) / self.rows
+            if best is not None and row_score >= best[0]:
+                continue
+            seat = 1
+            while seat <= self.seats_in_row:
+                if self.is_taken(row, seat):
+                    seat += 1
+                    continue
+                run_start = seat
+                while seat <= self.seats_in_row and not self.is_taken(
+                    row, seat
+                ):
+                    seat += 1
+                run_end = seat - 1
+                if run_end - run_start + 1 < size:
+                    continue
+                # The most central block that fits in this free run.
+                start = int(center - (size - 1) / 2)
+                start = min(max(start, run_start), run_end - size + 1)
+                offset = abs(start + (size - 1) / 2 - center)
+                score = (row_score + offset / self.seats_in_row, row, start)
+                if best is None or score < best:
+                    best = score
+
+        if best is None:
+            return None
+        _, row, start = best
+        return [(row, seat) for seat in range(start, start + size)]
+
+    @property
+    def taken_count(self):
+        return int.from_bytes(self._bits, "big").bit_count()
+
+    def to_bytes(self):
+        return bytes(self._bits)
+
+    def to_base64(self):
+        return base64.b64encode(self._bits).decode("ascii")
+
+
+def _group_by_performance(seats):
+    grouped = defaultdict(list)
+    for performance_id, row, seat in seats:
+        grouped[performance_id].append((row, seat))
+    return grouped
+
+
+def _apply(seats, method_name):
+    grouped = _group_by_performance(seats)
+    if not grouped:
+        return
+
+    with transaction.atomic():
+        performances = list(
+            Performance
+            .objects
+            .select_for_update()
+            .select_related("theatre_hall")
+            .filter(id__in=grouped)
+        )
+        for performance in performances:
+            seat_map = SeatMap.for_performance(performance)
+            for row, seat in grouped[performance.id]:
+                getattr(seat_map, method_name)(row, seat)
+            performance.seat_map = seat_map.to_bytes()
+        Performance.objects.bulk_update(performances, ["seat_map"])
+
+
+def occupy_seats(seats):
+    """Mark ``(performance_id, row, seat)`` triples as taken."""
+    _apply(seats, "take")
+
+
+def release_seats(seats):
+    """Mark ``(performance_id, row, seat)`` triples as free again."""
+    _apply(seats, "release")
+
+
+def rebuild_seat_map(performance):
+    """Recompute the seat map of a performance from its tickets."""
+    seat_map = SeatMap(
+        performance.theatre_hall.rows,
+        performance.theatre_hall.seats_in_row,
+    )
+    for row, seat in performance.tickets.values_list("row", "seat"):
+        seat_map.take(row, seat)
+    performance.seat_map = seat_map.to_bytes()
+    return seat_map
@@ -1,4 +1,8 @@
+import datetime
+
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
 from rest_framework import serializers
 
 from theatre.models import (
@@ -8,23 +12,69 @@ from theatre.models import (
     Performance,
     TheatreHall,
     Ticket,
-    Reservation
+    Reservation,
+    SeatHold
+)
+from theatre.booking import (
+    SeatConflictError,
+    create_tickets,
+    find_seat_conflicts,
+    lock_performances,
+    prefetch_performances,
+    reserve_best_available,
+    seat_errors,
+)
+from theatre.fieldsets import (
+    SparseFieldsetMixin,
+    primary_key,
+    primary_keys,
 )
+from theatre.holds import hold_seats
+from theatre.images import rendition_urls
+from theatre.scheduling import (
+    MAX_SCHEDULE_DAYS,
+    MAX_SCHEDULE_TIMES,
+    WEEKDAYS,
+    TimeSlotConflictError,
+    check_time_slot,
+    count_schedule,
+    expand_schedule,
+    lock_halls,
+    schedule_performances,
+)
+from theatre.seat_map import SeatMap, rebuild_seat_map
+
 
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """URLs of the resized renditions, e.g. ``{"card": {"webp": url}}``."""
+
+    def to_representation(self, value):
+        return rendition_urls(value or {}, self.context.get("request"))
+
+
+class ActorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
 
-class ActorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Actor
-        fields = ("id", "first_name", "last_name")
+        fields = ("id", "first_name", "last_name", "image_renditions")
+
 
+class ActorImageSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
 
-class GenreSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Actor
+        fields = ("id", "image", "image_renditions")
+
+
+class GenreSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ("id", "name")
 
 
-class PlaySerializer(serializers.ModelSerializer):
+class PlaySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Play
         fields = (
@@ -37,6 +87,8 @@ class PlaySerializer(serializers.ModelSerializer):
 
 
 class PlayDetailSerializer(PlaySerializer):
+    collapsed_fields = {"genres": primary_keys, "actors": primary_keys}
+
     genres = GenreSerializer(
         read_only=True,
         many=True
@@ -45,22 +97,55 @@ class PlayDetailSerializer(PlaySerializer):
         read_only=True,
         many=True
     )
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Play
-        fields = PlaySerializer.Meta.fields
+        fields = PlaySerializer.Meta.fields + ("image_renditions",)
 
 
-class TheatreHallSerializer(serializers.ModelSerializer):
+class TheatreHallSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = TheatreHall
         fields = ("id", "name", "rows", "seats_in_row")
 
 
+class PrefetchedPerformanceField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves performances from the batch prefetched by the root
+    serializer, falling back to a regular lookup for unknown ids.
+    """
+
+    def to_internal_value(self, data):
+        performances = getattr(self.root, "prefetched_performances", {})
+        if not isinstance(data, bool):
+            try:
+                return performances[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    performance = PrefetchedPerformanceField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
+
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "performance")
+        # Seat conflicts are checked for the whole batch of tickets
+        # in ReservationSerializer.validate_tickets.
+        validators = []
+
+    def validate(self, attrs):
+        Ticket.validate_ticket(
+            attrs["row"],
+            attrs["seat"],
+            attrs["performance"],
+            serializers.ValidationError,
+        )
+        return attrs
 
 
 class TicketSeatsSerializer(TicketSerializer):
@@ -69,22 +154,86 @@ class TicketSeatsSerializer(TicketSerializer):
         fields = ("row", "seat")
 
 
-class PerformanceSerializer(serializers.ModelSerializer):
+def validate_overseer_hall(user, theatre_hall):
+    """Hall overseers may only schedule performances in their hall."""
+    if user.theatre_hall and theatre_hall.id != user.theatre_hall.id:
+        raise serializers.ValidationError(
+            f"You cannot assign performance to theatre hall "
+            f"'{theatre_hall.name}'. Your hall: {user.theatre_hall.name}"
+        )
+
+
+class PerformanceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Performance
-        fields = ("id", "play", "theatre_hall", "show_time")
+        fields = ("id", "play", "theatre_hall", "show_time", "duration")
 
     def validate_theatre_hall(self, value):
-        user = self.context["request"].user
-        if user.theatre_hall and value.id != user.theatre_hall.id:
-            raise serializers.ValidationError(
-                f"You cannot assign performance to theatre hall "
-                f"'{value.name}'. Your hall: {user.theatre_hall.name}"
-            )
+        validate_overseer_hall(self.context["request"].user, value)
         return value
 
+    def _check_time_slot(self, validated_data, instance=None):
+        def get(name):
+            if name in validated_data:
+                return validated_data[name]
+            if instance is not None:
+                return getattr(instance, name)
+            return Performance._meta.get_field(name).get_default()
+
+        theatre_hall = get("theatre_hall")
+        lock_halls([theatre_hall.id])
+        try:
+            check_time_slot(
+                theatre_hall,
+                get("show_time"),
+                get("duration"),
+                exclude_pk=instance.pk if instance else None,
+            )
+        except TimeSlotConflictError as error:
+            raise serializers.ValidationError({"show_time": error.errors})
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self._check_time_slot(validated_data)
+            return super().create(validated_data)
+
+    @staticmethod
+    def _check_sold_seats(instance, theatre_hall):
+        """
+        Lock the performance against bookings and check that its sold
+        seats exist in ``theatre_hall``.
+        """
+        lock_performances([instance.pk])
+        if instance.tickets.filter(
+            Q(row__gt=theatre_hall.rows)
+            | Q(seat__gt=theatre_hall.seats_in_row)
+        ).exists():
+            raise serializers.ValidationError({
+                "theatre_hall": "Seats sold for this performance do not "
+                                "exist in this theatre hall."
+            })
+
+    def update(self, instance, validated_data):
+        theatre_hall = validated_data.get("theatre_hall")
+        hall_changed = (
+            theatre_hall is not None
+            and theatre_hall.id != instance.theatre_hall_id
+        )
+        with transaction.atomic():
+            self._check_time_slot(validated_data, instance)
+            if hall_changed:
+                self._check_sold_seats(instance, theatre_hall)
+            instance = super().update(instance, validated_data)
+            if hall_changed:
+                # The seat map is packed for the layout of the hall.
+                rebuild_seat_map(instance)
+                instance.save(update_fields=["seat_map"])
+            return instance
+
 
 class PerformanceDetailSerializer(PerformanceSerializer):
+    collapsed_fields = {"play": primary_key}
+
     play = PlayDetailSerializer(read_only=True)
     taken_places = TicketSeatsSerializer(
         source="tickets",
@@ -94,7 +243,14 @@ class PerformanceDetailSerializer(PerformanceSerializer):
 
     class Meta:
         model = Performance
-        fields = ("id", "play", "theatre_hall", "show_time", "taken_places")
+        fields = (
+            "id",
+            "play",
+            "theatre_hall",
+            "show_time",
+            "duration",
+            "taken_places",
+        )
 
 
 class PerformanceListSerializer(PerformanceSerializer):
@@ -115,11 +271,145 @@ class PerformanceListSerializer(PerformanceSerializer):
             "theatre_hall_name",
             "theatre_hall_capacity",
             "show_time",
+            "duration",
             "tickets_available",
             "play"
         )
 
 
+class PerformanceScheduleSerializer(serializers.Serializer):
+    play = serializers.PrimaryKeyRelatedField(queryset=Play.objects.all())
+    theatre_halls = serializers.PrimaryKeyRelatedField(
+        queryset=TheatreHall.objects.all(), many=True, allow_empty=False
+    )
+    times = serializers.ListField(
+        child=serializers.TimeField(),
+        allow_empty=False,
+        max_length=MAX_SCHEDULE_TIMES,
+    )
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        allow_empty=False,
+        default=list(WEEKDAYS),
+        help_text="Days of the week, 0 is Monday. Every day by default.",
+    )
+    duration = serializers.DurationField(
+        default=Performance._meta.get_field("duration").default,
+        min_value=datetime.timedelta(minutes=1),
+        max_value=Performance.MAX_DURATION,
+    )
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    def validate_theatre_halls(self, value):
+        user = self.context["request"].user
+        for theatre_hall in value:
+            validate_overseer_hall(user, theatre_hall)
+        return value
+
+    def validate(self, attrs):
+        if attrs["end_date"] < attrs["start_date"]:
+            raise serializers.ValidationError(
+                {"end_date": "End date cannot be before start date."}
+            )
+        if (attrs["end_date"] - attrs["start_date"]).days >= (
+            MAX_SCHEDULE_DAYS
+        ):
+            raise serializers.ValidationError(
+                {
+                    "end_date": f"A schedule can span at most "
+                                f"{MAX_SCHEDULE_DAYS} days."
+                }
+            )
+        if attrs["end_date"].year == datetime.MAXYEAR:
+            raise serializers.ValidationError(
+                {"end_date": "End date is too far in the future."}
+            )
+        # Counted before expanding, so oversized rules cost no memory.
+        size = count_schedule(
+            attrs["start_date"],
+            attrs["end_date"],
+            attrs["times"],
+            attrs["weekdays"],
+        ) * len(attrs["theatre_halls"])
+        if size > settings.PERFORMANCE_SCHEDULE_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Schedule expands to {size} performances, at most "
+                f"{settings.PERFORMANCE_SCHEDULE_MAX_SIZE} are allowed."
+            )
+        attrs["show_times"] = expand_schedule(
+            attrs["start_date"],
+            attrs["end_date"],
+            attrs["times"],
+            attrs["weekdays"],
+        )
+        return attrs
+
+    def create(self, validated_data):
+        show_times = validated_data["show_times"]
+        theatre_halls = validated_data["theatre_halls"]
+        try:
+            performances = schedule_performances(
+                validated_data["play"],
+                theatre_halls,
+                show_times,
+                validated_data["duration"],
+            )
+        except TimeSlotConflictError as error:
+            raise serializers.ValidationError({"show_times": error.errors})
+        requested = len(show_times) * len(theatre_halls)
+        return {
+            "play": validated_data["play"].id,
+            "theatre_halls": [hall.id for hall in theatre_halls],
+            "created": len(performances),
+            "skipped": requested - len(performances),
+            "first_show_time": show_times[0] if show_times else None,
+            "last_show_time": show_times[-1] if show_times else None,
+        }
+
+
+class PerformanceScheduleSummarySerializer(serializers.Serializer):
+    play = serializers.IntegerField()
+    theatre_halls = serializers.ListField(child=serializers.IntegerField())
+    created = serializers.IntegerField()
+    skipped = serializers.IntegerField()
+    first_show_time = serializers.DateTimeField(allow_null=True)
+    last_show_time = serializers.DateTimeField(allow_null=True)
+
+
+class PerformanceSeatMapSerializer(serializers.ModelSerializer):
+    rows = serializers.IntegerField(
+        source="theatre_hall.rows", read_only=True
+    )
+    seats_in_row = serializers.IntegerField(
+        source="theatre_hall.seats_in_row", read_only=True
+    )
+    tickets_available = serializers.SerializerMethodField()
+    encoding = serializers.SerializerMethodField()
+    seat_map = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Performance
+        fields = (
+            "id",
+            "rows",
+            "seats_in_row",
+            "tickets_available",
+            "encoding",
+            "seat_map",
+        )
+
+    def get_tickets_available(self, obj):
+        seat_map = SeatMap.for_performance(obj)
+        return seat_map.capacity - seat_map.taken_count
+
+    def get_encoding(self, obj):
+        return "base64"
+
+    def get_seat_map(self, obj):
+        return SeatMap.for_performance(obj).to_base64()
+
+
 class TicketListSerializer(TicketSerializer):
     performance = serializers.SlugField(
         read_only=True,
@@ -135,6 +425,12 @@ class TicketListSerializer(TicketSerializer):
 
 
 class PlayListSerializer(PlaySerializer):
+    collapsed_fields = {
+        "genres": primary_keys,
+        "actors": primary_keys,
+        "performances": primary_keys,
+    }
+
     genres = serializers.SlugRelatedField(
         read_only=True,
         many=True,
@@ -149,10 +445,14 @@ class PlayListSerializer(PlaySerializer):
         many=True,
         read_only=True
     )
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Play
-        fields = PlaySerializer.Meta.fields + ("performances",)
+        fields = PlaySerializer.Meta.fields + (
+            "performances",
+            "image_renditions",
+        )
 
 
 class ReservationSerializer(serializers.ModelSerializer):
@@ -166,19 +466,82 @@ class ReservationSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = ("id", "created_at", "user", "tickets")
 
+    def to_internal_value(self, data):
+        tickets = data.get("tickets") if hasattr(data, "get") else None
+        if isinstance(tickets, list):
+            self.prefetched_performances = prefetch_performances(
+                ticket.get("performance")
+                for ticket in tickets
+                if isinstance(ticket, dict)
+            )
+        return super().to_internal_value(data)
+
+    def validate_tickets(self, value):
+        conflicts = find_seat_conflicts(value, self.context["request"].user)
+        if conflicts:
+            raise serializers.ValidationError(
+                seat_errors(value, conflicts), code="unique"
+            )
+        return value
+
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            reservation = Reservation.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(reservation=reservation, **ticket_data)
-            return reservation
+        try:
+            with transaction.atomic():
+                tickets_data = validated_data.pop("tickets")
+                reservation = Reservation.objects.create(**validated_data)
+                create_tickets(reservation, tickets_data)
+                return reservation
+        except SeatConflictError as error:
+            raise serializers.ValidationError(
+                {"tickets": error.errors}, code="unique"
+            )
 
     def update(self, instance, validated_data):
-        tickets_data = validated_data.pop("tickets")
-        for ticket_data in tickets_data:
-            Ticket.objects.create(reservation=instance, **ticket_data)
-        return instance
+        try:
+            with transaction.atomic():
+                tickets_data = validated_data.pop("tickets")
+                create_tickets(instance, tickets_data)
+                return instance
+        except SeatConflictError as error:
+            raise serializers.ValidationError(
+                {"tickets": error.errors}, code="unique"
+            )
+
+
+class BestAvailableSerializer(serializers.Serializer):
+    performance = serializers.PrimaryKeyRelatedField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
+    party_size = serializers.IntegerField(min_value=1)
+    preferred_row = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        hall = attrs["performance"].theatre_hall
+        if attrs["party_size"] > hall.seats_in_row:
+            raise serializers.ValidationError(
+                {
+                    "party_size": f"A row of this hall has only "
+                                  f"{hall.seats_in_row} seats."
+                }
+            )
+        if attrs.get("preferred_row", 1) > hall.rows:
+            raise serializers.ValidationError(
+                {"preferred_row": f"This hall has only {hall.rows} rows."}
+            )
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return reserve_best_available(
+                self.context["request"].user,
+                validated_data["performance"],
+                validated_data["party_size"],
+                validated_data.get("preferred_row"),
+            )
+        except SeatConflictError as error:
+            raise serializers.ValidationError(
+                {"party_size": error.errors}, code="unique"
+            )
 
 
 class ReservationListSerializer(ReservationSerializer):
@@ -186,6 +549,101 @@ class ReservationListSerializer(ReservationSerializer):
 
 
 class PlayImageSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
+
     class Meta:
         model = Play
-        fields = ("id", "image")
+        fields = ("id", "image", "image_renditions")
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ("id", "performance", "row", "seat", "expires_at")
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField(min_value=1)
+    seat = serializers.IntegerField(min_value=1)
+
+
+class HistoryPerformanceSerializer(serializers.Serializer):
+    performance = serializers.IntegerField()
+    play_title = serializers.CharField()
+    show_time = serializers.DateTimeField()
+    theatre_hall = serializers.CharField()
+    seats = SeatSerializer(many=True)
+
+
+class ReservationHistorySerializer(serializers.ModelSerializer):
+    performances = HistoryPerformanceSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Reservation
+        fields = ("id", "created_at", "performances")
+
+
+class SeatHoldCreateSerializer(serializers.Serializer):
+    performance = serializers.PrimaryKeyRelatedField(
+        queryset=Performance.objects.select_related("theatre_hall")
+    )
+    seats = SeatSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        for seat in attrs["seats"]:
+            Ticket.validate_ticket(
+                seat["row"],
+                seat["seat"],
+                attrs["performance"],
+                serializers.ValidationError,
+            )
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            return hold_seats(
+                self.context["request"].user,
+                validated_data["performance"],
+                [
+                    (seat["row"], seat["seat"])
+                    for seat in validated_data["seats"]
+                ],
+            )
+        except SeatConflictError as error:
+            raise serializers.ValidationError({"seats": error.errors})
+
+
+class PerformanceSalesSerializer(serializers.Serializer):
+    performance = serializers.IntegerField(source="id")
+    play = serializers.IntegerField(source="play_id")
+    play_title = serializers.CharField(source="play__title")
+    theatre_hall = serializers.IntegerField(source="theatre_hall_id")
+    show_time = serializers.DateTimeField()
+    tickets_sold = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    occupancy = serializers.FloatField(help_text="Percent of seats sold")
+
+
+class OccupancySerializer(serializers.Serializer):
+    theatre_hall = serializers.IntegerField(required=False)
+    play = serializers.IntegerField(required=False)
+    performances = serializers.IntegerField()
+    tickets_sold = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    occupancy = serializers.FloatField(help_text="Percent of seats sold")
+
+
+class SalesSerializer(serializers.Serializer):
+    tickets_sold = serializers.IntegerField()
+    tickets_released = serializers.IntegerField()
+    bookings = serializers.IntegerField()
+
+
+class DailySalesSerializer(SalesSerializer):
+    date = serializers.DateField()
+    theatre_hall = serializers.IntegerField(required=False)
+    play = serializers.IntegerField(required=False)
+
+
+class HourlySalesSerializer(SalesSerializer):
+    hour = serializers.DateTimeField()
@@ -0,0 +1,49 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from theatre.cache import bump_version
+from theatre.models import Actor, Genre, Performance, Play, TheatreHall
+
+CACHE_NAMESPACES = {
+    Actor: ("actors", "plays"),
+    Genre: ("genres", "plays"),
+    Play: ("plays",),
+    Performance: ("plays",),
+    TheatreHall: ("theatre_halls", "plays"),
+}
+
+
+def invalidate_on_commit(*namespaces):
+    """
+    Bump the versions of ``namespaces`` once the current transaction
+    commits. Bumped earlier, a concurrent request could cache the rows
+    it still reads from before the commit under the new version.
+    """
+    transaction.on_commit(partial(bump_version, *namespaces))
+
+
+def invalidate_catalog_caches():
+    """Drop every cached catalog response, e.g. after bulk inserts."""
+    invalidate_on_commit(*{
+        namespace
+        for namespaces in CACHE_NAMESPACES.values()
+        for namespace in namespaces
+    })
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_catalog_cache(sender, **kwargs):
+    namespaces = CACHE_NAMESPACES.get(sender)
+    if namespaces:
+        invalidate_on_commit(*namespaces)
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def invalidate_play_relations_cache(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_on_commit("plays")
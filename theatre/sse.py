@@ -0,0 +1,175 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theatre.events import broker
+from theatre.models import Performance
+from theatre.seat_map import SeatMap
+
+SEAT_EVENTS_PATH = re.compile(
+    r"^/api/theatre/performances/(?P<pk>\d+)/seat-events/$"
+)
+HEARTBEAT_SECONDS = 15
+
+
+def _format_event(event_type, data):
+    return (
+        f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+    ).encode()
+
+
+def _raw_token(scope):
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            parts = value.decode("latin1").split()
+            if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+                return parts[1]
+    query = parse_qs(scope.get("query_string", b"").decode("latin1"))
+    return query.get("token", [None])[0]
+
+
+def _load_snapshot(user_id, performance_id):
+    user = get_user_model().objects.filter(
+        **{api_settings.USER_ID_FIELD: user_id},
+        is_active=True,
+        is_email_verified=True,
+    ).first()
+    if user is None:
+        return 401, None
+
+    performances = Performance.objects.select_related("theatre_hall")
+    if user.theatre_hall_id:
+        performances = performances.filter(
+            theatre_hall_id=user.theatre_hall_id
+        )
+    performance = performances.filter(pk=performance_id).first()
+    if performance is None:
+        return 404, None
+
+    seat_map = SeatMap.for_performance(performance)
+    return 200, {
+        "performance": performance.id,
+        "rows": seat_map.rows,
+        "seats_in_row": seat_map.seats_in_row,
+        "encoding": "base64",
+        "seat_map": seat_map.to_base64(),
+    }
+
+
+class SeatEventsApp:
+    """
+    ASGI app streaming seat availability of a performance as
+    Server-Sent Events, other requests go to ``fallback``.
+
+    The stream starts with a ``snapshot`` event holding the seat map,
+    followed by ``taken``/``released`` deltas published by the booking
+    path. Listeners subscribe before the snapshot is loaded, so no delta
+    committed meanwhile is lost; one the snapshot already holds is sent
+    again, which is harmless. Idle listeners only wait on their queue,
+    so they cost no database queries. The access token is read from the
+    ``Authorization`` header or the ``token`` query parameter, because
+    browsers' EventSource cannot send headers.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        match = (
+            SEAT_EVENTS_PATH.match(scope["path"])
+            if scope["type"] == "http"
+            else None
+        )
+        if match is None:
+            return await self.fallback(scope, receive, send)
+
+        if scope["method"] != "GET":
+            return await self._respond(send, 405, "Method not allowed.")
+
+        raw_token = _raw_token(scope)
+        try:
+            if raw_token is None:
+                raise TokenError("Token is missing.")
+            token = AccessToken(raw_token)
+        except TokenError:
+            return await self._respond(send, 401, "Invalid token.")
+
+        performance_id = int(match["pk"])
+        queue = broker.subscribe(performance_id)
+        try:
+            status, snapshot = await sync_to_async(_load_snapshot)(
+                token[api_settings.USER_ID_CLAIM], performance_id
+            )
+            if status != 200:
+                return await self._respond(send, status, "Not available.")
+
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            })
+            await self._send_chunk(send, _format_event("snapshot", snapshot))
+            await self._stream(queue, receive, send)
+        finally:
+            broker.unsubscribe(performance_id, queue)
+
+    async def _stream(self, queue, receive, send):
+        disconnected = asyncio.ensure_future(
+            self._wait_for_disconnect(receive)
+        )
+        try:
+            while True:
+                next_event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {next_event, disconnected},
+                    timeout=HEARTBEAT_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    next_event.cancel()
+                    break
+                if next_event in done:
+                    await self._send_chunk(
+                        send, _format_event(*next_event.result())
+                    )
+                else:
+                    next_event.cancel()
+                    await self._send_chunk(send, b": keep-alive\n\n")
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    async def _send_chunk(send, body):
+        await send({
+            "type": "http.response.body",
+            "body": body,
+            "more_body": True,
+        })
+
+    @staticmethod
+    async def _respond(send, status, detail):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({
+            "type": "http.response.body",
+            "body": json.dumps({"detail": detail}).encode(),
+        })
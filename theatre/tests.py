@@ -1,15 +1,69 @@
+import asyncio
+import base64
+import csv
+import datetime
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from urllib.parse import urlencode
+
 import requests
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.db import connection
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.conf import settings
+from django.db import (
+    OperationalError,
+    connection,
+    connections,
+    transaction,
+)
 from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from PIL import Image
 
-from theatre.models import Reservation, Ticket, Performance, TheatreHall
+from theatre.booking import SeatConflictError, create_tickets
+from theatre.cache import VERSION_KEY, get_version
+from theatre.events import RedisSeatEventBroker, broker, redis
+from theatre.filters import upcoming_performances
+from theatre.holds import sweep_expired_holds
+from theatre.instrumentation import registry
+from theatre import replicas
+from theatre.models import (
+    Actor,
+    Genre,
+    HourlySales,
+    Play,
+    Reservation,
+    Ticket,
+    Performance,
+    TheatreHall,
+    SeatHold
+)
+from theatre.scheduling import (
+    archive_past_performances,
+    count_schedule,
+    expand_schedule,
+)
+from theatre.serializers import PerformanceListSerializer
+from theatre.seat_map import SeatMap
+from theatre.sse import SeatEventsApp, _load_snapshot
+from theatre.throttling import TokenBucketThrottle
+from theatre.transfer import import_batch
 
 
 def create_user_reservation(
@@ -35,10 +89,16 @@ def assign_theatre_hall(user):
     user.theatre_hall = hall
     user.save()
 
+# Replica reads are covered by ReplicaIntegrationTests, TestCase data is
+# not visible to other connections.
+@override_settings(DATABASE_REPLICAS=[])
 class BaseAuthorizedAPITest(TestCase):
     fixtures = ["theatre_data.json"]
 
     def setUp(self):
+        cache.clear()
+        caches["throttle"].clear()
+        caches["shared"].clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "test@test.com", "testpass"
@@ -71,7 +131,7 @@ class PlayViewTests(BaseAuthorizedAPITest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         self.assertTrue(
-            isinstance(response.data[0]["genres"][0], str),
+            isinstance(response.data["results"][0]["genres"][0], str),
             "Genres are not a slug field!"
         )
 
@@ -120,13 +180,62 @@ class ReservationViewTests(BaseAuthorizedAPITest):
             sqls = [q["sql"] for q in ctx2.captured_queries]
             self.assertEqual(len(sqls), len(set(sqls)))
 
+    def test_reservation_history_is_flat_and_paginated(self):
+        create_user_reservation(self.user, 3, 3, 1)
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(), user=self.user
+        )
+        for row, seat, performance_pk in ((2, 2, 2), (2, 1, 2), (4, 4, 1)):
+            Ticket.objects.create(
+                reservation=reservation,
+                row=row,
+                seat=seat,
+                performance_id=performance_pk,
+            )
+        other_user = get_user_model().objects.create_user(
+            "other@test.com", "testpass"
+        )
+        create_user_reservation(other_user, 5, 5, 1)
+        url = self.get_theatre_url("reservation-history")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["id"], reservation.id)
+        self.assertEqual(
+            [
+                (performance["performance"], performance["theatre_hall"])
+                for performance in results[0]["performances"]
+            ],
+            [(1, "Main Hall"), (2, "Sub Hall")],
+        )
+        self.assertEqual(
+            results[0]["performances"][1]["seats"],
+            [{"row": 2, "seat": 1}, {"row": 2, "seat": 2}],
+        )
+        self.assertEqual(
+            results[0]["performances"][0]["play_title"], "Hamlet"
+        )
+
+        for seat in range(1, 6):
+            create_user_reservation(self.user, seat, 6, 1)
+        with CaptureQueriesContext(connection) as ctx2:
+            response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(len(ctx.captured_queries), len(ctx2))
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+
 class PerformanceViewTests(BaseAuthorizedAPITest):
     def test_performance_filter_for_overseer_shows_only_by_theatre_hall(self):
         assign_theatre_hall(self.user)
         response = self.client.get(
-            self.get_theatre_url("performance-list")
+            self.get_theatre_url("performance-list"), {"upcoming": "false"}
         )
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_create_performance_by_overseer(self):
         assign_theatre_hall(self.user)
@@ -150,3 +259,1935 @@ class PerformanceViewTests(BaseAuthorizedAPITest):
             }
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def schedule(self, **data):
+        rule = {
+            "play": 1,
+            "theatre_halls": [1, 2],
+            "times": ["19:00", "21:30"],
+            "weekdays": [5, 6],
+            "start_date": "2026-11-02",
+            "end_date": "2026-11-15",
+        }
+        rule.update(data)
+        return self.client.post(
+            self.get_theatre_url("performance-schedule"),
+            data=rule,
+            format="json",
+        )
+
+    def test_schedule_creates_performances_in_bulk(self):
+        before = Performance.objects.count()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.schedule()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Two weekends, two show times, two halls.
+        self.assertEqual(response.data["created"], 16)
+        self.assertEqual(response.data["skipped"], 0)
+        self.assertEqual(
+            response.data["first_show_time"], "2026-11-07T19:00:00Z"
+        )
+        self.assertEqual(
+            response.data["last_show_time"], "2026-11-15T21:30:00Z"
+        )
+        self.assertEqual(Performance.objects.count(), before + 16)
+        self.assertLess(len(ctx.captured_queries), 16)
+        self.assertEqual(
+            Performance
+            .objects
+            .filter(show_time__date="2026-11-08", theatre_hall_id=2)
+            .count(),
+            2,
+        )
+
+        response = self.schedule()
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(response.data["skipped"], 16)
+        self.assertEqual(Performance.objects.count(), before + 16)
+
+    def test_schedule_by_overseer(self):
+        assign_theatre_hall(self.user)
+
+        response = self.schedule()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("theatre_halls", response.data)
+
+        response = self.schedule(theatre_halls=[1])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 8)
+
+    def test_schedule_rejects_invalid_rules(self):
+        response = self.schedule(
+            start_date="2026-11-15", end_date="2026-11-02"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("end_date", response.data)
+
+        response = self.schedule(weekdays=[7])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with override_settings(PERFORMANCE_SCHEDULE_MAX_SIZE=10):
+            response = self.schedule()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            Performance.objects.filter(show_time__year=2026).exists()
+        )
+
+    def test_schedule_rejects_oversized_rules_before_expanding(self):
+        times = [f"{hour:02}:{minute:02}" for hour in range(24)
+                 for minute in (0, 30)]
+        with patch("theatre.serializers.expand_schedule") as expand:
+            response = self.schedule(
+                times=times,
+                weekdays=list(range(7)),
+                start_date="2026-01-01",
+                end_date="2027-12-31",
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+            self.assertIn("70080 performances", str(response.data))
+            expand.assert_not_called()
+
+        response = self.schedule(times=[*times, "23:59"])
+        self.assertIn("times", response.data)
+
+        response = self.schedule(start_date="0001-01-01")
+        self.assertIn("end_date", response.data)
+
+        response = self.schedule(
+            start_date="9999-12-30", end_date="9999-12-31"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("end_date", response.data)
+
+    def test_count_schedule_matches_expansion(self):
+        for start, end, weekdays in (
+            (datetime.date(2026, 11, 2), datetime.date(2026, 11, 15), [5, 6]),
+            (datetime.date(2026, 11, 4), datetime.date(2026, 12, 1), [0, 3]),
+            (datetime.date(2026, 11, 4), datetime.date(2026, 11, 4), [2]),
+            (datetime.date(2026, 11, 4), datetime.date(2026, 11, 9), [1]),
+        ):
+            times = [datetime.time(12), datetime.time(18)]
+            self.assertEqual(
+                count_schedule(start, end, times, weekdays),
+                len(expand_schedule(start, end, times, weekdays)),
+            )
+
+    def test_create_performance_rejects_overlapping_time_slot(self):
+        url = self.get_theatre_url("performance-list")
+        data = {"play": 2, "theatre_hall": 1, "duration": "01:30:00"}
+
+        response = self.client.post(
+            url, data={**data, "show_time": "2025-09-01T20:30:00Z"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("performance 1", response.data["show_time"][0])
+
+        response = self.client.post(
+            url, data={**data, "show_time": "2025-09-01T17:30:00Z"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(
+            url,
+            data={
+                **data,
+                "theatre_hall": 2,
+                "show_time": "2025-09-01T20:30:00Z",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.patch(
+            self.get_theatre_url("performance-detail", pk=1),
+            data={"show_time": "2025-09-01T19:30:00Z"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.patch(
+            self.get_theatre_url("performance-detail", pk=1),
+            data={"duration": "13:00:00"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_schedule_rejects_overlapping_time_slots(self):
+        response = self.schedule(times=["19:00", "20:00"])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(
+            "another show of this schedule", response.data["show_times"][0]
+        )
+
+        response = self.schedule(
+            play=2,
+            theatre_halls=[1],
+            weekdays=[0],
+            start_date="2025-09-01",
+            end_date="2025-09-30",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data["show_times"]), 1)
+        self.assertIn("performance 1", response.data["show_times"][0])
+        self.assertEqual(Performance.objects.count(), 2)
+
+        response = self.schedule(times=["12:00", "20:00"], duration="03:00:00")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            set(
+                Performance
+                .objects
+                .filter(show_time__year=2026)
+                .values_list("duration", flat=True)
+            ),
+            {datetime.timedelta(hours=3)},
+        )
+
+
+class PerformanceFilterTests(BaseAuthorizedAPITest):
+    def setUp(self):
+        super().setUp()
+        self.upcoming = Performance.objects.create(
+            play_id=1,
+            theatre_hall_id=1,
+            show_time=timezone.now() + datetime.timedelta(days=3),
+        )
+
+    def list_ids(self, **params):
+        response = self.client.get(
+            self.get_theatre_url("performance-list"), params
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [performance["id"] for performance in response.data["results"]]
+
+    def test_past_performances_are_listed_only_when_asked_for(self):
+        self.assertEqual(self.list_ids(), [self.upcoming.id])
+        self.assertEqual(self.list_ids(upcoming="true"), [self.upcoming.id])
+        self.assertEqual(
+            self.list_ids(upcoming="false"), [1, 2, self.upcoming.id]
+        )
+        self.assertEqual(
+            self.list_ids(upcoming="false", hall=2, play=1), [2]
+        )
+
+    def test_show_time_filters_are_ranges(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.list_ids(date="2025-09-04"), [2])
+        self.assertFalse(
+            any("cast_date" in query["sql"] for query in ctx.captured_queries)
+        )
+        self.assertEqual(
+            self.list_ids(
+                **{"from": "2025-09-01T19:00:00Z", "to": "2025-09-04T19:00Z"}
+            ),
+            [1],
+        )
+        self.assertEqual(
+            self.list_ids(**{"from": "2025-09-02T00:00:00Z"}),
+            [2, self.upcoming.id],
+        )
+
+    def test_upcoming_list_uses_partial_index(self):
+        call_command("archive_performances", stdout=StringIO())
+        self.assertEqual(
+            list(
+                Performance
+                .objects
+                .filter(is_archived=False)
+                .values_list("id", flat=True)
+            ),
+            [self.upcoming.id],
+        )
+        self.assertEqual(self.list_ids(), [self.upcoming.id])
+
+        plan = upcoming_performances(
+            Performance.objects.order_by("show_time", "id")
+        ).explain()
+        self.assertIn("theatre_performance_future_idx", plan)
+
+        Performance.objects.filter(pk=1).update(
+            show_time=timezone.now() + datetime.timedelta(days=1)
+        )
+        self.assertEqual(archive_past_performances(), (0, 1))
+
+    def test_rescheduled_performance_is_upcoming_again(self):
+        call_command("archive_performances", stdout=StringIO())
+
+        response = self.client.patch(
+            self.get_theatre_url("performance-detail", pk=1),
+            {"show_time": timezone.now() + datetime.timedelta(days=1)},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Performance.objects.get(pk=1).is_archived)
+        self.assertEqual(self.list_ids(), [1, self.upcoming.id])
+
+
+class BaseBookingAPITest(BaseAuthorizedAPITest):
+    def reserve(self, *seats, performance_pk=1):
+        return self.client.post(
+            self.get_theatre_url("reservation-list"),
+            data={
+                "created_at": timezone.now(),
+                "user": self.user.id,
+                "tickets": [
+                    {"row": row, "seat": seat, "performance": performance_pk}
+                    for row, seat in seats
+                ],
+            },
+            format="json",
+        )
+
+    def get_seat_map(self, performance_pk=1):
+        response = self.client.get(
+            self.get_theatre_url("performance-seat-map", pk=performance_pk)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return SeatMap(
+            response.data["rows"],
+            response.data["seats_in_row"],
+            base64.b64decode(response.data["seat_map"]),
+        ), response.data
+
+
+class SeatMapTests(BaseBookingAPITest):
+    def test_seat_map_bit_layout(self):
+        seat_map = SeatMap(2, 5)
+        seat_map.take(1, 1)
+        seat_map.take(2, 5)
+
+        self.assertEqual(seat_map.to_bytes(), bytes([0b10000000, 0b01000000]))
+        self.assertEqual(seat_map.taken_count, 2)
+        seat_map.release(1, 1)
+        self.assertFalse(seat_map.is_taken(1, 1))
+
+    def test_seat_map_does_not_load_tickets(self):
+        with CaptureQueriesContext(connection) as ctx:
+            seat_map, data = self.get_seat_map()
+
+        self.assertTrue(seat_map.is_taken(1, 5))
+        self.assertEqual(data["tickets_available"], 199)
+        self.assertFalse(
+            any("theatre_ticket" in query["sql"]
+                for query in ctx.captured_queries)
+        )
+
+    def test_booking_and_cancelling_updates_seat_map(self):
+        response = self.reserve((2, 3), (2, 4))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        seat_map, data = self.get_seat_map()
+        self.assertTrue(seat_map.is_taken(2, 3))
+        self.assertTrue(seat_map.is_taken(2, 4))
+        self.assertEqual(data["tickets_available"], 197)
+
+        response = self.client.delete(
+            self.get_theatre_url(
+                "reservation-detail", pk=response.data["id"]
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        seat_map, _ = self.get_seat_map()
+        self.assertFalse(seat_map.is_taken(2, 3))
+        self.assertTrue(seat_map.is_taken(1, 5))
+
+    def test_moving_to_another_hall_repacks_seat_map(self):
+        self.reserve((2, 7))
+        url = self.get_theatre_url("performance-detail", pk=1)
+        narrow = TheatreHall.objects.create(
+            name="Narrow", rows=10, seats_in_row=8
+        )
+
+        response = self.client.patch(url, {"theatre_hall": narrow.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seat_map, data = self.get_seat_map()
+        self.assertEqual(data["seats_in_row"], 8)
+        self.assertTrue(seat_map.is_taken(1, 5))
+        self.assertTrue(seat_map.is_taken(2, 7))
+        self.assertEqual(seat_map.taken_count, 2)
+
+        narrower = TheatreHall.objects.create(
+            name="Narrower", rows=10, seats_in_row=6
+        )
+        response = self.client.patch(url, {"theatre_hall": narrower.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("theatre_hall", response.data)
+        self.assertEqual(
+            Performance.objects.get(pk=1).theatre_hall_id, narrow.id
+        )
+
+
+class BulkBookingTests(BaseBookingAPITest):
+    def test_booking_query_count_does_not_grow_with_seats(self):
+        with CaptureQueriesContext(connection) as single:
+            response = self.reserve((3, 1))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as group:
+            response = self.reserve(*((4, seat) for seat in range(1, 11)))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(single), len(group))
+        self.assertEqual(
+            Ticket.objects.filter(performance_id=1, row=4).count(), 10
+        )
+
+    def test_taken_and_duplicate_seats_keep_unique_error(self):
+        response = self.reserve((1, 5), (2, 2), (2, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["tickets"]
+        self.assertIn("must make a unique set", str(errors[0]))
+        self.assertEqual(errors[1], {})
+        self.assertIn("must make a unique set", str(errors[2]))
+        self.assertFalse(Ticket.objects.filter(row=2, seat=2).exists())
+
+    def test_seat_outside_hall_is_rejected(self):
+        response = self.reserve((11, 1))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("available range", str(response.data["tickets"]))
+
+    def test_unknown_performance_is_rejected(self):
+        response = self.reserve((1, 1), performance_pk=999)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("does not exist", str(response.data["tickets"]))
+
+
+class SeatHoldTests(BaseBookingAPITest):
+    def setUp(self):
+        super().setUp()
+        self.other_user = get_user_model().objects.create_user(
+            "other@test.com", "testpass", is_email_verified=True
+        )
+
+    def hold(self, *seats, user=None, performance_pk=1):
+        self.client.force_authenticate(user or self.user)
+        response = self.client.post(
+            self.get_theatre_url("seat-hold-list"),
+            data={
+                "performance": performance_pk,
+                "seats": [{"row": row, "seat": seat} for row, seat in seats],
+            },
+            format="json",
+        )
+        self.client.force_authenticate(self.user)
+        return response
+
+    def test_held_seat_cannot_be_held_or_booked_by_others(self):
+        response = self.hold((5, 5), (5, 6), user=self.other_user)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 2)
+
+        response = self.hold((5, 6))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("held by another customer", str(response.data))
+
+        response = self.reserve((5, 5))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("held by another customer", str(response.data))
+
+    def test_customers_manage_only_their_own_holds(self):
+        hold_id = self.hold((6, 1), user=self.other_user).data[0]["id"]
+        url = self.get_theatre_url("seat-hold-detail", pk=hold_id)
+
+        self.assertEqual(
+            self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND
+        )
+        self.client.force_authenticate(self.other_user)
+        response = self.client.get(self.get_theatre_url("seat-hold-list"))
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(
+            self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT
+        )
+
+        self.other_user.is_email_verified = False
+        self.other_user.save()
+        response = self.hold((6, 1), user=self.other_user)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reservation_consumes_own_holds(self):
+        self.hold((6, 1), (6, 2))
+
+        response = self.reserve((6, 1), (6, 2))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_expired_holds_are_ignored_and_swept(self):
+        self.hold((7, 1))
+        SeatHold.objects.update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        response = self.hold((7, 1), user=self.other_user)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        SeatHold.objects.update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        self.assertEqual(sweep_expired_holds(), 1)
+
+    def test_seat_sold_during_booking_is_a_validation_error(self):
+        performance = Performance.objects.select_related(
+            "theatre_hall"
+        ).get(pk=1)
+        reservation = Reservation.objects.create(
+            created_at=timezone.now(), user=self.user
+        )
+
+        with self.assertRaises(SeatConflictError):
+            create_tickets(
+                reservation,
+                [{"performance": performance, "row": 1, "seat": 5}],
+            )
+
+
+class BestAvailableTests(BaseBookingAPITest):
+    def reserve_best(self, party_size, performance_pk=1, **data):
+        return self.client.post(
+            self.get_theatre_url("reservation-best-available"),
+            data={
+                "performance": performance_pk,
+                "party_size": party_size,
+                **data,
+            },
+            format="json",
+        )
+
+    def test_best_block_prefers_center_of_middle_rows(self):
+        seat_map = SeatMap(10, 20)
+        self.assertEqual(
+            seat_map.best_block(4), [(5, 9), (5, 10), (5, 11), (5, 12)]
+        )
+
+        seat_map.take(5, 10)
+        self.assertEqual(seat_map.best_block(4)[0], (6, 9))
+        # Two seats off center weigh as much as one row.
+        self.assertEqual(
+            seat_map.best_block(4, preferred_row=5),
+            [(4, 9), (4, 10), (4, 11), (4, 12)],
+        )
+        self.assertEqual(seat_map.best_block(2, preferred_row=1)[0], (1, 10))
+
+    def test_best_block_is_none_without_contiguous_seats(self):
+        seat_map = SeatMap(2, 5)
+        for row in (1, 2):
+            seat_map.take(row, 3)
+
+        self.assertIsNone(seat_map.best_block(3))
+        self.assertEqual(seat_map.best_block(2), [(1, 1), (1, 2)])
+
+    def test_reserves_contiguous_seats(self):
+        response = self.reserve_best(3, preferred_row=1)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        seats = sorted(
+            (ticket["row"], ticket["seat"])
+            for ticket in response.data["tickets"]
+        )
+        # Seat 5 of the first row is sold in the fixture.
+        self.assertEqual(seats, [(1, 9), (1, 10), (1, 11)])
+
+        seat_map, data = self.get_seat_map()
+        self.assertTrue(all(seat_map.is_taken(*seat) for seat in seats))
+        self.assertEqual(data["tickets_available"], 196)
+        self.assertEqual(
+            Performance.objects.get(pk=1).tickets_sold, 4
+        )
+
+    def test_seats_held_by_others_are_skipped(self):
+        other_user = get_user_model().objects.create_user(
+            "other@test.com", "testpass", is_email_verified=True
+        )
+        SeatHold.objects.create(
+            performance_id=1,
+            user=other_user,
+            row=1,
+            seat=10,
+            expires_at=timezone.now() + datetime.timedelta(minutes=5),
+        )
+
+        response = self.reserve_best(2, preferred_row=1)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(ticket["seat"] for ticket in response.data["tickets"]),
+            [11, 12],
+        )
+
+    def test_invalid_party_size(self):
+        response = self.reserve_best(21)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("party_size", response.data)
+
+        response = self.reserve_best(2, preferred_row=11)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("preferred_row", response.data)
+
+    def test_no_block_left(self):
+        for _ in range(10):
+            response = self.reserve_best(15, performance_pk=2)
+            self.assertEqual(
+                response.status_code, status.HTTP_201_CREATED
+            )
+
+        response = self.reserve_best(6, performance_pk=2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("No block of 6 seats", str(response.data))
+        response = self.reserve_best(3, performance_pk=2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class TicketsSoldCounterTests(BaseBookingAPITest):
+    def get_tickets_available(self, performance_pk=1):
+        response = self.client.get(
+            self.get_theatre_url("performance-list"), {"upcoming": "false"}
+        )
+        return {
+            performance["id"]: performance["tickets_available"]
+            for performance in response.data["results"]
+        }[performance_pk]
+
+    def test_counter_follows_bookings_and_cancellations(self):
+        self.assertEqual(self.get_tickets_available(), 199)
+
+        response = self.reserve((8, 1), (8, 2), (8, 3))
+        self.assertEqual(self.get_tickets_available(), 196)
+
+        self.client.delete(
+            self.get_theatre_url(
+                "reservation-detail", pk=response.data["id"]
+            )
+        )
+        self.assertEqual(self.get_tickets_available(), 199)
+
+    def test_performance_list_does_not_touch_tickets(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.get_theatre_url("performance-list"))
+
+        self.assertFalse(
+            any("theatre_ticket" in query["sql"]
+                for query in ctx.captured_queries)
+        )
+
+    def test_reconcile_command_fixes_drift(self):
+        create_user_reservation(self.user, 1, 9, 2)
+        Performance.objects.filter(pk=1).update(tickets_sold=42)
+
+        call_command("reconcile_performance_counters", stdout=StringIO())
+
+        self.assertEqual(
+            dict(Performance.objects.values_list("id", "tickets_sold")),
+            {1: 1, 2: 1},
+        )
+
+    def test_reconcile_counts_tickets_of_locked_batches(self):
+        create_user_reservation(self.user, 1, 9, 2)
+        Performance.objects.update(tickets_sold=42, seat_map=b"")
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command(
+                "reconcile_performance_counters",
+                batch_size=1,
+                seat_maps=True,
+                stdout=StringIO(),
+            )
+
+        # Each batch counts its tickets after reading its performances.
+        reads = [
+            "tickets" if "COUNT(" in sql else "performances"
+            for sql in (query["sql"] for query in ctx.captured_queries)
+            if "COUNT(" in sql or 'INNER JOIN "theatre_theatrehall"' in sql
+        ]
+        self.assertEqual(reads, ["performances", "tickets"] * 2)
+        performance = Performance.objects.select_related(
+            "theatre_hall"
+        ).get(pk=2)
+        self.assertEqual(performance.tickets_sold, 1)
+        self.assertTrue(SeatMap.for_performance(performance).is_taken(9, 1))
+
+
+class SalesAnalyticsTests(BaseBookingAPITest):
+    def get_analytics(self, path, **params):
+        response = self.client.get(
+            self.get_theatre_url(f"analytics-{path}"), params
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_bookings_and_cancellations_update_hourly_sales(self):
+        self.reserve((8, 1), (8, 2))
+        response = self.reserve((9, 1), performance_pk=2)
+        self.client.delete(
+            self.get_theatre_url(
+                "reservation-detail", pk=response.data["id"]
+            )
+        )
+
+        self.assertEqual(
+            [
+                (row["theatre_hall"], row["tickets_sold"],
+                 row["tickets_released"], row["bookings"])
+                for row in self.get_analytics("daily")
+            ],
+            [(1, 2, 0, 1), (2, 1, 1, 1)],
+        )
+        [hour] = self.get_analytics("hourly")
+        self.assertEqual(hour["tickets_sold"], 3)
+
+    def test_daily_sales_by_play(self):
+        self.reserve((8, 1))
+        self.reserve((9, 1), performance_pk=2)
+
+        [row] = self.get_analytics("daily", group_by="play")
+        self.assertEqual(row["play"], 1)
+        self.assertEqual(row["bookings"], 2)
+
+    def test_invalid_group_by(self):
+        response = self.client.get(
+            self.get_theatre_url("analytics-occupancy"), {"group_by": "user"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_performance_occupancy(self):
+        self.reserve((8, 1), (8, 2), (8, 3))
+
+        performances = {
+            row["performance"]: row
+            for row in self.get_analytics("performances")["results"]
+        }
+        self.assertEqual(performances[1]["tickets_sold"], 4)
+        self.assertEqual(performances[1]["capacity"], 200)
+        self.assertEqual(performances[1]["occupancy"], 2.0)
+
+        occupancy = self.get_analytics("occupancy", hall=1)
+        self.assertEqual(
+            occupancy,
+            [
+                {
+                    "theatre_hall": 1,
+                    "performances": 1,
+                    "tickets_sold": 4,
+                    "capacity": 200,
+                    "occupancy": 2.0,
+                }
+            ],
+        )
+
+    def test_overseer_sees_only_own_hall(self):
+        self.reserve((8, 1))
+        self.reserve((9, 1), performance_pk=2)
+        self.user.is_staff = False
+        self.user.is_hall_overseer = True
+        assign_theatre_hall(self.user)
+
+        self.assertEqual(
+            [row["theatre_hall"] for row in self.get_analytics("daily")], [1]
+        )
+        self.assertEqual(
+            [row["theatre_hall"] for row in self.get_analytics("occupancy")],
+            [1],
+        )
+
+    def test_analytics_forbidden_for_overseer_without_hall(self):
+        self.user.is_staff = False
+        self.user.is_hall_overseer = True
+        self.user.save()
+
+        for path in ("performances", "occupancy", "daily", "hourly"):
+            with self.subTest(path=path):
+                response = self.client.get(
+                    self.get_theatre_url(f"analytics-{path}")
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_403_FORBIDDEN
+                )
+
+    def test_analytics_forbidden_for_customers(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        response = self.client.get(self.get_theatre_url("analytics-daily"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def get_export(self, path, **params):
+        response = self.client.get(
+            self.get_theatre_url(f"analytics-{path}"),
+            params,
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        return gzip.decompress(b"".join(response.streaming_content)).decode()
+
+    def test_export_sales_as_json_lines(self):
+        self.reserve((8, 1), (8, 2), (8, 3))
+
+        lines = self.get_export("export-sales").splitlines()
+
+        sales = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [(row["performance"], row["tickets_sold"]) for row in sales],
+            [(1, 4), (2, 0)],
+        )
+        self.assertEqual(sales[0]["occupancy"], 2.0)
+        self.assertEqual(sales[0]["show_time"], "2025-09-01T19:00:00Z")
+
+    def test_export_attendees_as_csv(self):
+        self.reserve((8, 2), (8, 1))
+        self.reserve((9, 1), performance_pk=2)
+
+        rows = list(
+            csv.DictReader(
+                io.StringIO(
+                    self.get_export(
+                        "export-attendees", export_format="csv", hall=1
+                    )
+                )
+            )
+        )
+
+        self.assertEqual(
+            [(row["row"], row["seat"]) for row in rows],
+            [("1", "5"), ("8", "1"), ("8", "2")],
+        )
+        self.assertEqual(rows[1]["email"], self.user.email)
+        self.assertEqual(rows[1]["play_title"], "Hamlet")
+
+    def test_overseer_exports_only_own_hall(self):
+        self.reserve((9, 1), performance_pk=2)
+        self.user.is_staff = False
+        self.user.is_hall_overseer = True
+        assign_theatre_hall(self.user)
+
+        lines = self.get_export("export-attendees").splitlines()
+
+        self.assertEqual(
+            [json.loads(line)["performance"] for line in lines], [1]
+        )
+
+    def test_csv_export_escapes_formulas(self):
+        self.user.email = "=1+1@x.com"
+        self.user.first_name = "@SUM(A1)"
+        self.user.last_name = "Smith"
+        self.user.save()
+        self.reserve((8, 1))
+
+        rows = list(
+            csv.DictReader(
+                io.StringIO(
+                    self.get_export(
+                        "export-attendees", export_format="csv", hall=1
+                    )
+                )
+            )
+        )
+
+        self.assertEqual(rows[1]["email"], "'=1+1@x.com")
+        self.assertEqual(rows[1]["first_name"], "'@SUM(A1)")
+        self.assertEqual(rows[1]["last_name"], "Smith")
+
+    def test_export_forbidden_for_overseer_without_hall(self):
+        self.reserve((8, 1))
+        self.user.is_staff = False
+        self.user.is_hall_overseer = True
+        self.user.save()
+
+        for path in ("export-attendees", "export-sales"):
+            with self.subTest(path=path):
+                response = self.client.get(
+                    self.get_theatre_url(f"analytics-{path}")
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_403_FORBIDDEN
+                )
+                self.assertFalse(response.streaming)
+
+    def test_export_reads_rows_while_streaming(self):
+        response = self.client.get(
+            self.get_theatre_url("analytics-export-attendees")
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            content = b"".join(response.streaming_content)
+
+        self.assertIn(b'"seat": 5', content)
+        self.assertTrue(
+            any("theatre_ticket" in query["sql"]
+                for query in ctx.captured_queries)
+        )
+
+    def test_invalid_export_format(self):
+        response = self.client.get(
+            self.get_theatre_url("analytics-export-sales"),
+            {"export_format": "xml"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command(self):
+        self.reserve((8, 1), (8, 2))
+        HourlySales.objects.update(tickets_sold=42)
+
+        call_command("rebuild_sales_analytics", stdout=StringIO())
+
+        self.assertEqual(
+            sorted(
+                HourlySales.objects.values_list(
+                    "theatre_hall_id", "tickets_sold", "bookings"
+                )
+            ),
+            [(1, 1, 1), (1, 2, 1)],
+        )
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class BenchmarkCommandsTests(TestCase):
+    def test_generated_data_is_consistent(self):
+        call_command(
+            "generate_theatre_data",
+            halls=2,
+            rows=2,
+            seats_in_row=5,
+            actors=5,
+            plays=3,
+            performances=4,
+            users=2,
+            tickets=30,
+            batch_size=7,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Ticket.objects.count(), 30)
+        for performance in Performance.objects.select_related(
+            "theatre_hall"
+        ):
+            self.assertEqual(
+                performance.tickets_sold, performance.tickets.count()
+            )
+            self.assertEqual(
+                SeatMap.for_performance(performance).taken_count,
+                performance.tickets_sold,
+            )
+        self.assertFalse(
+            Play.objects.filter(actors=None).exists()
+        )
+
+    def test_generated_performances_do_not_overlap(self):
+        call_command(
+            "generate_theatre_data",
+            halls=2,
+            plays=3,
+            performances=8000,
+            users=0,
+            tickets=0,
+            stdout=StringIO(),
+        )
+
+        now = timezone.now()
+        for hall in TheatreHall.objects.all():
+            performances = list(hall.performances.order_by("show_time"))
+            self.assertEqual(len(performances), 4000)
+            for previous, performance in zip(
+                performances, performances[1:]
+            ):
+                self.assertLessEqual(
+                    previous.end_time, performance.show_time
+                )
+            for performance in performances:
+                self.assertEqual(
+                    performance.is_archived, performance.show_time < now
+                )
+        self.assertTrue(Performance.objects.filter(is_archived=True).exists())
+
+    def test_benchmark_reports_every_endpoint(self):
+        call_command(
+            "generate_theatre_data",
+            halls=1,
+            actors=2,
+            plays=2,
+            performances=2,
+            users=1,
+            tickets=10,
+            stdout=StringIO(),
+        )
+        stdout = StringIO()
+
+        call_command("benchmark_api", repeat=2, warmup=0, stdout=stdout)
+
+        self.assertIn("performance_seat_map", stdout.getvalue())
+        self.assertNotIn("status=4", stdout.getvalue())
+        self.assertNotIn("status=5", stdout.getvalue())
+
+    def test_serializer_benchmark_output_is_identical(self):
+        call_command(
+            "generate_theatre_data",
+            halls=1,
+            actors=3,
+            plays=2,
+            performances=3,
+            users=1,
+            tickets=5,
+            stdout=StringIO(),
+        )
+        stdout = StringIO()
+
+        call_command("benchmark_serializers", repeat=1, stdout=stdout)
+
+        self.assertEqual(stdout.getvalue().count("identical=True"), 2)
+
+
+class CursorPaginationTests(BaseAuthorizedAPITest):
+    def collect_pages(self, url, page_size, **params):
+        ids, pages = [], 0
+        url = f"{url}?{urlencode({'page_size': page_size, **params})}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), page_size)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+            pages += 1
+        return ids, pages
+
+    def test_performances_are_walked_in_show_time_order(self):
+        performance = Performance.objects.get(pk=1)
+        for hours in range(4):
+            performance.pk = None
+            performance.show_time += datetime.timedelta(hours=hours)
+            performance.save()
+
+        ids, pages = self.collect_pages(
+            self.get_theatre_url("performance-list"),
+            page_size=2,
+            upcoming="false",
+        )
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(
+            ids,
+            list(
+                Performance.objects.order_by("show_time", "id")
+                .values_list("id", flat=True)
+            ),
+        )
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(
+            self.get_theatre_url("play-list"), {"page_size": 10_000}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("next", response.data)
+        self.assertIn("results", response.data)
+
+
+class SparseFieldsetTests(BaseAuthorizedAPITest):
+    def get_with_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, [query["sql"] for query in ctx.captured_queries]
+
+    def test_play_list_with_only_id_and_title_skips_prefetches(self):
+        data, queries = self.get_with_queries(
+            self.get_theatre_url("play-list"), fields="id,title"
+        )
+
+        self.assertEqual(set(data["results"][0]), {"id", "title"})
+        self.assertFalse(
+            any(
+                table in sql
+                for sql in queries
+                for table in ("theatre_genre", "theatre_performance")
+            )
+        )
+
+    def test_play_list_collapses_relations_that_are_not_expanded(self):
+        data, queries = self.get_with_queries(
+            self.get_theatre_url("play-list"),
+            fields="id,genres,performances",
+            expand="genres",
+        )
+
+        hamlet = next(play for play in data["results"] if play["id"] == 1)
+        self.assertEqual(hamlet["genres"], ["Drama"])
+        self.assertEqual(hamlet["performances"], [1, 2])
+        self.assertFalse(any("theatre_theatrehall" in sql for sql in queries))
+
+    def test_play_list_without_parameters_is_unchanged(self):
+        data, _ = self.get_with_queries(self.get_theatre_url("play-list"))
+
+        hamlet = next(play for play in data["results"] if play["id"] == 1)
+        self.assertEqual(
+            set(hamlet["performances"][0]),
+            {
+                "id",
+                "theatre_hall_name",
+                "theatre_hall_capacity",
+                "show_time",
+                "duration",
+                "play",
+            },
+        )
+
+    def test_performance_list_skips_hall_join(self):
+        data, queries = self.get_with_queries(
+            self.get_theatre_url("performance-list"),
+            fields="id,show_time",
+            upcoming="false",
+        )
+
+        self.assertEqual(
+            data["results"][0],
+            {"id": 1, "show_time": "2025-09-01T19:00:00Z"},
+        )
+        self.assertFalse(any("theatre_theatrehall" in sql for sql in queries))
+
+    def test_performance_detail_with_collapsed_play(self):
+        data, queries = self.get_with_queries(
+            self.get_theatre_url("performance-detail", pk=1), expand=""
+        )
+
+        self.assertEqual(data["play"], 1)
+        self.assertEqual(data["taken_places"], [{"row": 1, "seat": 5}])
+        self.assertFalse(any("theatre_actor" in sql for sql in queries))
+
+    def test_writes_ignore_fieldset(self):
+        response = self.client.post(
+            self.get_theatre_url("genre-list") + "?fields=id",
+            {"name": "Opera"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["name"], "Opera")
+
+
+class FastListSerializationTests(BaseAuthorizedAPITest):
+    def setUp(self):
+        super().setUp()
+        actor = Actor.objects.create(first_name="Zoë", last_name="Ł\u2028")
+        play = Play.objects.get(pk=1)
+        play.actors.add(actor)
+        play.genres.add(Genre.objects.create(name="Ópera"))
+        Play.objects.create(title="Empty", description="No shows")
+
+    def get_content(self, url, params, fast):
+        caches["shared"].clear()
+        with override_settings(FAST_LIST_SERIALIZATION=fast):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content
+
+    def assert_same_content(self, url_name, **params):
+        url = self.get_theatre_url(url_name)
+        content = self.get_content(url, params, fast=True)
+        self.assertEqual(content, self.get_content(url, params, fast=False))
+        return content
+
+    def test_play_list_matches_serializer(self):
+        for params in (
+            {},
+            {"page_size": 1},
+            {"fields": "id,title"},
+            {"expand": ""},
+            {"expand": "performances", "fields": "id,performances"},
+            {"q": "hamlet"},
+        ):
+            with self.subTest(**params):
+                self.assert_same_content("play-list", **params)
+
+    def test_performance_list_matches_serializer(self):
+        for params in (
+            {"upcoming": "false"},
+            {"upcoming": "false", "page_size": 1},
+            {"upcoming": "false", "fields": "id,theatre_hall_capacity"},
+            {},
+        ):
+            with self.subTest(**params):
+                self.assert_same_content("performance-list", **params)
+
+    def test_line_separators_are_escaped(self):
+        content = self.assert_same_content("play-list")
+
+        self.assertIn(b"\\u2028", content)
+        self.assertIn("Zoë".encode(), content)
+
+    def test_fast_list_skips_model_serializer(self):
+        with patch.object(
+            PerformanceListSerializer,
+            "to_representation",
+            side_effect=AssertionError,
+        ):
+            content = self.get_content(
+                self.get_theatre_url("performance-list"),
+                {"upcoming": "false"},
+                fast=True,
+            )
+
+        self.assertIn(b'"theatre_hall_name":"Main Hall"', content)
+
+
+class CatalogCacheTests(BaseAuthorizedAPITest):
+    def test_cached_list_skips_database(self):
+        url = self.get_theatre_url("play-list")
+        first = self.client.get(url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url)
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_filters_are_part_of_cache_key(self):
+        url = self.get_theatre_url("genre-list")
+        self.client.get(url)
+
+        response = self.client.get(url, {"name": "comedy"})
+
+        self.assertEqual(
+            [genre["name"] for genre in response.data], ["Comedy"]
+        )
+
+    def test_conditional_request_returns_not_modified(self):
+        url = self.get_theatre_url("actor-list")
+        response = self.client.get(url)
+
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(response.content)
+
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_invalidate_dependent_lists(self):
+        genres_url = self.get_theatre_url("genre-list")
+        plays_url = self.get_theatre_url("play-list")
+        etag = self.client.get(genres_url)["ETag"]
+        self.client.get(plays_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(genres_url, {"name": "Opera"})
+            Play.objects.get(pk=1).genres.add(
+                Genre.objects.get(name="Opera")
+            )
+
+        response = self.client.get(genres_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Opera", [genre["name"] for genre in response.data])
+
+        response = self.client.get(plays_url)
+        self.assertIn("Opera", response.data["results"][0]["genres"])
+
+    def test_versions_are_bumped_after_commit(self):
+        version = get_version("plays")
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                play = Play.objects.create(title="Macbeth", description="")
+                play.genres.add(1)
+                # A concurrent request still reads the old rows.
+                self.assertEqual(get_version("plays"), version)
+        self.assertEqual(get_version("plays"), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_version("plays"), version)
+
+    def test_versions_and_responses_are_shared_by_workers(self):
+        url = self.get_theatre_url("actor-list")
+        etag = self.client.get(url)["ETag"]
+
+        # Only the shared cache is seen by the other worker processes.
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(response["ETag"], etag)
+
+        caches["shared"].set(
+            VERSION_KEY.format(namespace="actors"), get_version("actors") + 1
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PlaySearchTests(BaseAuthorizedAPITest):
+    def search(self, query):
+        response = self.client.get(
+            self.get_theatre_url("play-list"), {"q": query}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [play["title"] for play in response.data["results"]]
+
+    def test_search_matches_title_and_description(self):
+        self.assertEqual(sorted(self.search("denmark")), ["Hamlet", "p"])
+        self.assertEqual(self.search("opera"), [])
+
+    def test_title_matches_rank_first(self):
+        Play.objects.create(
+            title="Rosencrantz",
+            description="Two courtiers wander through Hamlet's story.",
+        )
+
+        self.assertEqual(self.search("hamlet")[0], "Hamlet")
+
+        response = self.client.get(
+            self.get_theatre_url("play-list"), {"q": "hamlet", "page_size": 1}
+        )
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [play["title"] for play in response.data["results"]],
+            ["Rosencrantz"],
+        )
+
+    def test_index_follows_saved_plays(self):
+        play = Play.objects.get(title="p")
+        play.description = "A comedy set in Verona."
+        play.save()
+
+        self.assertEqual(self.search("verona"), ["p"])
+        self.assertEqual(self.search("denmark"), ["Hamlet"])
+
+
+class SeatEventsTests(BaseBookingAPITest):
+    def run_stream(self, headers=(), on_chunk=None):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/theatre/performances/1/seat-events/",
+            "query_string": b"",
+            "headers": list(headers),
+        }
+        messages = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                messages.append(message)
+                body = message.get("body", b"")
+                if body and on_chunk and not on_chunk(body.decode()):
+                    disconnect.set()
+
+            async def fallback(scope, receive, send):
+                self.fail("Seat events request reached Django")
+
+            await asyncio.wait_for(
+                SeatEventsApp(fallback)(scope, receive, send), timeout=5
+            )
+
+        async_to_sync(run)()
+        return messages
+
+    def test_stream_sends_snapshot_then_deltas(self):
+        token = str(AccessToken.for_user(self.user))
+        chunks = []
+
+        def on_chunk(chunk):
+            chunks.append(chunk)
+            if len(chunks) == 1:
+                threading.Thread(
+                    target=broker.publish,
+                    args=(1, "taken", {"performance": 1, "seats": [[2, 2]]}),
+                ).start()
+            return len(chunks) < 2
+
+        messages = self.run_stream(
+            headers=[(b"authorization", f"Bearer {token}".encode())],
+            on_chunk=on_chunk,
+        )
+
+        self.assertEqual(messages[0]["status"], 200)
+        self.assertTrue(chunks[0].startswith("event: snapshot\n"))
+        self.assertIn('"seat_map": "CA', chunks[0])
+        self.assertEqual(
+            chunks[1],
+            'event: taken\ndata: {"performance": 1, "seats": [[2, 2]]}\n\n',
+        )
+        self.assertEqual(broker.subscriber_count(1), 0)
+
+    def test_seats_booked_while_loading_snapshot_are_sent(self):
+        token = str(AccessToken.for_user(self.user))
+        chunks = []
+        event = {"performance": 1, "seats": [[3, 3]]}
+
+        def load_snapshot(*args):
+            # Booked before the snapshot is read, published after.
+            snapshot = _load_snapshot(*args)
+            broker.publish(1, "taken", event)
+            return snapshot
+
+        def on_chunk(chunk):
+            chunks.append(chunk)
+            return len(chunks) < 2
+
+        with patch("theatre.sse._load_snapshot", load_snapshot):
+            self.run_stream(
+                headers=[(b"authorization", f"Bearer {token}".encode())],
+                on_chunk=on_chunk,
+            )
+
+        self.assertTrue(chunks[0].startswith("event: snapshot\n"))
+        self.assertEqual(
+            chunks[1], f"event: taken\ndata: {json.dumps(event)}\n\n"
+        )
+
+    def test_stream_requires_token(self):
+        messages = self.run_stream()
+
+        self.assertEqual(messages[0]["status"], 401)
+
+    def test_booking_publishes_after_commit(self):
+        published = []
+        with patch.object(broker, "publish", side_effect=(
+            lambda *args: published.append(args)
+        )):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.reserve((9, 9))
+
+        self.assertEqual(
+            published,
+            [(1, "taken", {"performance": 1, "seats": [[9, 9]]})],
+        )
+
+    @skipUnless(redis, "Install redis to run")
+    def test_redis_broker_shares_events_between_processes(self):
+        with patch("redis.Redis.from_url") as from_url:
+            redis_broker = RedisSeatEventBroker("redis://redis:6379/3")
+        client = from_url.return_value
+        event = {"performance": 1, "seats": [[2, 2]]}
+
+        redis_broker.publish(1, "taken", event)
+        channel, payload = client.publish.call_args.args
+        self.assertEqual(channel, "seat-events:1")
+
+        async def listen():
+            queue = redis_broker.subscribe(1)
+            # As received by the listener thread of every process.
+            redis_broker._receive(
+                {"channel": channel.encode(), "data": payload.encode()}
+            )
+            return await asyncio.wait_for(queue.get(), timeout=5)
+
+        self.assertEqual(async_to_sync(listen)(), ("taken", event))
+        client.pubsub.return_value.psubscribe.assert_called_once()
+
+
+class MetricsTests(BaseAuthorizedAPITest):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_metrics_are_recorded_per_view_and_action(self):
+        self.client.get(self.get_theatre_url("performance-list"))
+        self.client.get(self.get_theatre_url("performance-detail", pk=1))
+
+        response = self.client.get(self.get_theatre_url("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        for metric in (
+            "theatre_db_queries",
+            "theatre_db_duration_seconds",
+            "theatre_view_cpu_seconds",
+            "theatre_response_size_bytes",
+        ):
+            self.assertIn(
+                f'{metric}_count{{view="PerformanceViewSet.list"}} 1', body
+            )
+        self.assertIn(
+            'theatre_db_queries_count{view="PerformanceViewSet.retrieve"} 1',
+            body,
+        )
+        self.assertIn(
+            'theatre_responses_total{view="PerformanceViewSet.list",'
+            'status="200"} 1',
+            body,
+        )
+
+    def test_query_count_is_exact(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.get_theatre_url("performance-list"))
+        query_count = len(ctx.captured_queries)
+
+        body = self.client.get(self.get_theatre_url("metrics")).content
+        self.assertIn(
+            f'theatre_db_queries_sum{{view="PerformanceViewSet.list"}} '
+            f"{query_count}\n".encode(),
+            body,
+        )
+
+    def test_metrics_are_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+
+        response = self.client.get(self.get_theatre_url("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@patch.dict(TokenBucketThrottle.THROTTLE_RATES, {"reservations": "2/hour"})
+class BookingThrottleTests(BaseBookingAPITest):
+    def setUp(self):
+        super().setUp()
+        self.now = 1_000_000.0
+        timer = patch.object(
+            TokenBucketThrottle, "timer", lambda throttle: self.now
+        )
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def test_throttle_cache_is_local_in_tests(self):
+        # setUp clears it, which must not reset a development server.
+        self.assertIsInstance(caches["throttle"], LocMemCache)
+        self.assertIsInstance(caches["shared"], LocMemCache)
+
+    def test_bookings_are_capped_by_bucket(self):
+        self.assertEqual(self.reserve((7, 1)).status_code, 201)
+        self.assertEqual(self.reserve((7, 2)).status_code, 201)
+
+        response = self.reserve((7, 3))
+
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(response["Retry-After"], "1800")
+
+    def test_bucket_refills_over_time(self):
+        self.reserve((7, 1))
+        self.reserve((7, 2))
+
+        self.now += 1800
+
+        self.assertEqual(self.reserve((7, 3)).status_code, 201)
+        self.assertEqual(
+            self.reserve((7, 4)).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    def test_reads_are_free_and_holds_share_the_bucket(self):
+        for _ in range(3):
+            self.client.get(self.get_theatre_url("reservation-list"))
+        self.client.post(
+            self.get_theatre_url("seat-hold-list"),
+            {"performance": 1, "seats": [{"row": 6, "seat": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(self.reserve((7, 1)).status_code, 201)
+        self.assertEqual(
+            self.reserve((7, 2)).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    def test_bucket_state_is_constant_size(self):
+        self.reserve((7, 1))
+        self.reserve((7, 2))
+
+        tokens, updated_at = caches["throttle"].get(
+            f"throttle_reservations_{self.user.pk}"
+        )
+        self.assertEqual((tokens, updated_at), (0, self.now))
+
+
+def make_image(size=(2400, 1200), image_format="PNG", mode="RGBA"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 255)[:len(mode)]).save(
+        buffer, image_format
+    )
+    return SimpleUploadedFile(
+        f"poster.{image_format.lower()}",
+        buffer.getvalue(),
+        content_type=f"image/{image_format.lower()}",
+    )
+
+
+class ImageRenditionTests(BaseAuthorizedAPITest):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(
+            MEDIA_ROOT=media_root, IMAGE_RENDITIONS_ASYNC=False
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, url_name, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.get_theatre_url(url_name, pk=1),
+                {"image": image},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_play_renditions_are_resized_and_exposed(self):
+        self.upload("play-upload-image", make_image())
+
+        play = Play.objects.get(pk=1)
+        self.assertEqual(
+            set(play.image_renditions), {"thumbnail", "card", "full"}
+        )
+        with play.image.storage.open(
+            play.image_renditions["card"]["webp"]
+        ) as card:
+            self.assertEqual(Image.open(card).size, (480, 240))
+        with play.image.storage.open(
+            play.image_renditions["thumbnail"]["jpeg"]
+        ) as thumbnail:
+            image = Image.open(thumbnail)
+            self.assertEqual((image.format, image.size), ("JPEG", (160, 80)))
+
+        response = self.client.get(self.get_theatre_url("play-detail", pk=1))
+        self.assertTrue(
+            response.data["image_renditions"]["thumbnail"]["webp"]
+            .startswith("http://testserver/media/uploads/renditions/")
+        )
+
+    def test_same_content_reuses_renditions(self):
+        self.upload("play-upload-image", make_image())
+        Play.objects.filter(pk=2).update(image=Play.objects.get(pk=1).image)
+
+        call_command("process_images", stdout=StringIO())
+
+        self.assertEqual(
+            Play.objects.get(pk=2).image_renditions,
+            Play.objects.get(pk=1).image_renditions,
+        )
+
+    def test_new_image_drops_stale_renditions(self):
+        self.upload("play-upload-image", make_image())
+
+        # Renditions of the new image were lost, e.g. by a restart.
+        response = self.client.post(
+            self.get_theatre_url("play-upload-image", pk=1),
+            {"image": make_image((600, 300), "JPEG", "RGB")},
+            format="multipart",
+        )
+        self.assertEqual(response.data["image_renditions"], {})
+        self.assertEqual(Play.objects.get(pk=1).image_renditions, {})
+
+        call_command("process_images", stdout=StringIO())
+
+        play = Play.objects.get(pk=1)
+        with play.image.storage.open(
+            play.image_renditions["full"]["jpeg"]
+        ) as full:
+            self.assertEqual(Image.open(full).size, (600, 300))
+
+    def test_actor_image_uses_pipeline(self):
+        response = self.upload(
+            "actor-upload-image", make_image((300, 600), "JPEG", "RGB")
+        )
+
+        self.assertIn("uploads/actors/", response.data["image"])
+        actor = Actor.objects.get(pk=1)
+        self.assertEqual(
+            actor.image_renditions["full"]["jpeg"].rsplit(".", 1)[1], "jpeg"
+        )
+
+
+class TransferCommandsTests(BaseBookingAPITest):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f"{directory}/theatre.jsonl"
+        self.csv_path = f"{directory}/csv"
+
+    def snapshot(self):
+        return {
+            "plays": list(
+                Play.objects.order_by("id").values_list("id", "title")
+            ),
+            "play_actors": list(
+                Play.actors.through.objects.order_by("id").values_list(
+                    "play_id", "actor_id"
+                )
+            ),
+            "performances": [
+                (
+                    performance.id,
+                    performance.show_time,
+                    performance.tickets_sold,
+                    SeatMap.for_performance(performance).to_bytes(),
+                )
+                for performance in Performance.objects.select_related(
+                    "theatre_hall"
+                ).order_by("id")
+            ],
+            "tickets": list(
+                Ticket.objects.order_by("id").values_list(
+                    "performance_id", "row", "seat", "reservation__user_id"
+                )
+            ),
+        }
+
+    def clear_data(self):
+        Reservation.objects.all().delete()
+        Play.objects.all().delete()
+        Actor.objects.all().delete()
+        Genre.objects.all().delete()
+        TheatreHall.objects.all().delete()
+
+    def test_jsonl_round_trip(self):
+        self.reserve((2, 4), performance_pk=2)
+        before = self.snapshot()
+
+        call_command("export_theatre", self.path, stdout=StringIO())
+        self.clear_data()
+        stdout = StringIO()
+        call_command(
+            "import_theatre", self.path, batch_size=2, stdout=stdout
+        )
+
+        self.assertEqual(self.snapshot(), before)
+        self.assertIn("rows/s", stdout.getvalue())
+        self.assertIn("peak memory", stdout.getvalue())
+
+    def test_csv_round_trip(self):
+        before = self.snapshot()
+
+        call_command(
+            "export_theatre", self.csv_path, format="csv", stdout=StringIO()
+        )
+        self.clear_data()
+        call_command(
+            "import_theatre", self.csv_path, format="csv", stdout=StringIO()
+        )
+
+        self.assertEqual(self.snapshot(), before)
+
+    def test_interrupted_import_resumes(self):
+        before = self.snapshot()
+        call_command("export_theatre", self.path, stdout=StringIO())
+        self.clear_data()
+
+        committed = [import_batch, import_batch]
+
+        def interrupt(*args):
+            if not committed:
+                raise RuntimeError("interrupted")
+            return committed.pop()(*args)
+
+        with patch(
+            "theatre.management.commands.import_theatre.import_batch",
+            side_effect=interrupt,
+        ):
+            with self.assertRaises(RuntimeError):
+                call_command(
+                    "import_theatre", self.path, batch_size=1,
+                    stdout=StringIO()
+                )
+        with open(f"{self.path}.checkpoint") as checkpoint:
+            self.assertIn("2", checkpoint.read())
+
+        with patch(
+            "theatre.management.commands.import_theatre.import_batch",
+            wraps=import_batch,
+        ) as batches:
+            call_command(
+                "import_theatre", self.path, batch_size=100,
+                stdout=StringIO()
+            )
+
+        # The two genres were committed before the interruption.
+        self.assertIs(batches.call_args_list[0].args[0], Actor)
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_import_skips_conflicting_rows(self):
+        call_command("export_theatre", self.path, stdout=StringIO())
+        play = Play.objects.get(pk=1)
+        actors = set(play.actors.values_list("id", flat=True))
+        Play.objects.exclude(pk=1).delete()
+        Play.objects.filter(pk=1).update(title="Another play")
+        play.actors.clear()
+
+        stdout = StringIO()
+        call_command("import_theatre", self.path, stdout=stdout)
+
+        self.assertFalse(Play.objects.get(pk=1).actors.exists())
+        imported = Play.objects.exclude(pk=1)
+        self.assertTrue(imported.exists())
+        self.assertTrue(
+            all(imported_play.actors.exists() for imported_play in imported)
+        )
+        plays = Play.objects.count()
+        self.assertIn(f"theatre.play: {plays - 1} rows, 1 skipped",
+                      stdout.getvalue())
+        self.assertIn("theatre.genre: 0 rows", stdout.getvalue())
+        self.assertNotEqual(actors, set())
+
+        Play.objects.filter(pk=1).update(title="Hamlet")
+        call_command("import_theatre", self.path, stdout=StringIO())
+        self.assertEqual(
+            set(Play.objects.get(pk=1).actors.values_list("id", flat=True)),
+            actors,
+        )
+
+    def test_round_trip_keeps_staff_and_overseers(self):
+        overseer = get_user_model().objects.create_user(
+            "overseer@test.com", "testpass", is_hall_overseer=True
+        )
+        assign_theatre_hall(overseer)
+
+        call_command("export_theatre", self.path, stdout=StringIO())
+        self.clear_data()
+        get_user_model().objects.all().delete()
+        call_command("import_theatre", self.path, stdout=StringIO())
+
+        self.assertTrue(
+            get_user_model().objects.get(email=self.user.email).is_staff
+        )
+        overseer = get_user_model().objects.get(email="overseer@test.com")
+        self.assertTrue(overseer.is_hall_overseer)
+        self.assertEqual(overseer.theatre_hall_id, 1)
+        self.assertFalse(overseer.has_usable_password())
+
+    def test_passwords_are_transferred_on_request(self):
+        for export_format, path in (
+            ("jsonl", self.path), ("csv", self.csv_path)
+        ):
+            call_command(
+                "export_theatre",
+                path,
+                format=export_format,
+                passwords=True,
+                stdout=StringIO(),
+            )
+            self.clear_data()
+            get_user_model().objects.all().delete()
+            call_command(
+                "import_theatre",
+                path,
+                format=export_format,
+                restart=True,
+                stdout=StringIO(),
+            )
+
+            user = get_user_model().objects.get(email=self.user.email)
+            self.assertTrue(user.check_password("testpass"))
+
+
+class ReplicaRoutingTests(BaseBookingAPITest):
+    def tearDown(self):
+        replicas._unavailable_until.clear()
+        super().tearDown()
+
+    @override_settings(DATABASE_REPLICAS=["replica_1"])
+    def test_router_reads_from_replica_only_when_asked(self):
+        router = replicas.ReplicaRouter()
+
+        with patch("theatre.replicas.is_available", return_value=True):
+            self.assertEqual(router.db_for_read(Play), "default")
+            with replicas.use_replicas():
+                self.assertEqual(router.db_for_read(Play), "replica_1")
+                self.assertEqual(router.db_for_write(Play), "default")
+            self.assertEqual(router.db_for_read(Play), "default")
+
+    @override_settings(DATABASE_REPLICAS=["missing", "default"])
+    def test_unavailable_replicas_fall_back_to_primary(self):
+        self.assertFalse(replicas.is_available("missing"))
+
+        with patch.object(
+            connection, "ensure_connection", side_effect=OperationalError
+        ):
+            self.assertFalse(replicas.is_available("default"))
+        # Skipped until REPLICA_RETRY_SECONDS have passed.
+        self.assertFalse(replicas.is_available("default"))
+
+        with replicas.use_replicas():
+            self.assertEqual(
+                replicas.ReplicaRouter().db_for_read(Play), "default"
+            )
+
+    @override_settings(DATABASE_REPLICAS=["replica_1", "replica_2"])
+    def test_only_the_chosen_replica_is_checked(self):
+        with patch(
+            "theatre.replicas.is_available", return_value=True
+        ) as is_available:
+            alias = replicas.choose_read_alias()
+        is_available.assert_called_once_with(alias)
+
+        with patch(
+            "theatre.replicas.is_available",
+            side_effect=lambda alias: alias == "replica_2",
+        ) as is_available:
+            self.assertEqual(replicas.choose_read_alias(), "replica_2")
+        self.assertLessEqual(is_available.call_count, 2)
+
+    @override_settings(DATABASE_REPLICAS=["default"])
+    def test_reads_stick_to_primary_after_a_write(self):
+        with patch(
+            "theatre.replicas.use_replicas", wraps=replicas.use_replicas
+        ) as use_replicas:
+            self.client.get(self.get_theatre_url("play-list"))
+            self.assertEqual(use_replicas.call_count, 1)
+
+            self.client.get(self.get_theatre_url("reservation-list"))
+            self.assertEqual(use_replicas.call_count, 1)
+
+            response = self.reserve((9, 9))
+            self.assertEqual(
+                response.status_code, status.HTTP_201_CREATED
+            )
+            self.client.get(self.get_theatre_url("performance-list"))
+            self.assertEqual(use_replicas.call_count, 1)
+
+            caches["shared"].clear()
+            self.client.get(self.get_theatre_url("performance-list"))
+            self.assertEqual(use_replicas.call_count, 2)
+
+
+@skipUnless(
+    settings.DATABASE_REPLICAS, "Set DATABASE_REPLICA_URLS to run"
+)
+class ReplicaIntegrationTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        caches["throttle"].clear()
+        caches["shared"].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "testpass",
+            is_email_verified=True,
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        Genre.objects.create(name="Drama")
+
+    def test_reads_use_replica_until_client_writes(self):
+        url = reverse("theatre:genre-list")
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+
+        with CaptureQueriesContext(replica) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.data[0]["name"], "Drama")
+        self.assertEqual(len(ctx), 1)
+
+        response = self.client.post(url, data={"name": "Comedy"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(replica) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(ctx), 0)
@@ -0,0 +1,100 @@
+import time
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+throttle_cache = ConnectionProxy(caches, "throttle")
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket limiter kept in the shared ``throttle`` cache.
+
+    A rate of ``N/period`` is a bucket of ``N`` tokens refilled at
+    ``N / period`` tokens per second, so clients may burst up to ``N``
+    requests and then continue at the average rate. Each key stores one
+    ``(tokens, updated_at)`` pair instead of a timestamp per request.
+
+    Updates are serialized across workers with a short lock taken by
+    ``cache.add``, which is atomic on the database, memcached and redis
+    backends.
+    """
+
+    cache = throttle_cache
+    lock_timeout = 2
+    lock_attempts = 20
+    lock_delay = 0.005
+
+    def _acquire_lock(self, lock_key):
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock_key, 1, self.lock_timeout):
+                return True
+            time.sleep(self.lock_delay)
+        return False
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        lock_key = f"{self.key}:lock"
+        if not self._acquire_lock(lock_key):
+            # Only a client hammering its own key waits this long.
+            self.wait_time = self.lock_timeout
+            return self.throttle_failure()
+
+        try:
+            now = self.timer()
+            refill_rate = self.num_requests / self.duration
+            tokens, updated_at = self.cache.get(
+                self.key, (self.num_requests, now)
+            )
+            tokens = min(
+                self.num_requests,
+                tokens + (now - updated_at) * refill_rate,
+            )
+            if tokens < 1:
+                self.wait_time = (1 - tokens) / refill_rate
+                return self.throttle_failure()
+
+            self.cache.set(self.key, (tokens - 1, now), self.duration)
+            return True
+        finally:
+            self.cache.delete(lock_key)
+
+    def wait(self):
+        return getattr(self, "wait_time", None)
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle, AnonRateThrottle):
+    pass
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle, UserRateThrottle):
+    pass
+
+
+class ScopedTokenBucketThrottle(ScopedRateThrottle, TokenBucketThrottle):
+    pass
+
+
+class BookingTokenBucketThrottle(ScopedTokenBucketThrottle):
+    """
+    Scoped bucket counting only writes, so browsing reservations does
+    not use up the allowance for booking.
+    """
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
@@ -0,0 +1,354 @@
+"""
+Streaming export and import of theatre data in chunks.
+
+Records use the fixture layout, ``{"model": ..., "pk": ..., "fields":
+{...}}``, one per line in JSON Lines files. CSV exports are a
+directory with one ``<model>.csv`` file per model, many-to-many ids
+joined by ``;``.
+"""
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from theatre.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    TheatreHall,
+    Ticket,
+)
+
+# In dependency order, every model only references earlier ones.
+TRANSFER_FIELDS = {
+    Genre: ("name",),
+    Actor: ("first_name", "last_name", "image"),
+    TheatreHall: ("name", "rows", "seats_in_row"),
+    get_user_model(): (
+        "email",
+        "first_name",
+        "last_name",
+        "is_email_verified",
+        "is_staff",
+        "is_hall_overseer",
+        "theatre_hall",
+    ),
+    Play: ("title", "description", "image", "genres", "actors"),
+    Performance: ("play", "theatre_hall", "show_time", "duration"),
+    Reservation: ("created_at", "user"),
+    Ticket: ("row", "seat", "performance", "reservation"),
+}
+MODELS = {model._meta.label_lower: model for model in TRANSFER_FIELDS}
+# Password hashes are only exported on request. Users imported without
+# one get an unusable password.
+PASSWORD_FIELDS = {get_user_model(): ("password",)}
+M2M_SEPARATOR = ";"
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _m2m_fields(model):
+    return [
+        field
+        for field in model._meta.many_to_many
+        if field.name in TRANSFER_FIELDS[model]
+    ]
+
+
+def _password_fields(model, passwords):
+    return PASSWORD_FIELDS.get(model, ()) if passwords else ()
+
+
+def _value_fields(model):
+    m2m_names = {field.name for field in _m2m_fields(model)}
+    return [
+        model._meta.get_field(name)
+        for name in TRANSFER_FIELDS[model]
+        if name not in m2m_names
+    ]
+
+
+class TransferStats:
+    """Rows and elapsed time per model, plus process peak memory."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = {}
+        self.skipped = {}
+
+    def add(self, label, count):
+        self.rows[label] = self.rows.get(label, 0) + count
+
+    def skip(self, label, count):
+        self.skipped[label] = self.skipped.get(label, 0) + count
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.total_rows / elapsed if elapsed else 0.0
+
+    @staticmethod
+    def peak_memory_kb():
+        try:
+            import resource
+        except ImportError:  # Windows
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes.
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def export_records(model, batch_size, passwords=False):
+    """
+    Yield fixture-style records of ``model`` ordered by pk, reading
+    ``batch_size`` rows (and their many-to-many ids) per query. Password
+    hashes are included when ``passwords`` is set.
+    """
+    label = model._meta.label_lower
+    names = [
+        *(field.name for field in _value_fields(model)),
+        *_password_fields(model, passwords),
+    ]
+    columns = [
+        *(field.attname for field in _value_fields(model)),
+        *_password_fields(model, passwords),
+    ]
+    m2m_fields = _m2m_fields(model)
+    last_pk = None
+
+    while True:
+        rows = model.objects.order_by("pk")
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        rows = list(rows.values_list("pk", *columns)[:batch_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+
+        related = {}
+        for field in m2m_fields:
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            ids = related[field.name] = {}
+            for source_id, target_id in (
+                through
+                .objects
+                .filter(**{f"{source}_id__in": [row[0] for row in rows]})
+                .order_by(f"{source}_id", f"{target}_id")
+                .values_list(f"{source}_id", f"{target}_id")
+            ):
+                ids.setdefault(source_id, []).append(target_id)
+
+        for row in rows:
+            fields = dict(zip(names, row[1:]))
+            for name, ids in related.items():
+                fields[name] = ids.get(row[0], [])
+            yield {"model": label, "pk": row[0], "fields": fields}
+
+
+def write_jsonl(records, stream):
+    for record in records:
+        stream.write(json.dumps(record, cls=DjangoJSONEncoder))
+        stream.write("\n")
+        yield record
+
+
+def csv_columns(model, passwords=False):
+    return [
+        "pk",
+        *TRANSFER_FIELDS[model],
+        *_password_fields(model, passwords),
+    ]
+
+
+def write_csv(records, stream, model, passwords=False):
+    m2m_names = {field.name for field in _m2m_fields(model)}
+    columns = csv_columns(model, passwords)
+    writer = csv.writer(stream)
+    writer.writerow(columns)
+    encoder = DjangoJSONEncoder()
+    for record in records:
+        row = [record["pk"]]
+        for name in columns[1:]:
+            value = record["fields"][name]
+            if name in m2m_names:
+                value = M2M_SEPARATOR.join(str(pk) for pk in value)
+            elif value is not None and not isinstance(value, (str, int)):
+                value = encoder.default(value)
+            row.append("" if value is None else value)
+        writer.writerow(row)
+        yield record
+
+
+def read_jsonl(stream, skip=0):
+    """Yield ``(line number, record)``, skipping the first ``skip``."""
+    for number, line in enumerate(stream, start=1):
+        if number <= skip or not line.strip():
+            continue
+        yield number, json.loads(line)
+
+
+def read_csv(stream, model, skip=0):
+    m2m_names = {field.name for field in _m2m_fields(model)}
+    label = model._meta.label_lower
+    for number, row in enumerate(csv.DictReader(stream), start=1):
+        if number <= skip:
+            continue
+        fields = {}
+        for name in TRANSFER_FIELDS[model]:
+            value = row[name]
+            if name in m2m_names:
+                value = [int(pk) for pk in value.split(M2M_SEPARATOR) if pk]
+            fields[name] = value
+        for name in _password_fields(model, True):
+            if row.get(name):
+                fields[name] = row[name]
+        yield number, {"model": label, "pk": row["pk"], "fields": fields}
+
+
+def _build(model, record):
+    instance = model(pk=model._meta.pk.to_python(record["pk"]))
+    for field in _value_fields(model):
+        value = record["fields"].get(field.name)
+        if value == "" and field.null:
+            value = None
+        setattr(instance, field.attname, field.to_python(value))
+    if model is get_user_model():
+        password = record["fields"].get("password")
+        if password:
+            instance.password = password
+        else:
+            instance.set_unusable_password()
+    return instance
+
+
+def _comparable(field, value):
+    value = field.get_prep_value(value)
+    # Empty files and strings are imported as NULL.
+    return None if value == "" and field.null else value
+
+
+def _stored_rows(model, instances):
+    """
+    Map the primary keys of ``instances`` that are already stored to
+    whether the stored row has the same values.
+    """
+    fields = _value_fields(model)
+    by_pk = {instance.pk: instance for instance in instances}
+    return {
+        row[0]: all(
+            _comparable(field, getattr(by_pk[row[0]], field.attname))
+            == _comparable(field, value)
+            for field, value in zip(fields, row[1:])
+        )
+        for row in model.objects.filter(pk__in=by_pk).values_list(
+            "pk", *(field.attname for field in fields)
+        )
+    }
+
+
+def import_batch(model, records, stats):
+    """
+    Insert one batch of records of ``model`` in a transaction. Rows
+    whose primary key or unique values already exist are skipped, so a
+    batch can be imported again after an interruption. Many-to-many
+    links are only added to rows inserted here, or already stored with
+    the same values, never to an unrelated row with the same key.
+    """
+    instances = [_build(model, record) for record in records]
+    pks = [instance.pk for instance in instances]
+    with transaction.atomic():
+        stored = _stored_rows(model, instances)
+        model.objects.bulk_create(instances, ignore_conflicts=True)
+        inserted = set(
+            model.objects.filter(pk__in=pks).values_list("pk", flat=True)
+        ) - stored.keys()
+        linked = inserted | {pk for pk, same in stored.items() if same}
+
+        for field in _m2m_fields(model):
+            target_model = field.related_model
+            target_ids = {
+                pk
+                for record in records
+                for pk in record["fields"].get(field.name, ())
+            }
+            targets = set(
+                target_model
+                .objects
+                .filter(pk__in=target_ids)
+                .values_list("pk", flat=True)
+            )
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            through.objects.bulk_create(
+                [
+                    through(
+                        **{
+                            f"{source}_id": instance.pk,
+                            f"{target}_id": pk,
+                        }
+                    )
+                    for instance, record in zip(instances, records)
+                    if instance.pk in linked
+                    for pk in record["fields"].get(field.name, ())
+                    if pk in targets
+                ],
+                ignore_conflicts=True,
+            )
+    stats.add(model._meta.label_lower, len(inserted))
+    stats.skip(model._meta.label_lower, len(records) - len(inserted))
+
+
+def reset_sequences(models):
+    """Move primary key sequences past imported ids (PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+class Checkpoint:
+    """Last imported line of every input file, saved after each batch."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lines = {}
+        if path and os.path.exists(path):
+            with open(path) as checkpoint_file:
+                self.lines = json.load(checkpoint_file)
+
+    def get(self, name):
+        return self.lines.get(name, 0)
+
+    def save(self, name, line):
+        self.lines[name] = line
+        if self.path:
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as checkpoint_file:
+                json.dump(self.lines, checkpoint_file)
+            os.replace(temporary, self.path)
+
+    def clear(self):
+        self.lines = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -4,9 +4,12 @@ from rest_framework import routers
 from theatre.views import (
     ActorViewSet,
     GenreViewSet,
+    MetricsView,
     PlayViewSet,
     PerformanceViewSet,
     ReservationViewSet,
+    SalesAnalyticsViewSet,
+    SeatHoldViewSet,
     TheatreHallViewSet
 )
 
@@ -16,10 +19,13 @@ router.register("genres", GenreViewSet)
 router.register("plays", PlayViewSet)
 router.register("reservations", ReservationViewSet, basename="reservation")
 router.register("performances", PerformanceViewSet)
+router.register("seat_holds", SeatHoldViewSet, basename="seat-hold")
 router.register("theatre_halls", TheatreHallViewSet)
+router.register("analytics", SalesAnalyticsViewSet, basename="analytics")
 
 urlpatterns = [
-    path("", include(router.urls))
+    path("", include(router.urls)),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
 ]
 
 app_name = "theatre"
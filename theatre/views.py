@@ -1,31 +1,86 @@
-from django.db.models import F, Count
+import datetime
+
+from django.db.models import Count, F, Prefetch, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework import mixins, status, viewsets
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 
+from theatre.analytics import SALES_FIELDS, daily_sales, occupancy_percent
+from theatre.cache import CachedListMixin
+from theatre.exports import (
+    ATTENDEE_COLUMNS,
+    EXPORT_FORMATS,
+    PERFORMANCE_SALES_COLUMNS,
+    attendee_rows,
+    export_chunks,
+    performance_sales_rows,
+)
+from theatre.fastpath import (
+    FastJSONRenderer,
+    FastListMixin,
+    FastPerformanceList,
+    FastPlayList,
+)
+from theatre.fieldsets import (
+    EXPAND_PARAM,
+    FIELDS_PARAM,
+    is_expanded,
+    is_requested,
+)
 from theatre.filters import (
+    AttendeeFilterSet,
     PlayFilterSet,
     PerformanceFilterSet,
+    SalesFilterSet,
+    upcoming_performances,
     ActorFilterSet,
     GenreFilterSet,
 )
+from theatre.instrumentation import PrometheusTextRenderer, registry
 from theatre.models import (
     Actor,
     Genre,
+    HourlySales,
     Play,
     Performance,
     Reservation,
-    TheatreHall
+    SeatHold,
+    TheatreHall,
+    Ticket
+)
+from theatre.pagination import (
+    PerformanceCursorPagination,
+    PlayCursorPagination,
+    ReservationCursorPagination
 )
 from theatre.permissions import (
+    IsAdminOrHallOverseer,
     IsAuthorizedOrIfAuthenticatedReadOnly,
-    IsAdminOrIfAuthenticatedReadOnly
+    IsAdminOrIfAuthenticatedReadOnly,
+    IsVerifiedUser,
 )
+from theatre.history import attach_tickets, reservation_rows
+from theatre.images import schedule_renditions
+from theatre.replicas import ReadReplicaMixin
 from theatre.serializers import (
+    ActorImageSerializer,
+    BestAvailableSerializer,
+    DailySalesSerializer,
+    HourlySalesSerializer,
+    OccupancySerializer,
+    PerformanceSalesSerializer,
     ActorSerializer,
     GenreSerializer,
     PlayDetailSerializer,
@@ -36,22 +91,73 @@ from theatre.serializers import (
     PerformanceListSerializer,
     TheatreHallSerializer,
     ReservationListSerializer,
+    ReservationHistorySerializer,
     PlayListSerializer,
-    PlayImageSerializer
+    PlayImageSerializer,
+    PerformanceScheduleSerializer,
+    PerformanceScheduleSummarySerializer,
+    PerformanceSeatMapSerializer,
+    SeatHoldSerializer,
+    SeatHoldCreateSerializer
 )
+from theatre.throttling import BookingTokenBucketThrottle
+from theatre.booking import cancel_reservation
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        FIELDS_PARAM,
+        type=OpenApiTypes.STR,
+        description="Comma-separated fields to return (ex. ?fields=id,title)",
+    ),
+    OpenApiParameter(
+        EXPAND_PARAM,
+        type=OpenApiTypes.STR,
+        description=(
+            "Comma-separated relations to embed, others are returned as "
+            "ids. All of them by default (ex. ?expand=genres)"
+        ),
+    ),
+]
+
+
+FAST_RENDERER_CLASSES = (FastJSONRenderer, BrowsableAPIRenderer)
 
 
 class ActorViewSet(
+    ReadReplicaMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet
 ):
     queryset = Actor.objects.all()
-    serializer_class = ActorSerializer
+    cache_namespace = "actors"
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = ActorFilterSet
 
+    def get_serializer_class(self):
+        if self.action == "upload_image":
+            return ActorImageSerializer
+        return ActorSerializer
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="upload-image",
+    )
+    def upload_image(self, request, pk=None):
+        actor = self.get_object()
+        serializer = self.get_serializer(actor, data=request.data)
+
+        serializer.is_valid(raise_exception=True)
+        # Renditions of the previous image are stale, and process_images
+        # only picks up images without any.
+        serializer.save(image_renditions={})
+        schedule_renditions(actor)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -75,11 +181,14 @@ class ActorViewSet(
 
 
 class GenreViewSet(
+    ReadReplicaMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = Genre.objects.all()
+    cache_namespace = "genres"
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
     filter_backends = (DjangoFilterBackend,)
@@ -99,6 +208,9 @@ class GenreViewSet(
 
 
 class PlayViewSet(
+    ReadReplicaMixin,
+    CachedListMixin,
+    FastListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -106,16 +218,34 @@ class PlayViewSet(
 ):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = PlayFilterSet
-    queryset = (
-        Play
-        .objects
-        .prefetch_related(
-            "genres",
-            "actors",
-            "performances__theatre_hall"
-        )
-    )
+    queryset = Play.objects.all()
+    renderer_classes = FAST_RENDERER_CLASSES
+    fast_list_class = FastPlayList
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    pagination_class = PlayCursorPagination
+    cache_namespace = "plays"
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve"):
+            return queryset
+
+        request = self.request
+        lookups = [
+            name for name in ("genres", "actors")
+            if is_requested(request, name)
+        ]
+        if self.action == "list":
+            if is_expanded(request, "performances"):
+                lookups.append("performances__theatre_hall")
+            elif is_requested(request, "performances"):
+                lookups.append(
+                    Prefetch(
+                        "performances",
+                        queryset=Performance.objects.only("id", "play_id"),
+                    )
+                )
+        return queryset.prefetch_related(*lookups)
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -136,11 +266,19 @@ class PlayViewSet(
         serializer = self.get_serializer(movie, data=request.data)
 
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(image_renditions={})
+        schedule_renditions(movie)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
         parameters=[
+            OpenApiParameter(
+                "q",
+                type=OpenApiTypes.STR,
+                description="Full-text search in title and description, "
+                            "results are ordered by relevance "
+                            "(ex. ?q=prince denmark)",
+            ),
             OpenApiParameter(
                 "title",
                 type=OpenApiTypes.STR,
@@ -160,36 +298,101 @@ class PlayViewSet(
                             "comma-separated actor ids "
                             "(ex. ?actors=5,7)",
             ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
-class PerformanceViewSet(ModelViewSet):
-    queryset = (
-        Performance
-        .objects
-        .select_related("play", "theatre_hall")
-        .prefetch_related("tickets", "play__actors", "play__genres")
-        .annotate(
-            tickets_available=(
-                F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
-                - Count("tickets")
-            )
-        )
-    )
+SHOW_TIME_PARAMS = {"date", "from", "to", "upcoming"}
+
+
+TICKETS_AVAILABLE = (
+    F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+    - F("tickets_sold")
+)
+
+
+class PerformanceViewSet(ReadReplicaMixin, FastListMixin, ModelViewSet):
+    queryset = Performance.objects.all()
+    renderer_classes = FAST_RENDERER_CLASSES
+    fast_list_class = FastPerformanceList
     permission_classes = (IsAuthorizedOrIfAuthenticatedReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = PerformanceFilterSet
+    pagination_class = PerformanceCursorPagination
+
+    def get_queryset(self):
+        if self.action == "seat_map":
+            return Performance.objects.select_related("theatre_hall")
+        queryset = super().get_queryset()
+        request = self.request
+        if self.action == "list":
+            if is_requested(request, "theatre_hall_name") or is_requested(
+                request, "theatre_hall_capacity"
+            ):
+                queryset = queryset.select_related("theatre_hall")
+            if is_requested(request, "tickets_available"):
+                queryset = queryset.annotate(
+                    tickets_available=TICKETS_AVAILABLE
+                )
+            if not SHOW_TIME_PARAMS & request.query_params.keys():
+                # Past shows only when asked for, so listing costs follow
+                # the current schedule rather than all of history.
+                queryset = upcoming_performances(queryset)
+            return queryset
+
+        if self.action == "retrieve":
+            if is_expanded(request, "play"):
+                queryset = queryset.select_related("play").prefetch_related(
+                    "play__actors", "play__genres"
+                )
+            if is_requested(request, "taken_places"):
+                queryset = queryset.prefetch_related("tickets")
+            return queryset
+
+        return queryset.select_related("play", "theatre_hall").annotate(
+            tickets_available=TICKETS_AVAILABLE
+        )
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return PerformanceDetailSerializer
         if self.action == "list":
             return PerformanceListSerializer
+        if self.action == "seat_map":
+            return PerformanceSeatMapSerializer
+        if self.action == "schedule":
+            return PerformanceScheduleSerializer
         return PerformanceSerializer
 
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="seat-map",
+    )
+    def seat_map(self, request, pk=None):
+        performance = self.get_object()
+        serializer = self.get_serializer(performance)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(responses=PerformanceScheduleSummarySerializer)
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="schedule",
+    )
+    def schedule(self, request):
+        """
+        Create performances of a play from a weekly recurrence rule
+        in one transaction and return a summary of what was created.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = PerformanceScheduleSummarySerializer(serializer.save())
+        return Response(summary.data, status=status.HTTP_201_CREATED)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -213,6 +416,32 @@ class PerformanceViewSet(ModelViewSet):
                     "(ex. ?hall=1)"
                 ),
             ),
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATETIME,
+                description=(
+                    "Performances starting at or after "
+                    "(ex. ?from=2025-10-01T00:00:00Z)"
+                ),
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATETIME,
+                description=(
+                    "Performances starting before "
+                    "(ex. ?to=2025-11-01T00:00:00Z)"
+                ),
+            ),
+            OpenApiParameter(
+                "upcoming",
+                type=OpenApiTypes.BOOL,
+                description=(
+                    "Only performances that have not started, the "
+                    "default unless date, from or to is given "
+                    "(ex. ?upcoming=false)"
+                ),
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -221,6 +450,12 @@ class PerformanceViewSet(ModelViewSet):
 
 class ReservationViewSet(ModelViewSet):
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    pagination_class = ReservationCursorPagination
+    throttle_classes = (
+        *api_settings.DEFAULT_THROTTLE_CLASSES,
+        BookingTokenBucketThrottle,
+    )
+    throttle_scope = "reservations"
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
@@ -229,16 +464,23 @@ class ReservationViewSet(ModelViewSet):
         return (
             Reservation
             .objects
-            .filter(user=self.request.user)
+            .filter(user_id=self.request.user.id)
             .prefetch_related(
-                "tickets",
-                "tickets__performance",
-                "tickets__performance__play"
+                Prefetch(
+                    "tickets",
+                    queryset=Ticket.objects.select_related(
+                        "performance__play"
+                    ),
+                )
             ))
 
     def get_serializer_class(self):
         if self.action == "list":
             return ReservationListSerializer
+        if self.action == "best_available":
+            return BestAvailableSerializer
+        if self.action == "history":
+            return ReservationHistorySerializer
         return ReservationSerializer
 
     def perform_create(self, serializer):
@@ -247,12 +489,306 @@ class ReservationViewSet(ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        cancel_reservation(instance)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="history",
+    )
+    def history(self, request):
+        """
+        Reservations of the current user, newest first, with the play,
+        show time, hall and seats of every booked performance. Built
+        from two flat queries per page.
+        """
+        page = self.paginate_queryset(reservation_rows(request.user.id))
+        serializer = self.get_serializer(attach_tickets(page), many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(responses=ReservationSerializer)
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="best-available",
+    )
+    def best_available(self, request):
+        """
+        Reserve the best block of ``party_size`` seats next to each
+        other in one row, picked on the server.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reservation = serializer.save()
+        return Response(
+            ReservationSerializer(reservation).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class SeatHoldViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    # Holds are created, listed and released by their own customer.
+    permission_classes = (IsVerifiedUser,)
+    throttle_classes = ReservationViewSet.throttle_classes
+    throttle_scope = "reservations"
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return SeatHold.objects.none()
+
+        return SeatHold.objects.filter(
+            user_id=self.request.user.id,
+            expires_at__gt=timezone.now(),
+        )
+
+    def get_serializer_class(self):
+        if self.action == "create":
+            return SeatHoldCreateSerializer
+        return SeatHoldSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        holds = serializer.save()
+        return Response(
+            SeatHoldSerializer(holds, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
 
 class TheatreHallViewSet(
+    ReadReplicaMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = TheatreHall.objects.all()
+    cache_namespace = "theatre_halls"
     serializer_class = TheatreHallSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+
+
+GROUP_BY_FIELDS = {"hall": "theatre_hall", "play": "play"}
+# "format" is taken by DRF's format suffixes.
+EXPORT_FORMAT_PARAMETER = OpenApiParameter(
+    "export_format",
+    type=OpenApiTypes.STR,
+    enum=list(EXPORT_FORMATS),
+    description="JSON Lines (default) or CSV, gzipped if accepted",
+)
+GROUP_BY_PARAMETER = OpenApiParameter(
+    "group_by",
+    type=OpenApiTypes.STR,
+    enum=list(GROUP_BY_FIELDS),
+    description="Aggregate per theatre hall (default) or per play",
+)
+
+
+class SalesAnalyticsViewSet(viewsets.GenericViewSet):
+    """
+    Sales and occupancy for admins and hall overseers, who only see
+    their own hall. Read from ``Performance.tickets_sold`` and the
+    ``HourlySales`` aggregates, never from tickets, except for the
+    streamed attendee export.
+    """
+
+    permission_classes = (IsAdminOrHallOverseer,)
+    filter_backends = (DjangoFilterBackend,)
+    pagination_class = PerformanceCursorPagination
+    # Without "from", daily and hourly sales cover this window.
+    default_windows = {
+        "daily": datetime.timedelta(days=30),
+        "hourly": datetime.timedelta(hours=24),
+    }
+
+    @property
+    def filterset_class(self):
+        if self.action in ("performances", "occupancy", "export_sales"):
+            return PerformanceFilterSet
+        if self.action == "export_attendees":
+            return AttendeeFilterSet
+        return SalesFilterSet
+
+    def get_queryset(self):
+        if self.action == "export_sales":
+            return Performance.objects.all()
+        if self.action == "export_attendees":
+            return Ticket.objects.all()
+        if self.action in ("performances", "occupancy"):
+            return Performance.objects.annotate(
+                capacity=(
+                    F("theatre_hall__rows") * F("theatre_hall__seats_in_row")
+                )
+            )
+        queryset = HourlySales.objects.all()
+        if "from" not in self.request.query_params:
+            queryset = queryset.filter(
+                hour__gte=timezone.now() - self.default_windows[self.action]
+            )
+        return queryset
+
+    def get_group_by(self):
+        group_by = self.request.query_params.get("group_by", "hall")
+        if group_by not in GROUP_BY_FIELDS:
+            raise serializers.ValidationError(
+                {"group_by": f"Choose one of: {', '.join(GROUP_BY_FIELDS)}."}
+            )
+        return GROUP_BY_FIELDS[group_by]
+
+    def stream_export(self, name, columns, rows):
+        export_format = self.request.query_params.get(
+            "export_format", "jsonl"
+        )
+        if export_format not in EXPORT_FORMATS:
+            raise serializers.ValidationError(
+                {
+                    "export_format": (
+                        f"Choose one of: {', '.join(EXPORT_FORMATS)}."
+                    )
+                }
+            )
+        response = StreamingHttpResponse(
+            export_chunks(export_format, columns, rows),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{name}.{export_format}"'
+        )
+        return response
+
+    @extend_schema(responses=PerformanceSalesSerializer(many=True))
+    @action(methods=["GET"], detail=False, url_path="performances")
+    def performances(self, request):
+        """Tickets sold and occupancy of every performance."""
+        rows = self.filter_queryset(self.get_queryset()).values(
+            "id",
+            "play_id",
+            "play__title",
+            "theatre_hall_id",
+            "show_time",
+            "tickets_sold",
+            "capacity",
+        )
+        page = self.paginate_queryset(rows)
+        for row in page:
+            row["occupancy"] = occupancy_percent(
+                row["tickets_sold"], row["capacity"]
+            )
+        return self.get_paginated_response(
+            PerformanceSalesSerializer(page, many=True).data
+        )
+
+    @extend_schema(
+        parameters=[GROUP_BY_PARAMETER],
+        responses=OccupancySerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="occupancy")
+    def occupancy(self, request):
+        """Occupancy of the performances in a show time range."""
+        group_by = self.get_group_by()
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .order_by()
+            .values(f"{group_by}_id")
+            .annotate(
+                performances=Count("id"),
+                tickets_sold=Sum("tickets_sold"),
+                total_capacity=Sum("capacity"),
+            )
+            .order_by(f"{group_by}_id")
+        )
+        data = [
+            {
+                group_by: row[f"{group_by}_id"],
+                "performances": row["performances"],
+                "tickets_sold": row["tickets_sold"],
+                "capacity": row["total_capacity"],
+                "occupancy": occupancy_percent(
+                    row["tickets_sold"], row["total_capacity"]
+                ),
+            }
+            for row in rows
+        ]
+        return Response(OccupancySerializer(data, many=True).data)
+
+    @extend_schema(
+        parameters=[GROUP_BY_PARAMETER],
+        responses=DailySalesSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="daily")
+    def daily(self, request):
+        """Tickets sold and released and bookings per day of sale."""
+        group_by = self.get_group_by()
+        rows = list(
+            daily_sales(self.filter_queryset(self.get_queryset()), group_by)
+        )
+        for row in rows:
+            row[group_by] = row.pop(f"{group_by}_id")
+        return Response(DailySalesSerializer(rows, many=True).data)
+
+    @extend_schema(responses=HourlySalesSerializer(many=True))
+    @action(methods=["GET"], detail=False, url_path="hourly")
+    def hourly(self, request):
+        """Tickets sold and released and bookings per hour."""
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .order_by()
+            .values("hour")
+            .annotate(**{name: Sum(name) for name in SALES_FIELDS})
+            .order_by("hour")
+        )
+        return Response(HourlySalesSerializer(rows, many=True).data)
+
+    @extend_schema(
+        parameters=[EXPORT_FORMAT_PARAMETER],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=False, url_path="export/sales")
+    @method_decorator(gzip_page)
+    def export_sales(self, request):
+        """Stream tickets sold and occupancy of every performance."""
+        return self.stream_export(
+            "sales",
+            PERFORMANCE_SALES_COLUMNS,
+            performance_sales_rows(self.filter_queryset(self.get_queryset())),
+        )
+
+    @extend_schema(
+        parameters=[EXPORT_FORMAT_PARAMETER],
+        responses={200: OpenApiTypes.BINARY},
+    )
+    @action(methods=["GET"], detail=False, url_path="export/attendees")
+    @method_decorator(gzip_page)
+    def export_attendees(self, request):
+        """Stream booked seats with the customers who booked them."""
+        return self.stream_export(
+            "attendees",
+            ATTENDEE_COLUMNS,
+            attendee_rows(self.filter_queryset(self.get_queryset())),
+        )
+
+
+class MetricsView(APIView):
+    """Per-view request metrics in the Prometheus text format."""
+
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusTextRenderer,)
+    # Scrapers poll every few seconds, far above the user rate limit.
+    throttle_classes = ()
+
+    @extend_schema(responses={200: OpenApiTypes.STR})
+    def get(self, request, *args, **kwargs):
+        return Response(
+            registry.render(),
+            content_type=(
+                f"{PrometheusTextRenderer.media_type}; version=0.0.4; "
+                f"charset={PrometheusTextRenderer.charset}"
+            ),
+        )
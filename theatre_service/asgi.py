@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "theatre_service.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, the app relies on loaded models.
+from theatre.sse import SeatEventsApp  # noqa: E402
+
+application = SeatEventsApp(django_application)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from user.models import User
+from user.models import OutgoingEmail, User
 
 
 # Register your models here.
@@ -37,3 +37,13 @@ class UserAdmin(UserAdmin):
     list_display = ("email", "first_name", "last_name", "is_staff")
     search_fields = ("email", "first_name", "last_name")
     ordering = ("email",)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "subject", "to", "status", "attempts", "next_attempt_at", "sent_at"
+    )
+    list_filter = ("status",)
+    search_fields = ("to", "subject")
+    readonly_fields = ("created_at", "sent_at", "last_error")
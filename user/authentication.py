@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from theatre.cache import shared_cache
+
+PRINCIPAL_KEY = "auth:principal:{user_id}"
+PRINCIPAL_VERSION_KEY = "auth:principal-version:{user_id}"
+
+
+def bump_principal_version(user_id):
+    """Invalidate the cached principal of a user."""
+    key = PRINCIPAL_VERSION_KEY.format(user_id=user_id)
+    if not shared_cache.add(key, 1, timeout=None):
+        try:
+            shared_cache.incr(key)
+        except ValueError:
+            shared_cache.set(key, 1, timeout=None)
+
+
+class Principal:
+    """
+    Read-only stand-in for ``User`` holding the fields permissions,
+    filters and throttles read from ``request.user``.
+    """
+
+    FIELDS = (
+        "id",
+        "email",
+        "is_active",
+        "is_staff",
+        "is_superuser",
+        "is_email_verified",
+        "is_hall_overseer",
+        "theatre_hall_id",
+    )
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(**{name: getattr(user, name) for name in cls.FIELDS})
+
+    @property
+    def pk(self):
+        return self.id
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __str__(self):
+        return self.email
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that serves safe requests from a cached
+    ``Principal`` instead of loading the user from the database.
+
+    Cache entries remember the user's principal version, which is bumped
+    whenever the user row is saved or deleted. Both are kept in the
+    ``shared`` cache, so a change made through any worker process
+    invalidates the principal everywhere; ``PRINCIPAL_CACHE_TIMEOUT``
+    bounds the lifetime of entries missed by bulk updates. Unsafe
+    requests still get the full ``User`` instance.
+    """
+
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return self.get_principal(validated_token), validated_token
+
+    def get_principal(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        key = PRINCIPAL_KEY.format(user_id=user_id)
+        version_key = PRINCIPAL_VERSION_KEY.format(user_id=user_id)
+        cached = shared_cache.get_many([key, version_key])
+        version = cached.get(version_key, 0)
+        entry = cached.get(key)
+
+        if entry is None or entry["version"] != version:
+            user = self.get_user(validated_token)
+            entry = {
+                "version": version,
+                "principal": Principal.from_user(user).as_dict(),
+                "password": get_md5_hash_password(user.password),
+            }
+            shared_cache.set(key, entry, settings.PRINCIPAL_CACHE_TIMEOUT)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != entry["password"]:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code="password_changed",
+            )
+
+        return Principal(**entry["principal"])
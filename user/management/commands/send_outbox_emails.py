@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.outbox import deliver_batch, queue_depth
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued emails in batches over one mail connection, "
+        "retrying failures with backoff"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Emails per batch, EMAIL_OUTBOX_BATCH_SIZE by default",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep polling every N seconds instead of draining once",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Only print the queue depth",
+        )
+
+    def write_status(self):
+        depth = queue_depth()
+        self.stdout.write(
+            " ".join(f"{name}={value}" for name, value in depth.items())
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            self.write_status()
+            return
+
+        while True:
+            sent = failed = 0
+            while True:
+                batch_sent, claimed = deliver_batch(options["batch_size"])
+                if not claimed:
+                    break
+                sent += batch_sent
+                failed += claimed - batch_sent
+            self.stdout.write(f"Sent {sent} emails, {failed} failed")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+        self.write_status()
@@ -0,0 +1,128 @@
+import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from user.models import OutgoingEmail
+
+# Claimed messages are not picked up by other workers for this long,
+# which also retries them if the worker dies while sending.
+CLAIM_LEASE = datetime.timedelta(minutes=5)
+MAX_RETRY_DELAY = datetime.timedelta(hours=1)
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=to,
+        from_email=from_email or settings.EMAIL_HOST_USER or "",
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: the base delay doubled for every attempt."""
+    delay = datetime.timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+    return min(delay, MAX_RETRY_DELAY)
+
+
+def claim_batch(size, now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail
+            .objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                status=OutgoingEmail.Status.PENDING,
+                next_attempt_at__lte=now,
+            )
+            .order_by("next_attempt_at", "id")[:size]
+        )
+        OutgoingEmail.objects.filter(
+            id__in=[email.id for email in emails]
+        ).update(next_attempt_at=now + CLAIM_LEASE)
+    return emails
+
+
+def _record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.Status.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+
+
+def deliver_batch(size=None):
+    """
+    Send up to ``size`` due emails over one mail connection and return
+    how many were sent and how many were claimed. Failed emails are
+    retried with exponential backoff until ``EMAIL_OUTBOX_MAX_ATTEMPTS``.
+    """
+    emails = claim_batch(size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+
+    sent = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        now = timezone.now()
+        for email in emails:
+            _record_failure(email, error, now)
+    else:
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    email.subject,
+                    email.body,
+                    email.from_email or None,
+                    [email.to],
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception as error:
+                    _record_failure(email, error, timezone.now())
+                else:
+                    email.status = OutgoingEmail.Status.SENT
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    sent += 1
+        finally:
+            connection.close()
+
+    OutgoingEmail.objects.bulk_update(
+        emails,
+        ["status", "attempts", "next_attempt_at", "last_error", "sent_at"],
+    )
+    return sent, len(emails)
+
+
+def queue_depth(now=None):
+    """Count outbox emails by status, plus due and oldest pending ones."""
+    now = now or timezone.now()
+    depth = {status: 0 for status in OutgoingEmail.Status.values}
+    depth.update(
+        OutgoingEmail
+        .objects
+        .order_by()
+        .values_list("status")
+        .annotate(count=Count("id"))
+    )
+    pending = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.Status.PENDING
+    )
+    depth["due"] = pending.filter(next_attempt_at__lte=now).count()
+    oldest = pending.aggregate(oldest=Min("created_at"))["oldest"]
+    depth["oldest_pending_seconds"] = (
+        int((now - oldest).total_seconds()) if oldest else 0
+    )
+    return depth
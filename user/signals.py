@@ -0,0 +1,16 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import bump_principal_version
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_principal_cache(sender, instance, **kwargs):
+    # Bumped before the commit, a concurrent request could cache the old
+    # row under the new version.
+    transaction.on_commit(partial(bump_principal_version, instance.pk))
@@ -1,14 +1,25 @@
 import datetime
+from io import StringIO
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import bump_principal_version
+from user.models import OutgoingEmail
+from user.outbox import deliver_batch, enqueue_email, queue_depth
 
 
 class ModelTests(TestCase):
@@ -159,3 +170,141 @@ class AuthenticatedApiTests(TestCase):
         )
         self.assertIn("Verification code does not match.", str(response.data))
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["throttle"].clear()
+        caches["shared"].clear()
+        self.user = get_user_model().objects.create_user(
+            "cached@test.com",
+            "testpass",
+            is_email_verified=True,
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        self.url = reverse("theatre:genre-list")
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_repeated_read_needs_no_auth_query(self):
+        self.count_queries()
+
+        self.assertEqual(self.count_queries(), 0)
+
+    def test_user_change_invalidates_principal(self):
+        self.count_queries()
+        self.user.is_email_verified = False
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+
+        # Not before the change is committed.
+        self.assertEqual(self.count_queries(), 0)
+        for callback in callbacks:
+            callback()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_principal_is_shared_by_workers(self):
+        self.count_queries()
+
+        # Only the shared cache is seen by the other worker processes.
+        cache.clear()
+        self.assertEqual(self.count_queries(), 0)
+
+        bump_principal_version(self.user.pk)
+        self.assertGreater(self.count_queries(), 0)
+
+    def test_unsafe_request_loads_full_user(self):
+        self.count_queries()
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.url, {"name": "Opera"})
+
+        self.assertIn(
+            "user_user",
+            ctx.captured_queries[0]["sql"],
+        )
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        caches["throttle"].clear()
+        self.user = get_user_model().objects.create_user(
+            "outbox@test.com",
+            "testpass",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_verification_email_is_queued_not_sent(self):
+        response = self.client.post(reverse("user:email_verify"))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(mail.outbox, [])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to, "outbox@test.com")
+        self.user.refresh_from_db()
+        self.assertIn(str(self.user.verification_code), email.body)
+
+    def test_worker_sends_batches_over_one_connection(self):
+        for number in range(5):
+            enqueue_email("Subject", "Body", f"user{number}@test.com")
+
+        with patch(
+            "user.outbox.get_connection", wraps=mail.get_connection
+        ) as get_connection:
+            call_command(
+                "send_outbox_emails", batch_size=3, stdout=StringIO()
+            )
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(
+                status=OutgoingEmail.Status.SENT
+            ).exists()
+        )
+
+    @patch(
+        "django.core.mail.backends.locmem.EmailBackend.send_messages",
+        side_effect=ConnectionError("SMTP down"),
+    )
+    def test_failures_are_retried_with_backoff(self, send_messages):
+        email = enqueue_email("Subject", "Body", "retry@test.com")
+
+        self.assertEqual(deliver_batch(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_batch(), (0, 0))
+
+        with self.settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2):
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            deliver_batch()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.Status.FAILED)
+        self.assertEqual(email.last_error, "SMTP down")
+
+    def test_queue_depth(self):
+        enqueue_email("Subject", "Body", "a@test.com")
+        enqueue_email("Subject", "Body", "b@test.com")
+        OutgoingEmail.objects.filter(to="b@test.com").update(
+            status=OutgoingEmail.Status.SENT
+        )
+
+        depth = queue_depth()
+
+        self.assertEqual(depth["pending"], 1)
+        self.assertEqual(depth["sent"], 1)
+        self.assertEqual(depth["due"], 1)
@@ -1,17 +1,16 @@
 import random
 
-from django.conf import settings
-from django.core.mail import send_mail
+from user.outbox import enqueue_email
 
 
-def send_verification_email(email, code):
-    send_mail(
+def send_verification_email(user, code):
+    """Queue the code for the outbox worker instead of sending inline."""
+    enqueue_email(
         "Email confirmation for theatre app",
         f"Please confirm your email with this code: {code}",
-        settings.EMAIL_HOST_USER,
-        [email],
-        fail_silently=False,
+        user.email,
     )
 
+
 def generate_verification_code():
     return random.randint(100000, 999999)